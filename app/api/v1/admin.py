@@ -0,0 +1,129 @@
+import os
+import time
+import uuid
+from typing import Dict, Literal, Optional, cast
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_role
+from app.api.v1 import tag
+from app.core.diagnostics import (
+    PROFILE_INTERVAL_MS,
+    PROFILE_MAX_SECONDS,
+    MemoryTracer,
+    ProfilerBusy,
+    collapse,
+    merge,
+    profile_key,
+    sample_stacks,
+)
+from app.schemas.admin import (
+    MemoryReportResponse,
+    MigrationRequest,
+    MigrationStatusResponse,
+    MigrationSubmitResponse,
+)
+from app.services.tasks import warm_migrate_task
+from app.services.warm_migration import migration_status
+from app.workers.celery_app import celery_app
+
+router = APIRouter(dependencies=[Depends(require_role("admin"))])
+
+memory_tracer = MemoryTracer()
+
+@router.post("/cache/migrate", response_model=MigrationSubmitResponse)
+def start_migration(payload: MigrationRequest):
+    """
+    Enqueue a warm migration. Workers re-tag with *their* config, so run this after rolling
+    out workers with the new config and before cutting the API over.
+    """
+    source = payload.source_fingerprint or tag.tagger.config_fingerprint(payload.tenant)
+    async_result = warm_migrate_task.apply_async(
+        kwargs=dict(source_fingerprint=source, limit=payload.limit, tenant=payload.tenant),
+        queue=os.getenv("CELERY_TAGGING_QUEUE", "tagging")
+    )
+    return MigrationSubmitResponse(job_id=async_result.id, source_fingerprint=source)
+
+@router.get("/cache/migration", response_model=MigrationStatusResponse)
+def get_migration():
+    return MigrationStatusResponse(
+        fingerprint=tag.tagger.config_fingerprint(),
+        migration=migration_status(tag.redis)
+    )
+
+def _collapsed(text: str, name: str) -> PlainTextResponse:
+    return PlainTextResponse(text, headers={"Content-Disposition": f'attachment; filename="{name}.collapsed"'})
+
+@router.post("/profile/cpu", response_class=PlainTextResponse)
+def profile_api_cpu(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(PROFILE_INTERVAL_MS, ge=1, le=1000)
+):
+    """
+    Sample this API process's threads for `seconds` and return collapsed stacks
+    (`flamegraph.pl` / speedscope input). Blocks for the duration; 409 if one is already running.
+    """
+    try:
+        counts = sample_stacks(seconds, interval_ms)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _collapsed(collapse(counts), f"api-{os.getpid()}")
+
+@router.post("/profile/cpu/workers", response_class=PlainTextResponse)
+def profile_worker_cpu(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(PROFILE_INTERVAL_MS, ge=1, le=1000),
+    worker: Optional[str] = Query(None, description="Worker hostname (celery@host); default: all workers")
+):
+    """
+    Profile Celery workers through the `profile_cpu` control command: each samples its pool
+    processes and leaves the stacks in Redis, merged here under a hostname / pid prefix.
+    """
+    token = uuid.uuid4().hex
+    replies = celery_app.control.broadcast(
+        "profile_cpu",
+        arguments={"token": token, "seconds": seconds, "interval_ms": interval_ms},
+        destination=[worker] if worker else None,
+        reply=True,
+        timeout=2.0
+    ) or []
+    hosts = [host for reply in replies for host in reply]
+    if not hosts:
+        raise HTTPException(status_code=503, detail="No worker replied to profile_cpu")
+
+    profiles: Dict[str, str] = {}
+    deadline = time.monotonic() + seconds + 10.0
+    while len(profiles) < len(hosts) and time.monotonic() < deadline:
+        time.sleep(0.25)
+        for host in hosts:
+            if host not in profiles:
+                text = cast(Optional[str], tag.redis.get(profile_key(token, host)))
+                if text is not None:
+                    profiles[host] = text
+    if not profiles:
+        raise HTTPException(status_code=504, detail="Workers did not return a profile in time")
+    return _collapsed(merge(profiles), f"workers-{token[:8]}")
+
+@router.post("/profile/memory/start", status_code=204)
+def start_memory_trace(frames: int = Query(25, ge=1, le=100)):
+    """
+    Start tracemalloc (if needed) and take the baseline later reports diff against.
+    Tracing slows allocation down until stopped.
+    """
+    memory_tracer.start(frames)
+
+@router.get("/profile/memory", response_model=MemoryReportResponse)
+def memory_report(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+    include: Optional[str] = Query(None, description="Filename glob, e.g. */transformers/* or */app/services/*")
+):
+    try:
+        return memory_tracer.report(limit, group_by, include)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/profile/memory", status_code=204)
+def stop_memory_trace():
+    memory_tracer.stop()
@@ -0,0 +1,153 @@
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from prometheus_client import Counter
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import require_role
+from app.api.v1 import tag
+from app.core.framing import FRAMES_MEDIA_TYPE, FrameDecoder, pack_frame
+from app.core.hash import canonical_digest
+from app.core.result_cache import CACHE_LOOKUPS
+from app.core.serialization import dumps, loads
+from app.schemas.auth import User
+from app.services.tagging import ALL_TASKS, resolve_tasks
+from app.services.warm_migration import count_hot
+
+logger = logging.getLogger("text-tagger.internal")
+
+MAX_FRAME_TEXTS = 1000
+
+INTERNAL_FRAMES = Counter(
+    "tagging_internal_frames_total",
+    "Frames handled by the internal binary endpoint, by outcome",
+    labelnames=["outcome"]
+)
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator reads the request body while it writes. The stock
+    class listens for disconnects on `receive` concurrently, which swallows body messages;
+    here a disconnect simply ends the request stream and with it the generator.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+# Internal pipelines authenticate as service users with the "internal" role; no per-user rate limit
+internal_only = require_role("internal")
+router = APIRouter(dependencies=[Depends(internal_only)])
+
+@router.post("/tag", response_class=DuplexStreamingResponse)
+async def tag_stream(request: Request, user: User = Depends(internal_only)):
+    """
+    Binary tagging for internal pipelines: a stream of length-prefixed msgpack frames in,
+    one frame out per frame in, written as soon as it is tagged.
+
+    Request frame:  {"id": any, "texts": [str], "language"?, "domain_dict"?, "tasks"?}
+    Response frame: {"id": same, "results": [{tags, language, ner, topics}]} where results[i]
+    belongs to texts[i] (texts are not echoed), or {"id": same, "error": {code, message}}.
+
+    Frames are tagged as they arrive, so clients can keep sending while reading results, and
+    share TaggingService and the tagresp: cache with /v1/tag. Unlike /v1/tag, a miss is tagged
+    directly: there is no single-flight, no stale-while-revalidate refresh and no load shedding,
+    so callers are trusted to pace themselves.
+    """
+    if FRAMES_MEDIA_TYPE not in (request.headers.get("content-type") or ""):
+        raise HTTPException(status_code=415, detail=f"Expected Content-Type: {FRAMES_MEDIA_TYPE}")
+
+    async def frames():
+        decoder = FrameDecoder()
+        async for chunk in request.stream():
+            try:
+                batch = decoder.feed(chunk)
+            except ValueError as e:
+                INTERNAL_FRAMES.labels(outcome="error").inc()
+                yield pack_frame({"id": None, "error": {"code": "BAD_FRAME", "message": str(e)}})
+                return
+            for frame in batch:
+                yield pack_frame(await run_in_threadpool(_tag_frame, frame, user.tenant_id or "default"))
+        if decoder.pending:
+            INTERNAL_FRAMES.labels(outcome="error").inc()
+            yield pack_frame({"id": None, "error": {"code": "BAD_FRAME", "message": "truncated frame"}})
+
+    return DuplexStreamingResponse(frames(), media_type=FRAMES_MEDIA_TYPE)
+
+def _tag_frame(frame: Any, tenant: str) -> Dict[str, Any]:
+    frame_id = frame.get("id") if isinstance(frame, dict) else None
+    problem = _validate(frame)
+    if problem:
+        INTERNAL_FRAMES.labels(outcome="error").inc()
+        return {"id": frame_id, "error": {"code": "BAD_REQUEST", "message": problem}}
+    try:
+        results, outcome = _tag(
+            frame["texts"], frame.get("language"), frame.get("domain_dict"), frame.get("tasks"), tenant
+        )
+    except Exception as e:
+        logger.exception(f"internal_frame failed id={frame_id}")
+        INTERNAL_FRAMES.labels(outcome="error").inc()
+        return {"id": frame_id, "error": {"code": "TAGGING_FAILED", "message": str(e)}}
+    INTERNAL_FRAMES.labels(outcome=outcome).inc()
+    return {"id": frame_id, "results": results}
+
+def _validate(frame: Any) -> Optional[str]:
+    if not isinstance(frame, dict):
+        return "frame must be a map"
+    texts = frame.get("texts")
+    if not isinstance(texts, list) or not texts or not all(isinstance(t, str) for t in texts):
+        return "texts must be a non-empty list of strings"
+    if len(texts) > MAX_FRAME_TEXTS:
+        return f"at most {MAX_FRAME_TEXTS} texts per frame"
+    if frame.get("language") is not None and not isinstance(frame["language"], str):
+        return "language must be a string"
+    domain_dict = frame.get("domain_dict")
+    if domain_dict is not None and not (isinstance(domain_dict, list) and all(isinstance(t, str) for t in domain_dict)):
+        return "domain_dict must be a list of strings"
+    tasks = frame.get("tasks")
+    if tasks is not None and not (
+        isinstance(tasks, list) and all(isinstance(t, str) for t in tasks) and set(tasks) <= ALL_TASKS
+    ):
+        return f"tasks must be a subset of {sorted(ALL_TASKS)}"
+    return None
+
+def _tag(
+    texts: List[str],
+    language: Optional[str],
+    domain_dict: Optional[List[str]],
+    tasks: Optional[List[str]],
+    tenant: str
+) -> Tuple[List[Dict[str, Any]], str]:
+    selected = resolve_tasks(tasks)
+    fingerprint = tag.tagger.config_fingerprint(tenant)
+    digest = canonical_digest(
+        texts=texts, language=language, domain_dict=domain_dict, tasks=selected, fingerprint=fingerprint
+    )
+    pipe = tag.redis.pipeline(transaction=False)
+    pipe.get(f"tagresp:{digest.key}")
+    count_hot(pipe, fingerprint, digest.key)
+    cached = pipe.execute()[0]
+    if cached and tag._is_tag_response(cached):
+        CACHE_LOOKUPS.labels(result="HIT").inc()
+        return _without_text(loads(cached)["results"]), "hit"
+
+    start = time.perf_counter()
+    results = tag.tagger.tag_texts_raw(
+        texts=texts,
+        language=language,
+        domain_dict=domain_dict,
+        tasks=selected,
+        text_digests=digest.text_digests,
+        tenant=tenant
+    )
+    # Stored as the same JSON TagResponse /v1/tag serves, so either front end can reuse it
+    tag.store_response(
+        texts, language, domain_dict, selected, fingerprint, digest,
+        dumps({"results": results}), (time.perf_counter() - start) * 1000, tenant
+    )
+    CACHE_LOOKUPS.labels(result="MISS").inc()
+    return _without_text(results), "miss"
+
+def _without_text(results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: v for k, v in r.items() if k != "text"} for r in results]
@@ -1,71 +1,313 @@
-import json
+import logging
 import os
+import time
+from typing import FrozenSet, List, Optional, Tuple, Union
 
 from celery.result import AsyncResult
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.api.deps import auth_and_rate_limit
-from app.core.hash import normalize_payload, payload_hash
+from app.core.auth import AuthContext
+from app.core.hash import PayloadDigest, canonical_digest
+from app.core.profiling import format_breakdown, profile, server_timing, should_profile, stage
 from app.core.redis_client import get_redis
-from app.schemas.tag import BatchStatusResponse, BatchSubmitResponse, ErrorInfo, TagRequest, TagResponse
-from app.services.tagging import TaggingService
-from app.services.tasks import tag_batch_task
+from app.core.result_cache import (
+    CACHE_LOOKUPS,
+    CACHE_REFRESHES,
+    FRESH,
+    REFRESH_LOCK_SECONDS,
+    STALE,
+    freshness,
+    meta_key,
+    refresh_lock_key,
+    store,
+)
+from app.core.serialization import dumps, encode_json_body, negotiate
+from app.core.singleflight import SINGLEFLIGHT_ENABLED, SingleFlight
+from app.schemas.tag import (
+    BatchStatusResponse,
+    BatchSubmitResponse,
+    ErrorInfo,
+    JobStatus,
+    TagRequest,
+    TagResponse,
+    TagResult,
+)
+from app.services.batch_results import count_rows, iter_rows, job_info, load_results
+from app.services.deadline import PARTIAL_RESPONSES, resolve_deadline, tag_within_deadline
+from app.services.load_shedding import LOAD_SHEDDING_ENABLED, SHED_RESPONSES, LoadShedder
+from app.services.tagging import TaggingService, resolve_tasks
+from app.services.tasks import refresh_cache_task, tag_batch_task
+from app.services.warm_migration import count_hot, remember_request
 from app.workers.celery_app import celery_app
 
-CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", "600"))
+logger = logging.getLogger("text-tagger")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Largest job whose results /tag/batch/{job_id} inlines; bigger ones only link to the paged results
+BATCH_STATUS_MAX_ROWS = int(os.getenv("BATCH_STATUS_MAX_ROWS", "1000"))
 
 router = APIRouter(dependencies=[Depends(auth_and_rate_limit)])
 tagger = TaggingService()
 redis = get_redis()
+_single_flight = SingleFlight(lambda: redis)
+_shedder = LoadShedder(lambda: redis) if LOAD_SHEDDING_ENABLED else None
 
 @router.post("/tag", response_model=TagResponse)
-def tag_text(payload: TagRequest, response: Response, request: Request):
+def tag_text(
+    payload: TagRequest, response: Response, request: Request, ctx: AuthContext = Depends(auth_and_rate_limit)
+):
+    """
+    Returns already-encoded bytes: cache hits go out exactly as stored, misses are serialized
+    once. The body always matches TagResponse; it just isn't re-validated on the way out.
+    """
     if not payload.texts:
         raise HTTPException(status_code=400, detail="No input texts provided for tagging.")
     
-    normalized = normalize_payload(
-        texts=payload.texts,
-        language=payload.language,
-        domain_dict=payload.domain_dict
-    )
-    cache_key = payload_hash(normalized)
-    result_key = f"tagresp:{cache_key}"
+    started = time.perf_counter()
+    # Time spent queued for a threadpool slot, stamped by the request middleware
+    received = getattr(request.state, "received_at", None)
+    wait_ms = (started - received) * 1000 if received else 0.0
+    
+    media_type = negotiate(request.headers.get("accept"))
+    try:
+        with profile(should_profile(request.headers.get("x-profile"))) as breakdown:
+            deadline = resolve_deadline(payload.timeout_ms, request.headers.get("x-deadline"))
+            body = _tag_text(payload, response, deadline, ctx.tenant)
+            with stage("encode"):
+                content = encode_json_body(body, media_type)
+    finally:
+        if _shedder is not None:
+            _shedder.observe((time.perf_counter() - started) * 1000, wait_ms)
+    
+    if breakdown is not None:
+        response.headers["Server-Timing"] = server_timing(breakdown)
+        logger.info(
+            f"profile rid={request.headers.get('x-request-id')} batch_size={len(payload.texts)} " \
+            f"cache={response.headers.get('X-Cache')} {format_breakdown(breakdown)}"
+        )
+    return _raw_response(content, media_type, response)
+
+def _raw_response(content: Union[bytes, str], media_type: str, response: Response) -> Response:
+    raw = Response(content=content, media_type=media_type)
+    # FastAPI only merges headers from the injected `response` when the endpoint returns a model
+    for name, value in response.headers.items():
+        if name not in ("content-length", "content-type"):
+            raw.headers[name] = value
+    return raw
+
+def _tag_text(
+    payload: TagRequest, response: Response, deadline: Optional[float] = None, tenant: Optional[str] = None
+) -> Union[bytes, str]:
+    tasks = resolve_tasks(payload.tasks)
+    fingerprint = tagger.config_fingerprint(tenant)
+    with stage("hash"):
+        digest = canonical_digest(
+            texts=payload.texts,
+            language=payload.language,
+            domain_dict=payload.domain_dict,
+            tasks=tasks,
+            fingerprint=fingerprint
+        )
+    result_key = f"tagresp:{digest.key}"
     
-    cached = redis.get(result_key)
-    if cached:
-        response.headers["X-Cache"] = "HIT"
-        return TagResponse(**json.loads(cached))
+    cached = _cached_response(digest.key, result_key, fingerprint, response, hot=True)
+    if cached is not None:
+        response.headers["X-Service-Level"] = "full"
+        return cached
     
-    results = tagger.tag_texts(
+    # Under overload, compute misses with fewer stages (cached separately, under their own key)
+    level = _shedder.current() if _shedder is not None else "full"
+    response.headers["X-Service-Level"] = level
+    served = _shedder.allowed(tasks, level) if _shedder is not None else tasks
+    if served != tasks:
+        SHED_RESPONSES.labels(level=level).inc()
+        if not served:
+            # None of the requested stages run at this level. An empty selection means "all"
+            # everywhere downstream, so answer with null stages here, uncached.
+            response.headers["X-Cache"] = "MISS"
+            CACHE_LOOKUPS.labels(result="MISS").inc()
+            return dumps({"results": [_unserved(text, payload.language) for text in payload.texts]})
+        tasks = served
+        digest = canonical_digest(
+            texts=payload.texts,
+            language=payload.language,
+            domain_dict=payload.domain_dict,
+            tasks=tasks,
+            fingerprint=fingerprint
+        )
+        result_key = f"tagresp:{digest.key}"
+        cached = _cached_response(digest.key, result_key, fingerprint, response)
+        if cached is not None:
+            return cached
+    
+    def compute() -> bytes:
+        return _compute_and_store(payload, tasks, fingerprint, digest, tenant)
+    
+    if deadline is not None:
+        # Callers with their own budget don't wait on someone else's computation
+        encoded, complete = _compute_within_deadline(payload, tasks, fingerprint, digest, deadline, tenant)
+        response.headers["X-Cache"] = "MISS" if complete else "PARTIAL"
+        CACHE_LOOKUPS.labels(result="MISS").inc()
+        return encoded
+    
+    # Concurrent identical misses (this process or others) wait for one computation
+    if SINGLEFLIGHT_ENABLED:
+        encoded, outcome = _single_flight.run(digest.key, result_key, compute, accept=_is_tag_response)
+        response.headers["X-Single-Flight"] = outcome
+    else:
+        encoded = compute()
+
+    response.headers["X-Cache"] = "MISS"
+    CACHE_LOOKUPS.labels(result="MISS").inc()
+    return encoded
+
+def _cached_response(
+    cache_key: str, result_key: str, fingerprint: str, response: Response, hot: bool = False
+) -> Optional[str]:
+    """
+    Look up a cached response and set X-Cache. Past the soft TTL (or picked for XFetch early
+    refresh) it is still served, with a refresh scheduled in the background.
+    """
+    with stage("cache_get"):
+        pipe = redis.pipeline(transaction=False)
+        pipe.get(result_key)
+        pipe.pttl(result_key)
+        pipe.get(meta_key(cache_key))
+        if hot:
+            # Hotness feeds warm migration on the next config change; same round trip as the GET
+            count_hot(pipe, fingerprint, cache_key)
+        cached, pttl, compute_ms = pipe.execute()[:3]
+    if not (cached and _is_tag_response(cached)):
+        return None
+    state = freshness(pttl, compute_ms)
+    if state != FRESH:
+        _schedule_refresh(cache_key, state)
+    result = "STALE" if state == STALE else "HIT"
+    response.headers["X-Cache"] = result
+    CACHE_LOOKUPS.labels(result=result).inc()
+    return cached
+
+def _unserved(text: str, language: Optional[str]) -> dict:
+    return {"text": text, "tags": [], "language": language, "ner": None, "topics": None}
+
+def _schedule_refresh(cache_key: str, trigger: str):
+    try:
+        if not redis.set(refresh_lock_key(cache_key), "1", nx=True, ex=REFRESH_LOCK_SECONDS):
+            return
+        refresh_cache_task.apply_async(
+            kwargs=dict(cache_key=cache_key),
+            queue=os.getenv("CELERY_TAGGING_QUEUE", "tagging")
+        )
+        CACHE_REFRESHES.labels(trigger=trigger).inc()
+    except Exception as e:
+        logger.warning(f"cache_refresh enqueue failed key={cache_key} err={e}")
+
+def _is_tag_response(cached: str) -> bool:
+    # Only stream TagResponse-shaped entries; the worker may have cached an {"error": ...} payload
+    return cached.startswith('{"results"')
+
+def _compute_and_store(
+    payload: TagRequest, tasks: FrozenSet[str], fingerprint: str, digest: PayloadDigest, tenant: Optional[str] = None
+) -> bytes:
+    start = time.perf_counter()
+    results = tagger.tag_texts_raw(
         texts=payload.texts,
         language=payload.language,
-        domain_dict=payload.domain_dict
+        domain_dict=payload.domain_dict,
+        tasks=tasks,
+        text_digests=digest.text_digests,
+        tenant=tenant
     )
     
-    payload_dict = {"results": [result.model_dump() for result in results]}
-    redis.setex(result_key, CACHE_TTL, json.dumps(payload_dict, ensure_ascii=False))
+    with stage("serialize"):
+        encoded = dumps({"results": results})
+    store_response(
+        payload.texts, payload.language, payload.domain_dict, tasks, fingerprint, digest,
+        encoded, (time.perf_counter() - start) * 1000, tenant
+    )
+    return encoded
 
-    response.headers["X-Cache"] = "MISS"
-    return TagResponse(**payload_dict)
-    # results = tagger.tag_texts(
-    #     texts=payload.texts,
-    #     language=payload.language,
-    #     domain_dict=payload.domain_dict
-    # )
-    
-    # return TagResponse(results=results)
+def _compute_within_deadline(
+    payload: TagRequest,
+    tasks: FrozenSet[str],
+    fingerprint: str,
+    digest: PayloadDigest,
+    deadline: float,
+    tenant: Optional[str] = None
+) -> Tuple[bytes, bool]:
+    """
+    Tag in sub-batches until the deadline. A complete response is cached as usual; a partial
+    one is not (its finished texts are, per index, for the retry) and lists `unprocessed`.
+    """
+    start = time.perf_counter()
+    body, complete = tag_within_deadline(
+        tagger,
+        redis,
+        digest.key,
+        payload.texts,
+        deadline,
+        language=payload.language,
+        domain_dict=payload.domain_dict,
+        tasks=sorted(tasks),
+        text_digests=digest.text_digests,
+        tenant=tenant
+    )
+    with stage("serialize"):
+        encoded = dumps(body)
+    if complete:
+        store_response(
+            payload.texts, payload.language, payload.domain_dict, tasks, fingerprint, digest,
+            encoded, (time.perf_counter() - start) * 1000, tenant
+        )
+    else:
+        PARTIAL_RESPONSES.labels(path="sync").inc()
+    return encoded, complete
+
+def store_response(
+    texts: List[str],
+    language: Optional[str],
+    domain_dict: Optional[List[str]],
+    tasks: FrozenSet[str],
+    fingerprint: str,
+    digest: PayloadDigest,
+    encoded: bytes,
+    compute_ms: float,
+    tenant: Optional[str] = None
+):
+    """
+    Cache an encoded TagResponse plus the request recipe (warm migration / refresh).
+    Shared with the internal binary endpoint, so both front ends hit the same entries.
+    """
+    with stage("cache_set"):
+        pipe = redis.pipeline(transaction=False)
+        store(pipe, digest.key, encoded, compute_ms)
+        remember_request(
+            pipe,
+            fingerprint,
+            digest.key,
+            texts=texts,
+            language=language,
+            domain_dict=domain_dict,
+            tasks=list(tasks),
+            tenant=tenant
+        )
+        pipe.execute()
 
 @router.post("/tag/batch", response_model=BatchSubmitResponse)
-def submit_batch(payload: TagRequest, request: Request):
+def submit_batch(payload: TagRequest, request: Request, ctx: AuthContext = Depends(auth_and_rate_limit)):
     if not payload.texts:
         raise HTTPException(status_code=400, detail="No input texts provided for batch tagging.")
     
-    normalized = normalize_payload( # added this
+    tasks = resolve_tasks(payload.tasks)
+    cache_key = canonical_digest(
         texts=payload.texts,
         language=payload.language,
-        domain_dict=payload.domain_dict
-    )
-    cache_key = payload_hash(normalized)
+        domain_dict=payload.domain_dict,
+        tasks=tasks,
+        fingerprint=tagger.config_fingerprint(ctx.tenant)
+    ).key
     
     inflight_key = f"inflight:{cache_key}"
     ttl = int(os.getenv("CACHE_TTL_SECONDS", "600"))
@@ -83,8 +325,12 @@ def submit_batch(payload: TagRequest, request: Request):
             texts=payload.texts,
             language=payload.language,
             domain_dict=payload.domain_dict,
+            tasks=sorted(tasks),
             request_id=request_id,
-            cache_key=cache_key
+            cache_key=cache_key,
+            profile=should_profile(request.headers.get("x-profile")),
+            deadline=resolve_deadline(payload.timeout_ms, request.headers.get("x-deadline")),
+            tenant=ctx.tenant
         ),
         queue=os.getenv("CELERY_TAGGING_QUEUE", "tagging")
     )
@@ -95,13 +341,13 @@ def submit_batch(payload: TagRequest, request: Request):
     return BatchSubmitResponse(job_id=async_result.id)
 
 @router.get("/tag/batch/{job_id}", response_model=BatchStatusResponse)
-def get_batch_status(job_id: str):
+def get_batch_status(job_id: str, request: Request):
     result = AsyncResult(job_id, app=celery_app)
-    state = result.state
+    state = JobStatus(result.state)
     
-    if state in ("PENDING", "STARTED", "RETRY"):
+    if state in (JobStatus.PENDING, JobStatus.STARTED, JobStatus.RETRY):
         return BatchStatusResponse(status=state)
-    if state == "FAILURE":
+    if state == JobStatus.FAILURE:
         return BatchStatusResponse(
             status=state,
             error=ErrorInfo(code="TASK_FAILURE", message=str(result.info))
@@ -110,7 +356,55 @@ def get_batch_status(job_id: str):
     payload = result.get(timeout=10)
     if "error" in payload:
         return BatchStatusResponse(
-            status="FAILURE",
+            status=JobStatus.FAILURE,
             error=ErrorInfo(**payload["error"])
         )
-    return BatchStatusResponse(status=state, result=TagResponse(**payload))
+    if "rows" not in payload:
+        # Finished before results moved out of the Celery backend
+        return BatchStatusResponse(status=state, result=TagResponse(**payload))
+
+    # The backend only holds a reference; the rows are the single copy of the results
+    count = count_rows(redis, payload["rows"])
+    if count < payload["total"] - len(payload["unprocessed"]):
+        return BatchStatusResponse(
+            status=JobStatus.FAILURE,
+            error=ErrorInfo(code="RESULT_EXPIRED", message="Batch results have expired")
+        )
+    status = BatchStatusResponse(
+        status=state,
+        total=payload["total"],
+        unprocessed_count=len(payload["unprocessed"]),
+        results_url=str(request.url_for("get_batch_results", job_id=job_id))
+    )
+    if count <= BATCH_STATUS_MAX_ROWS:
+        results = [TagResult.model_validate(row) for row in load_results(redis, payload["rows"], count)]
+        status.result = TagResponse(results=results, unprocessed=payload["unprocessed"] or None)
+    return status
+
+@router.get("/tag/batch/{job_id}/results", response_class=StreamingResponse)
+def get_batch_results(
+    job_id: str,
+    cursor: int = Query(0, ge=0, description="Row offset to start from (X-Next-Cursor of the previous page)"),
+    limit: int = Query(100, ge=1, le=1000, description="Rows per page")
+):
+    """
+    One page of a finished job's results as NDJSON: a {"index", ...TagResult} line per text,
+    streamed from the stored rows a few at a time, so memory stays flat whatever the job size.
+    X-Next-Cursor is set while more rows remain; X-Total-Count counts stored rows.
+    """
+    info = job_info(redis, job_id)
+    if info is None:
+        state = AsyncResult(job_id, app=celery_app).state
+        if state in ("PENDING", "STARTED", "RETRY"):
+            raise HTTPException(status_code=409, detail=f"Job is {state}; results are not ready yet.")
+        raise HTTPException(status_code=404, detail="No stored results for this job (failed or expired).")
+    
+    count = count_rows(redis, info["rows"])
+    if count == 0 and info["total"] > len(info["unprocessed"]):
+        raise HTTPException(status_code=404, detail="Stored results for this job have expired.")
+    stop = min(count, cursor + limit)
+    headers = {"X-Total-Count": str(count), "X-Unprocessed-Count": str(len(info["unprocessed"]))}
+    if stop < count:
+        headers["X-Next-Cursor"] = str(stop)
+    rows = (row + "\n" for row in iter_rows(redis, info["rows"], cursor, stop))
+    return StreamingResponse(rows, media_type=NDJSON_MEDIA_TYPE, headers=headers)
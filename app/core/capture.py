@@ -0,0 +1,135 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import secrets
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("text-tagger.capture")
+
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "0") == "1"
+CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", "0.01"))
+CAPTURE_PATH = os.getenv("CAPTURE_PATH", "captures/requests.jsonl")
+CAPTURE_MAX_BYTES = int(os.getenv("CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+CAPTURE_BACKUPS = int(os.getenv("CAPTURE_BACKUPS", "5"))
+# "redact": lengths and short digests only; "synthetic": same-length stand-in text; "raw": texts as sent
+CAPTURE_TEXT = os.getenv("CAPTURE_TEXT", "redact").lower()
+CAPTURE_PATHS = frozenset({"/v1/tag", "/v1/tag/batch"})
+# Keys the text digests so captures can't be matched against guessed texts. Set it to the same
+# secret on every process; unset, each process draws its own and ids only repeat within it
+CAPTURE_HMAC_KEY = os.getenv("CAPTURE_HMAC_KEY", "").encode("utf-8")
+_PROCESS_KEY = secrets.token_bytes(32)
+
+_WORDS = (
+    "market company announced model research team launched platform cloud energy policy city "
+    "season album travel health science students budget bank rates growth quarter investors"
+).split()
+
+def text_id(text: str, key: Optional[bytes] = None) -> str:
+    """
+    Short, stable stand-in for a text: equal texts get equal ids, so replays keep the repeats
+    (and therefore the cache hits) of the captured traffic without keeping the text.
+    """
+    key = key or CAPTURE_HMAC_KEY or _PROCESS_KEY
+    return hmac.new(key, text.encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+def synthetic_text(length: int, seed: str) -> str:
+    """
+    Exactly `length` characters of common words, deterministic in `seed`.
+    """
+    rng = random.Random(seed)
+    words: List[str] = []
+    size = 0
+    while size < length:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+def synthetic_terms(size: int, seed: str) -> List[str]:
+    return [f"term-{text_id(f'{seed}:{i}')[:6]}" for i in range(size)]
+
+class RequestCapture:
+    """
+    Sampled capture of tagging requests for capacity planning (replayed by benchmarks.replay).
+
+    One JSON line per sampled request, written through a RotatingFileHandler so disk use is
+    bounded by max_bytes * (backups + 1). Records the request's shape (text lengths, batch and
+    domain_dict sizes, tasks), its outcome (status, duration, X-Cache) and, depending on
+    `text_mode`, the texts themselves, same-length synthetic stand-ins, or neither. Texts are
+    identified by an HMAC under `hmac_key`. record() does blocking file I/O; call it off the event loop.
+    """
+    def __init__(
+        self,
+        path: str = CAPTURE_PATH,
+        sample_rate: float = CAPTURE_SAMPLE_RATE,
+        text_mode: str = CAPTURE_TEXT,
+        max_bytes: int = CAPTURE_MAX_BYTES,
+        backups: int = CAPTURE_BACKUPS,
+        hmac_key: bytes = CAPTURE_HMAC_KEY
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.text_mode = text_mode
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.hmac_key = hmac_key or _PROCESS_KEY
+        if not hmac_key and text_mode != "raw":
+            logger.warning("CAPTURE_HMAC_KEY is not set; text ids will not match across processes")
+        self._writer: Optional[logging.Logger] = None
+
+    def sampled(self, method: str, path: str) -> bool:
+        return method == "POST" and path in CAPTURE_PATHS and random.random() < self.sample_rate
+
+    def record(self, path: str, body: bytes, status: int, duration_ms: int, cache: Optional[str], ts: float):
+        try:
+            payload = json.loads(body)
+            entry = self._entry(payload)
+        except (ValueError, TypeError, AttributeError, KeyError):
+            return
+        entry.update({"ts": round(ts, 3), "path": path, "status": status, "duration_ms": duration_ms, "cache": cache})
+        try:
+            self._get_writer().info(json.dumps(entry, separators=(",", ":")))
+        except OSError as e:
+            logger.warning(f"capture write failed path={self.path} err={e}")
+
+    def _entry(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        texts = payload["texts"]
+        domain_dict = payload.get("domain_dict") or []
+        ids = [text_id(t, self.hmac_key) for t in texts]
+        dict_id = text_id("\x1f".join(domain_dict), self.hmac_key) if domain_dict else None
+        entry: Dict[str, Any] = {
+            "batch_size": len(texts),
+            "text_lengths": [len(t) for t in texts],
+            "text_ids": ids,
+            "domain_dict_size": len(domain_dict),
+            "domain_dict_id": dict_id,
+            "language": payload.get("language"),
+            "tasks": payload.get("tasks"),
+            "timeout_ms": payload.get("timeout_ms"),
+        }
+        if self.text_mode == "raw":
+            entry["texts"] = texts
+            entry["domain_dict"] = domain_dict
+        elif self.text_mode == "synthetic":
+            entry["texts"] = [synthetic_text(len(t), i) for t, i in zip(texts, ids)]
+            entry["domain_dict"] = synthetic_terms(len(domain_dict), dict_id) if dict_id is not None else []
+        return entry
+
+    def _get_writer(self) -> logging.Logger:
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            writer = logging.getLogger(f"text-tagger.capture.file.{self.path}")
+            writer.setLevel(logging.INFO)
+            writer.propagate = False
+            if not writer.handlers:
+                handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                writer.addHandler(handler)
+            self._writer = writer
+        return self._writer
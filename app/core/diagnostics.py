@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("text-tagger.diagnostics")
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Where prefork children pick up profile requests and drop their stacks
+PROFILE_DIR = os.getenv("PROFILE_DIR", tempfile.gettempdir())
+PROFILE_SIGNAL = signal.SIGUSR2
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+_cpu_lock = threading.Lock()
+
+def _stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+def sample_stacks(seconds: float, interval_ms: float = PROFILE_INTERVAL_MS) -> Counter:
+    """
+    Sample every thread's Python stack each `interval_ms` for `seconds` and count identical
+    stacks (root first, ';'-joined). Nothing is installed outside the call, so there is no
+    cost while no profile runs. Time spent in native code (a torch forward) is attributed to
+    the Python frame that called it. One profile per process at a time; else ProfilerBusy.
+    """
+    if not _cpu_lock.acquire(blocking=False):
+        raise ProfilerBusy("a CPU profile is already running in this process")
+    try:
+        seconds = min(seconds, PROFILE_MAX_SECONDS)
+        interval = max(interval_ms, 1.0) / 1000.0
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        counts: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    counts[f"{names.get(ident, ident)};{_stack(frame)}"] += 1
+            time.sleep(interval)
+        return counts
+    finally:
+        _cpu_lock.release()
+
+def collapse(counts: Counter) -> str:
+    """
+    Brendan Gregg's collapsed-stack format: one "frame;frame;frame count" line per stack,
+    ready for flamegraph.pl or speedscope.
+    """
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+def merge(profiles: Dict[str, str]) -> str:
+    """
+    Combine collapsed profiles, each stack prefixed with its key (e.g. the process it came from).
+    """
+    counts: Counter = Counter()
+    for prefix, text in profiles.items():
+        for line in text.splitlines():
+            stack, _, n = line.rpartition(" ")
+            if stack:
+                counts[f"{prefix};{stack}"] += int(n)
+    return collapse(counts)
+
+def profile_key(token: str, hostname: str) -> str:
+    return f"tagprofile:{token}:{hostname}"
+
+# --- Prefork workers: the control command runs in the pool parent, tasks in its children ---
+
+def _request_path(parent_pid: int) -> str:
+    return os.path.join(PROFILE_DIR, f"tagserve-profile-{parent_pid}.json")
+
+def _result_path(token: str, pid: int) -> str:
+    return os.path.join(PROFILE_DIR, f"tagserve-profile-{token}-{pid}.txt")
+
+def _on_profile_signal(signum, frame):
+    try:
+        with open(_request_path(os.getppid())) as f:
+            request = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    def _run():
+        try:
+            text = collapse(sample_stacks(request["seconds"], request["interval_ms"]))
+        except ProfilerBusy:
+            return
+        with open(_result_path(request["token"], os.getpid()), "w") as out:
+            out.write(text)
+
+    threading.Thread(target=_run, name="cpu-profiler", daemon=True).start()
+
+def install_profile_signal():
+    """
+    Let a pool child be profiled on demand (see profile_children). Costs nothing until signalled.
+    """
+    signal.signal(PROFILE_SIGNAL, _on_profile_signal)
+
+def profile_children(pids: List[int], seconds: float, interval_ms: float = PROFILE_INTERVAL_MS) -> str:
+    """
+    Ask each pool child to sample itself for `seconds` and merge their stacks, each prefixed
+    with its pid. A child busy in native code starts sampling when it next runs Python.
+    """
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    token = uuid.uuid4().hex
+    request = _request_path(os.getpid())
+    with open(request, "w") as f:
+        json.dump({"token": token, "seconds": seconds, "interval_ms": interval_ms}, f)
+    try:
+        for pid in pids:
+            try:
+                os.kill(pid, PROFILE_SIGNAL)
+            except OSError as e:
+                logger.warning(f"profile signal failed pid={pid} err={e}")
+        deadline = time.monotonic() + seconds + 5.0
+        while time.monotonic() < deadline and not all(os.path.exists(_result_path(token, pid)) for pid in pids):
+            time.sleep(0.2)
+    finally:
+        os.remove(request)
+
+    profiles = {}
+    for pid in pids:
+        try:
+            with open(_result_path(token, pid)) as f:
+                profiles[f"pid-{pid}"] = f.read()
+            os.remove(_result_path(token, pid))
+        except OSError:
+            logger.warning(f"profile missing pid={pid}")
+    return merge(profiles)
+
+# --- Memory ---
+
+class MemoryTracer:
+    """
+    tracemalloc with a baseline: start() begins tracing (and its overhead) and takes the
+    baseline, report() diffs a fresh snapshot against it, stop() ends tracing. Idle until started.
+    """
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 25):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = tracemalloc.take_snapshot()
+
+    def stop(self):
+        with self._lock:
+            self._baseline = None
+            tracemalloc.stop()
+
+    def report(self, limit: int = 25, group_by: str = "lineno", include: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Top allocation sites by growth since the baseline. `include` keeps only traces whose
+        file matches the glob (e.g. "*/transformers/*", "*/app/services/*").
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing() or self._baseline is None:
+                raise RuntimeError("memory tracing is not active")
+            snapshot = tracemalloc.take_snapshot()
+            baseline = self._baseline
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        if include:
+            filters.append(tracemalloc.Filter(True, include))
+        stats = snapshot.filter_traces(filters).compare_to(baseline.filter_traces(filters), group_by)
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": [
+                {
+                    "location": " <- ".join(f"{fr.filename}:{fr.lineno}" for fr in stat.traceback),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:limit]
+            ],
+        }
@@ -0,0 +1,55 @@
+import os
+import struct
+from typing import Any, List
+
+import msgpack
+
+FRAMES_MEDIA_TYPE = "application/x-tagserve-frames"
+# Largest single frame accepted from a peer
+FRAME_MAX_BYTES = int(os.getenv("FRAME_MAX_BYTES", str(16 * 1024 * 1024)))
+
+_HEADER = struct.Struct(">I")
+
+def pack_frame(obj: Any) -> bytes:
+    """
+    One frame: 4-byte big-endian payload length, then the msgpack payload.
+    """
+    payload = msgpack.packb(obj, use_bin_type=True)
+    return _HEADER.pack(len(payload)) + payload
+
+class FrameDecoder:
+    """
+    Incremental decoder for a stream of frames: feed it chunks as they arrive (frames may
+    straddle chunk boundaries) and it returns the frames completed so far.
+    """
+    def __init__(self, max_bytes: int = FRAME_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._buf = bytearray()
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        self._buf += chunk
+        frames = []
+        while len(self._buf) >= _HEADER.size:
+            (size,) = _HEADER.unpack_from(self._buf)
+            if size > self.max_bytes:
+                raise ValueError(f"frame of {size} bytes exceeds FRAME_MAX_BYTES={self.max_bytes}")
+            end = _HEADER.size + size
+            if len(self._buf) < end:
+                break
+            frames.append(msgpack.unpackb(bytes(self._buf[_HEADER.size:end]), raw=False))
+            del self._buf[:end]
+        return frames
+
+    @property
+    def pending(self) -> int:
+        """
+        Bytes of an incomplete trailing frame (non-zero at end of stream = truncated input).
+        """
+        return len(self._buf)
+
+def unpack_frames(data: bytes) -> List[Any]:
+    decoder = FrameDecoder()
+    frames = decoder.feed(data)
+    if decoder.pending:
+        raise ValueError(f"truncated frame stream ({decoder.pending} trailing bytes)")
+    return frames
@@ -1,20 +1,83 @@
 import hashlib
-import json
-from typing import Any, Dict, List, Optional
-
-
-def normalize_payload(
-    *, texts: List[str], language: Optional[str], domain_dict: Optional[List[str]]
-) -> Dict[str, Any]:
-    norm_texts = [text.strip() for text in texts]
-    norm_lang = language.lower().strip() if language else None
-    norm_domain = sorted({kw.strip() for kw in (domain_dict or [])})
-    return {
-        "texts": norm_texts,
-        "language": norm_lang,
-        "domain_dict": norm_domain
-    }
-
-def payload_hash(payload: Dict[str, Any]) -> str:
-    s = json.dumps(payload, sort_keys=True, ensure_ascii=False)
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+import logging
+import os
+from typing import Any, Callable, Collection, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cache keys are not security sensitive; blake3 / xxh3 are faster when installed
+CACHE_HASH_ALGO = os.getenv("CACHE_HASH_ALGO", "sha256").lower()
+
+# Bump when the canonical encoding below changes, so old keys can't collide with new ones
+_CANONICAL_VERSION = b"tt-canon-v1"
+
+
+def _hasher_factory(algo: str) -> Callable[[], Any]:
+    if algo == "blake3":
+        try:
+            from blake3 import blake3
+            return blake3
+        except ImportError:
+            logger.warning("CACHE_HASH_ALGO=blake3 but blake3 is not installed; using sha256")
+    elif algo in ("xxh3", "xxh3_128"):
+        try:
+            import xxhash
+            return xxhash.xxh3_128
+        except ImportError:
+            logger.warning("CACHE_HASH_ALGO=xxh3 but xxhash is not installed; using sha256")
+    elif algo == "blake2b":
+        return lambda: hashlib.blake2b(digest_size=32)
+    return hashlib.sha256
+
+_new_hasher = _hasher_factory(CACHE_HASH_ALGO)
+
+class PayloadDigest(NamedTuple):
+    key: str
+    text_digests: List[str]
+
+def _feed(hasher, value: bytes):
+    hasher.update(len(value).to_bytes(8, "big"))
+    hasher.update(value)
+
+def text_digest(text: str) -> bytes:
+    """
+    Digest of one stripped text; the per-text component of `canonical_digest`.
+    """
+    inner = _new_hasher()
+    inner.update(text.strip().encode("utf-8"))
+    return inner.digest()
+
+def canonical_digest(
+    *,
+    texts: List[str],
+    language: Optional[str],
+    domain_dict: Optional[List[str]],
+    tasks: Optional[Collection[str]] = None,
+    fingerprint: str = ""
+) -> PayloadDigest:
+    """
+    Cache key for a tagging request: texts are stripped, the language lower-cased and domain
+    terms de-duplicated and sorted, without building or serializing an intermediate JSON document.
+
+    Each text is hashed once on its own; the request key hashes the per-text digests plus the
+    length-prefixed language, domain terms, selected `tasks` and the tagger's config
+    `fingerprint`, so a model or threshold change moves every request to a new key.
+    The per-text digests are returned too, for per-text caching and dedup.
+    """
+    outer = _new_hasher()
+    outer.update(_CANONICAL_VERSION)
+    _feed(outer, fingerprint.encode("utf-8"))
+    _feed(outer, (language.lower().strip() if language else "").encode("utf-8"))
+    terms = sorted({kw.strip() for kw in (domain_dict or [])})
+    outer.update(len(terms).to_bytes(8, "big"))
+    for term in terms:
+        _feed(outer, term.encode("utf-8"))
+    _feed(outer, ",".join(sorted(set(tasks or ()))).encode("utf-8"))
+
+    outer.update(len(texts).to_bytes(8, "big"))
+    text_digests = []
+    for text in texts:
+        digest = text_digest(text)
+        outer.update(digest)
+        text_digests.append(digest.hex())
+    return PayloadDigest(key=outer.hexdigest(), text_digests=text_digests)
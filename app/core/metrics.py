@@ -1,29 +1,55 @@
+import logging
+import math
 import os
-from typing import Iterable
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
 
-from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily, Metric
 from prometheus_client.registry import Collector
+from redis import Redis
 
 from app.core.redis_client import get_redis
 
-# Keys used by the worker
+logger = logging.getLogger("text-tagger.metrics")
+
+# Progress hash written by app.services.warm_migration
+MIGRATION_KEY = "cache:migration"
+
+# Single Redis hash that every worker process flushes its aggregated metrics into
+METRICS_HASH = "metrics:worker"
+FLUSH_INTERVAL_S = float(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", "5"))
+
+# Fields used by the worker (inside METRICS_HASH)
 _METRICS = {
     "tagging_tasks_total": {
-        "success": "metrics:tasks_total:success",
-        "failure": "metrics:tasks_total:failure",
-        "timeout": "metrics:tasks_total:timeout"
+        "success": "tasks_total:success",
+        "failure": "tasks_total:failure",
+        "timeout": "tasks_total:timeout"
     },
     "tagging_cache_hits_total": {
-        "hit": "metrics:cache_hits_total"
+        "hit": "cache_hits_total"
     }
 }
 
-_HIST_PREFIX = "metrics:task_duration_ms"
-_HIST_BUCKETS_MS = [50, 100, 250, 500, 1000, 2000, 5000] # +Inf implicit
+_HIST_PREFIX = "task_duration_ms"
+
+def _parse_buckets(raw: Optional[str], default: List[float]) -> List[float]:
+    if not raw:
+        return default
+    return sorted({float(b) for b in raw.split(",") if b.strip()})
+
+# +Inf implicit
+HIST_BUCKETS_MS = _parse_buckets(os.getenv("TASK_DURATION_BUCKETS_MS"), [50, 100, 250, 500, 1000, 2000, 5000])
+
+def _bucket_field(prefix: str, le: float) -> str:
+    if math.isinf(le):
+        return f"{prefix}:bucket:le_inf"
+    return f"{prefix}:bucket:le_{le:g}"
 
-def _queue_len(redis, name: str) -> int:
+def queue_length(redis, name: str) -> int:
     """
-    Return the length of the Celery Redis queue.
+    Return the length of the Celery Redis queue (0 if it can't be read).
     """
     try_keys = [name, f"queue:{name}"]
     for key in try_keys:
@@ -35,81 +61,183 @@ def _queue_len(redis, name: str) -> int:
             pass
     return 0
 
+class MetricsBuffer:
+    """
+    In-process aggregation of worker counters and histograms.
+
+    Observations only touch local dicts; deltas are flushed to METRICS_HASH with one pipelined
+    HINCRBY/HINCRBYFLOAT round trip at most every `flush_interval_s`. Increments are atomic in
+    Redis, so any number of worker processes can flush into the same hash. The first observation
+    in a process starts a daemon timer that flushes on the same interval, so an idle worker still
+    publishes its last deltas.
+    Histogram buckets are stored non-cumulatively and made cumulative at scrape time.
+    """
+    def __init__(
+        self,
+        redis_getter: Callable[[], Redis] = get_redis,
+        key: str = METRICS_HASH,
+        flush_interval_s: float = FLUSH_INTERVAL_S
+    ):
+        self._redis_getter = redis_getter
+        self.key = key
+        self.flush_interval_s = flush_interval_s
+        self._lock = threading.Lock()
+        self._ints: Dict[str, int] = {}
+        self._floats: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        self._timer_pid: Optional[int] = None
+
+    def incr(self, field: str, amount: int = 1):
+        with self._lock:
+            self._ints[field] = self._ints.get(field, 0) + amount
+        self.maybe_flush()
+
+    def observe(self, prefix: str, value: float, buckets: List[float]):
+        le = next((b for b in buckets if value <= b), math.inf)
+        bucket = _bucket_field(prefix, le)
+        with self._lock:
+            self._ints[bucket] = self._ints.get(bucket, 0) + 1
+            self._ints[f"{prefix}:count"] = self._ints.get(f"{prefix}:count", 0) + 1
+            self._floats[f"{prefix}:sum"] = self._floats.get(f"{prefix}:sum", 0.0) + float(value)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        self._ensure_timer()
+        if time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def _ensure_timer(self):
+        # Per process: a prefork child does not inherit its parent's threads
+        pid = os.getpid()
+        if self._timer_pid == pid:
+            return
+        with self._lock:
+            if self._timer_pid == pid:
+                return
+            self._timer_pid = pid
+        threading.Thread(target=self._run_timer, name="metrics-flush", daemon=True).start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval_s)
+            self.maybe_flush()
+
+    def flush(self):
+        with self._lock:
+            ints, floats = self._ints, self._floats
+            self._ints, self._floats = {}, {}
+            self._last_flush = time.monotonic()
+        if not ints and not floats:
+            return
+        try:
+            pipe = self._redis_getter().pipeline(transaction=False)
+            for field, amount in ints.items():
+                pipe.hincrby(self.key, field, amount)
+            for field, amount in floats.items():
+                pipe.hincrbyfloat(self.key, field, amount)
+            pipe.execute()
+        except Exception as e:
+            # Keep the deltas for the next flush rather than dropping them
+            logger.warning(f"metrics_flush failed err={e}")
+            with self._lock:
+                for field, amount in ints.items():
+                    self._ints[field] = self._ints.get(field, 0) + amount
+                for field, amount in floats.items():
+                    self._floats[field] = self._floats.get(field, 0.0) + amount
+
+def _cumulative_buckets(values: Dict[str, str], prefix: str, buckets: List[float]):
+    """
+    Turn stored per-bucket counts into Prometheus cumulative (le, count) pairs.
+    Stored boundaries that are not configured any more are still counted in the next bucket up.
+    """
+    marker = f"{prefix}:bucket:le_"
+    stored = []
+    for field, raw in values.items():
+        if field.startswith(marker):
+            bound = field[len(marker):]
+            stored.append((math.inf if bound == "inf" else float(bound), int(float(raw))))
+    out = []
+    for le in list(buckets) + [math.inf]:
+        out.append((le, sum(count for bound, count in stored if bound <= le)))
+    return out
+
 class RedisCeleryCollector(Collector):
-    def collect(self) -> Iterable[CounterMetricFamily]:
+    def collect(self) -> Iterable[Metric]:
         redis = get_redis()
-        
+        queue_name = os.getenv("CELERY_TAGGING_QUEUE", "tagging")
+
+        # One round trip per scrape
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.hgetall(METRICS_HASH)
+            pipe.llen(queue_name)
+            pipe.hgetall(MIGRATION_KEY)
+            values, queue_len, migration = pipe.execute()
+        except Exception:
+            values, queue_len, migration = {}, 0, {}
+        values = values or {}
+        migration = migration or {}
+
+        def _int(field: str) -> int:
+            try:
+                return int(float(values.get(field) or 0))
+            except ValueError:
+                return 0
+
         # Tasks counter with status label
         counter = CounterMetricFamily(
             "tagging_tasks_total",
             "Total Celery tagging tasks by final status",
             labels=["status"]
         )
-        for label, key in _METRICS["tagging_tasks_total"].items():
-            try:
-                val = int(redis.get(key) or 0)
-            except Exception:
-                val = 0
-            counter.add_metric([label], val)
+        for label, field in _METRICS["tagging_tasks_total"].items():
+            counter.add_metric([label], _int(field))
         yield counter
-        
+
         # Cache hits (no labels)
         cache_hits = CounterMetricFamily(
             "tagging_cache_hits_total",
             "Total cache hits in tagging worker",
             labels=[]
         )
-        try:
-            val = int(redis.get(_METRICS["tagging_cache_hits_total"]["hit"]) or 0)
-        except Exception:
-            val = 0
-        cache_hits.add_metric([], val)
+        cache_hits.add_metric([], _int(_METRICS["tagging_cache_hits_total"]["hit"]))
         yield cache_hits
-        
+
         # Queue length gauge
-        queue_name = os.getenv("CELERY_TAGGING_QUEUE", "tagging")
-        queue_len = _queue_len(redis, queue_name)
-        gauge = CounterMetricFamily(
+        gauge = GaugeMetricFamily(
             "tagging_queue_length",
             f"Current backlog (LLEN) of Celery queue '{queue_name}'",
             labels=[]
         )
-        gauge.add_metric([], queue_len)
+        gauge.add_metric([], int(queue_len or 0))
         yield gauge
-        
+
+        # Progress of the latest cache warm migration
+        progress = GaugeMetricFamily(
+            "tagging_cache_migration_keys",
+            "Keys handled by the latest cache warm migration, by state",
+            labels=["state"]
+        )
+        for state in ("total", "done", "skipped", "failed"):
+            progress.add_metric([state], int(migration.get(state) or 0))
+        yield progress
+
         # Task duration histogram
-        buckets = []
-        for bucket in _HIST_BUCKETS_MS:
-            try:
-                val = int(redis.get(f"{_HIST_PREFIX}:bucket:le_{bucket}") or 0)
-            except Exception:
-                val = 0
-            buckets.append((float(bucket) / 1000.0, val))
-        
-        try:
-            inf_val = int(redis.get(f"{_HIST_PREFIX}:bucket:le_inf") or 0)
-        except Exception:
-            inf_val = 0
-        buckets.append((float("inf"), inf_val))
-        
         try:
-            hist_sum = float(redis.get(f"{_HIST_PREFIX}:sum") or 0.0)
-            hist_count = int(redis.get(f"{_HIST_PREFIX}:count") or 0)
-        except Exception:
-            hist_sum, hist_count = 0.0, 0
-        
+            hist_sum = float(values.get(f"{_HIST_PREFIX}:sum") or 0.0) / 1000.0
+        except ValueError:
+            hist_sum = 0.0
         histogram = HistogramMetricFamily(
             "tagging_task_duration_seconds",
             "Distribution of tagging Celery task durations (seconds)",
             labels=[]
         )
-        histogram.add_sample("tagging_task_duration_seconds_sum", labels=[], value=hist_sum)
-        histogram.add_sample("tagging_task_duration_seconds_count", labels=[], value=hist_count)
-        
-        for le, count in buckets:
-            histogram.add_sample(
-                "tagging_task_duration_seconds_bucket",
-                labels={"le": str(le)},
-                value=count
-            )
+        histogram.add_metric(
+            [],
+            buckets=[
+                ("+Inf" if math.isinf(le) else f"{le / 1000.0:g}", count)
+                for le, count in _cumulative_buckets(values, _HIST_PREFIX, HIST_BUCKETS_MS)
+            ],
+            sum_value=hist_sum
+        )
         yield histogram
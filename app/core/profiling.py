@@ -0,0 +1,122 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+_STAGE_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+_RATIO_BUCKETS = (0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+STAGE_DURATION = Histogram(
+    "tagging_stage_duration_seconds",
+    "Time spent per tagging pipeline stage (seconds)",
+    labelnames=["stage"],
+    buckets=_STAGE_BUCKETS_S
+)
+TOKENS_PROCESSED = Counter(
+    "tagging_tokens_processed_total",
+    "Tokens fed to each model (including special tokens and NLI hypotheses)",
+    labelnames=["model"]
+)
+MODEL_BATCH_SIZE = Histogram(
+    "tagging_model_batch_size",
+    "Number of sequences per model call",
+    labelnames=["model"],
+    buckets=_BATCH_BUCKETS
+)
+MODEL_PADDING_RATIO = Histogram(
+    "tagging_model_padding_ratio",
+    "Fraction of a padded model batch that would be padding tokens",
+    labelnames=["model"],
+    buckets=_RATIO_BUCKETS
+)
+
+# Per-request stage breakdown (ms), only set while a profile is active
+_current: ContextVar[Optional[Dict[str, float]]] = ContextVar("tagging_profile", default=None)
+
+def should_profile(header_value: Optional[str] = None) -> bool:
+    """
+    Profile when the caller asked for it (X-Profile: 1) or when sampled by PROFILE_SAMPLE_RATE.
+    """
+    if header_value and header_value.strip().lower() in ("1", "true", "yes"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+@contextmanager
+def profile(enabled: bool = True) -> Iterator[Optional[Dict[str, float]]]:
+    """
+    Collect a per-stage timing breakdown for everything run inside the block.
+    Yields the breakdown dict (filled in as stages finish), or None when disabled.
+    """
+    if not enabled:
+        yield None
+        return
+    breakdown: Dict[str, float] = {}
+    token = _current.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a pipeline stage into the stage histogram and the active profile, if any.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.labels(name).observe(elapsed)
+        breakdown = _current.get()
+        if breakdown is not None:
+            breakdown[name] = breakdown.get(name, 0.0) + elapsed * 1000.0
+
+def profiling() -> bool:
+    """
+    True while a profile is collecting. Gate work done only to feed a profile on this, so
+    unprofiled requests don't pay for it.
+    """
+    return _current.get() is not None
+
+def pipeline_batch_size(pipe: Any) -> int:
+    """
+    Sequences a transformers pipeline pads and runs per forward pass (1 unless created with batch_size).
+    """
+    return getattr(pipe, "_batch_size", None) or 1
+
+def record_batch(model: str, lengths: List[int], extra_tokens: int = 0, batch_size: Optional[int] = None):
+    """
+    Record token count, batch size and padding ratio for one model call.
+    `lengths` are per-sequence token counts; `extra_tokens` covers tokens not in `lengths`.
+    `batch_size` is how many sequences are padded and run together (default: all of them).
+    """
+    if not lengths:
+        return
+    TOKENS_PROCESSED.labels(model).inc(sum(lengths) + extra_tokens)
+    size = batch_size or len(lengths)
+    for start in range(0, len(lengths), size):
+        chunk = lengths[start:start + size]
+        longest = max(chunk)
+        MODEL_BATCH_SIZE.labels(model).observe(len(chunk))
+        if longest > 0:
+            MODEL_PADDING_RATIO.labels(model).observe(1.0 - sum(chunk) / (len(chunk) * longest))
+
+def format_breakdown(breakdown: Dict[str, float]) -> str:
+    """
+    Render a breakdown as a log-friendly `stage=12.3ms` list.
+    """
+    return " ".join(f"{name}={ms:.1f}ms" for name, ms in breakdown.items())
+
+def server_timing(breakdown: Dict[str, float]) -> str:
+    """
+    Render a breakdown as a Server-Timing header value (shows up in browser devtools).
+    """
+    return ", ".join(f"{name.replace('.', '_')};dur={ms:.2f}" for name, ms in breakdown.items())
@@ -0,0 +1,89 @@
+import json
+import math
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Counter
+
+CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", "600"))
+# Stale-while-revalidate window after the soft TTL; 0 restores hard expiry at CACHE_TTL
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_SECONDS", "300"))
+# XFetch aggressiveness (>1 refreshes earlier); 0 disables probabilistic early refresh
+CACHE_XFETCH_BETA = float(os.getenv("CACHE_XFETCH_BETA", "1.0"))
+# Only one refresh per key is queued within this window
+REFRESH_LOCK_SECONDS = int(os.getenv("CACHE_REFRESH_LOCK_SECONDS", "60"))
+
+CACHE_LOOKUPS = Counter(
+    "tagging_cache_lookups_total",
+    "Sync /v1/tag cache lookups by X-Cache result",
+    labelnames=["result"]
+)
+CACHE_REFRESHES = Counter(
+    "tagging_cache_refreshes_total",
+    "Background cache refreshes queued, by trigger (stale entry or XFetch early refresh)",
+    labelnames=["trigger"]
+)
+
+FRESH, EARLY, STALE = "fresh", "early", "stale"
+
+def meta_key(cache_key: str) -> str:
+    return f"tagmeta:{cache_key}"
+
+def refresh_lock_key(cache_key: str) -> str:
+    return f"refresh:{cache_key}"
+
+def partial_key(cache_key: str) -> str:
+    return f"tagpart:{cache_key}"
+
+def save_partial(redis, cache_key: str, indices: List[int], results: List[Dict[str, Any]], ttl: int = CACHE_TTL):
+    """
+    Record finished per-text results of a request that may not complete before its deadline.
+    """
+    key = partial_key(cache_key)
+    pipe = redis.pipeline(transaction=False)
+    pipe.hset(key, mapping={str(i): json.dumps(r) for i, r in zip(indices, results)})
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+def parse_partial(raw: Dict[str, str]) -> Dict[int, Dict[str, Any]]:
+    """
+    Decode an HGETALL of partial_key(), for callers that read it on their own pipeline.
+    """
+    return {int(i): json.loads(r) for i, r in raw.items()}
+
+def load_partial(redis, cache_key: str) -> Dict[int, Dict[str, Any]]:
+    return parse_partial(redis.hgetall(partial_key(cache_key)))
+
+def store(pipe, cache_key: str, encoded: bytes, compute_ms: float, ttl: int = CACHE_TTL):
+    """
+    Queue (on a pipeline) a response plus its recompute cost, both living for the soft TTL
+    plus the stale window.
+    """
+    hard_ttl = ttl + CACHE_STALE_TTL
+    pipe.setex(f"tagresp:{cache_key}", hard_ttl, encoded)
+    pipe.setex(meta_key(cache_key), hard_ttl, int(compute_ms))
+
+def freshness(
+    pttl_ms: Optional[int],
+    compute_ms: Optional[str],
+    beta: float = CACHE_XFETCH_BETA,
+    rand: Optional[float] = None
+) -> str:
+    """
+    Classify a cached entry from its remaining hard TTL:
+    - STALE once past the soft TTL (inside the stale window)
+    - EARLY when XFetch decides to refresh ahead of the soft TTL: the chance grows as expiry
+      nears and with the entry's recompute cost, spreading refreshes of hot keys out
+    - FRESH otherwise (also for entries without a TTL)
+    """
+    if pttl_ms is None or pttl_ms < 0:
+        return FRESH
+    soft_remaining_ms = pttl_ms - CACHE_STALE_TTL * 1000
+    if soft_remaining_ms <= 0:
+        return STALE
+    if beta > 0 and compute_ms:
+        r = rand if rand is not None else random.random()
+        if -float(compute_ms) * beta * math.log(max(r, 1e-12)) >= soft_remaining_ms:
+            return EARLY
+    return FRESH
@@ -0,0 +1,203 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", "")
+RESULT_STORE_MAX_MB = float(os.getenv("RESULT_STORE_MAX_MB", "1024"))
+
+# SQLite caps bound parameters per statement; stay well below it
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    digest TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (digest, model_version, config_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at);
+"""
+
+class ResultStore:
+    """
+    Durable per-text model outputs keyed by (text digest, model version, config hash), in a
+    local SQLite file. Sits behind the Redis response cache so re-tagging unchanged texts is a
+    lookup instead of a forward pass.
+
+    Connections are per thread and per process (safe under FastAPI's threadpool and Celery
+    prefork). Reads only note which rows they hit; access times are written in batches of
+    `touch_every` rows (and before compacting), so a read is a SELECT and nothing more. Every
+    `compact_every` writes a background thread runs `compact()`, which drops the least recently
+    read rows down to 90% of `max_mb` once the stored payload exceeds it.
+    """
+    def __init__(
+        self,
+        path: str,
+        max_mb: float = RESULT_STORE_MAX_MB,
+        compact_every: int = 1000,
+        touch_every: int = 500
+    ):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.compact_every = compact_every
+        self.touch_every = touch_every
+        self._local = threading.local()
+        self._writes_since_compact = 0
+        self._touched: Dict[Tuple[str, str, str], float] = {}
+        self._compacting = False
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get_many(self, model_version: str, config_hash: str, digests: Iterable[str]) -> Dict[str, Any]:
+        """
+        Bulk lookup; returns {digest: value} for the digests that are stored.
+        """
+        wanted = list(dict.fromkeys(digests))
+        found: Dict[str, Any] = {}
+        conn = self._conn()
+        for start in range(0, len(wanted), _CHUNK):
+            chunk = wanted[start:start + _CHUNK]
+            rows = conn.execute(
+                "SELECT digest, value FROM results WHERE model_version = ? AND config_hash = ? "
+                f"AND digest IN ({','.join('?' * len(chunk))})",
+                (model_version, config_hash, *chunk)
+            ).fetchall()
+            for digest, value in rows:
+                found[digest] = loads(value)
+        if found:
+            now = time.time()
+            with self._lock:
+                for digest in found:
+                    self._touched[(digest, model_version, config_hash)] = now
+                due = len(self._touched) >= self.touch_every
+            if due:
+                self.flush_access_times()
+        return found
+
+    def flush_access_times(self):
+        """
+        Write the access times noted by reads since the last flush. Failures are logged and the
+        times dropped: they only steer eviction, so they never fail a read.
+        """
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
+        rows = [(at, digest, version, config) for (digest, version, config), at in touched.items()]
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "UPDATE results SET accessed_at = ? WHERE digest = ? AND model_version = ? AND config_hash = ?",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"result_store access time update failed rows={len(touched)} err={e}")
+
+    def put_many(self, model_version: str, config_hash: str, items: Dict[str, Any]):
+        """
+        Bulk upsert of {digest: value}.
+        """
+        if not items:
+            return
+        now = time.time()
+        rows: List[Tuple[str, str, str, bytes, int, float]] = []
+        for digest, value in items.items():
+            encoded = dumps(value)
+            rows.append((digest, model_version, config_hash, encoded, len(encoded), now))
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._writes_since_compact += len(rows)
+            due = self._writes_since_compact >= self.compact_every and not self._compacting
+            if due:
+                self._writes_since_compact = 0
+                self._compacting = True
+        if due:
+            # compact() scans the whole table; keep it off the request path
+            threading.Thread(target=self._compact_in_background, name="result-store-compact", daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.warning(f"result_store compact failed err={e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def size_bytes(self) -> int:
+        return int(self._conn().execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0])
+
+    def compact(self, vacuum: bool = False) -> int:
+        """
+        Enforce the size cap by evicting least recently read rows. Returns rows deleted.
+        `vacuum=True` also returns freed pages to the filesystem (slow; for maintenance windows).
+        """
+        self.flush_access_times()
+        conn = self._conn()
+        total = self.size_bytes()
+        deleted = 0
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.9)
+            excess = total - target
+            cutoff_rows = conn.execute(
+                "SELECT accessed_at, size FROM results ORDER BY accessed_at ASC"
+            )
+            freed, cutoff = 0, None
+            for accessed_at, size in cutoff_rows:
+                freed += size
+                cutoff = accessed_at
+                if freed >= excess:
+                    break
+            if cutoff is not None:
+                deleted = conn.execute("DELETE FROM results WHERE accessed_at <= ?", (cutoff,)).rowcount
+                logger.info(f"result_store compact deleted={deleted} freed_bytes={freed} size_bytes={total}")
+        if vacuum:
+            conn.execute("VACUUM")
+        return deleted
+
+_store: Optional[ResultStore] = None
+
+def get_result_store() -> Optional[ResultStore]:
+    """
+    Process-wide store, or None when RESULT_STORE_PATH is not configured.
+    """
+    global _store
+    if _store is None and RESULT_STORE_PATH:
+        _store = ResultStore(RESULT_STORE_PATH)
+    return _store
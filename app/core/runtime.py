@@ -0,0 +1,136 @@
+import contextlib
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger("text-tagger.runtime")
+
+# 0 / unset = derive from the core count and the process count
+TORCH_INTRA_OP_THREADS = int(os.getenv("TORCH_INTRA_OP_THREADS", "0"))
+TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS", "0"))
+# Pin each process to its own slice of cores (only when processes <= cores)
+TORCH_PIN_CPUS = os.getenv("TORCH_PIN_CPUS", "0") == "1"
+# Processes sharing the node's cores per role; match --concurrency / uvicorn --workers
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# "compile" wraps model forwards in torch.compile; compiled kernels are cached under TORCH_HOME
+MODEL_COMPILE = os.getenv("MODEL_COMPILE", "off").lower()
+TORCH_HOME = os.getenv("TORCH_HOME", os.path.expanduser("~/.cache/torch"))
+
+class RuntimeLayout(NamedTuple):
+    role: str
+    cpus: int
+    processes: int
+    slot: int
+    intra_op_threads: int
+    interop_threads: int
+    affinity: Optional[List[int]]
+
+def available_cpus() -> List[int]:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+def plan_layout(
+    role: str,
+    processes: int,
+    slot: int = 0,
+    cpus: Optional[List[int]] = None,
+    intra_op: int = TORCH_INTRA_OP_THREADS,
+    interop: int = TORCH_INTEROP_THREADS,
+    pin: bool = TORCH_PIN_CPUS
+) -> RuntimeLayout:
+    """
+    Split the available cores evenly across `processes` so they don't oversubscribe:
+    each gets cores // processes intra-op threads (at least 1) and a single inter-op thread
+    (our pipelines run one forward at a time). With `pin`, process `slot` is bound to its own
+    contiguous slice of cores.
+    """
+    cpus = cpus if cpus is not None else available_cpus()
+    processes = max(1, processes)
+    share = max(1, len(cpus) // processes)
+    intra = intra_op or share
+    affinity = None
+    if pin and processes <= len(cpus):
+        start = (slot % processes) * share
+        affinity = cpus[start:start + share]
+    return RuntimeLayout(role, len(cpus), processes, slot, intra, interop or 1, affinity)
+
+@lru_cache(maxsize=1)
+def _torch():
+    try:
+        import torch
+        return torch
+    except ImportError:
+        return None
+
+def configure(role: str, processes: int, slot: int = 0, layout: Optional[RuntimeLayout] = None) -> RuntimeLayout:
+    """
+    Apply the planned (or given) layout to this process and log it. Call before the first
+    forward pass; torch refuses to change inter-op threads once parallel work has started.
+    """
+    layout = layout or plan_layout(role, processes, slot)
+    if layout.affinity and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, layout.affinity)
+        except OSError as e:
+            logger.warning(f"runtime affinity failed cpus={layout.affinity} err={e}")
+
+    # Native pools (OpenMP / MKL) that have not started yet pick these up
+    os.environ.setdefault("OMP_NUM_THREADS", str(layout.intra_op_threads))
+    os.environ.setdefault("MKL_NUM_THREADS", str(layout.intra_op_threads))
+
+    torch = _torch()
+    if torch is not None:
+        torch.set_num_threads(layout.intra_op_threads)
+        try:
+            torch.set_num_interop_threads(layout.interop_threads)
+        except RuntimeError as e:
+            logger.warning(f"runtime interop threads unchanged err={e}")
+
+    logger.info(
+        f"runtime_layout role={role} pid={os.getpid()} cpus={layout.cpus} processes={layout.processes} " \
+        f"slot={layout.slot} intra_op={layout.intra_op_threads} interop={layout.interop_threads} " \
+        f"affinity={layout.affinity or 'all'} torch={torch is not None}"
+    )
+    return layout
+
+def maybe_compile(pipe: Any, model_name: str):
+    """
+    Swap a pipeline's model for torch.compile(model) when MODEL_COMPILE=compile and torch supports it.
+    Inductor's FX graph and kernel caches go to $TORCH_HOME/inductor, so restarts reuse the
+    compiled artifacts instead of recompiling. Compilation itself happens lazily, on the first
+    forward pass per input shape, which is what the startup warm-up grid is for.
+    """
+    if MODEL_COMPILE != "compile":
+        return
+    torch = _torch()
+    if torch is None or not hasattr(torch, "compile"):
+        logger.warning(f"MODEL_COMPILE=compile but torch.compile is unavailable; model={model_name} runs eager")
+        return
+
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.join(TORCH_HOME, "inductor"))
+    try:
+        from torch._inductor import config as inductor_config
+        inductor_config.fx_graph_cache = True
+    except Exception:
+        pass
+    try:
+        pipe.model = torch.compile(pipe.model, dynamic=True)
+        logger.info(f"model_compile ok model={model_name} cache_dir={os.environ['TORCHINDUCTOR_CACHE_DIR']}")
+    except Exception as e:
+        logger.warning(f"model_compile failed model={model_name} err={e}")
+
+@contextlib.contextmanager
+def inference_mode() -> Iterator[None]:
+    """
+    torch.inference_mode() when torch is installed (no autograd bookkeeping), else a no-op.
+    """
+    torch = _torch()
+    if torch is None:
+        yield
+        return
+    with torch.inference_mode():
+        yield
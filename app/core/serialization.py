@@ -0,0 +1,34 @@
+from typing import Any, Optional, Union
+
+import msgpack
+import orjson
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ACCEPT = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+def dumps(obj: Any) -> bytes:
+    """
+    Compact UTF-8 JSON, the format stored in the result cache and sent on the wire.
+    """
+    return orjson.dumps(obj)
+
+def loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data)
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the response media type from an Accept header: JSON unless msgpack is asked for
+    explicitly (no q-value ranking).
+    """
+    if accept and any(media in accept for media in _MSGPACK_ACCEPT):
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+def encode_json_body(body: Union[bytes, str], media_type: str) -> Union[bytes, str]:
+    """
+    Turn an already-encoded JSON body into `media_type`. JSON passes through untouched.
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(loads(body), use_bin_type=True)
+    return body
@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from prometheus_client import Counter
+from redis import Redis, WatchError
+
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "1") == "1"
+# Lease should outlive a typical compute; waiters give up (and compute themselves) after WAIT_MS
+SINGLEFLIGHT_LEASE_MS = int(os.getenv("SINGLEFLIGHT_LEASE_MS", "15000"))
+SINGLEFLIGHT_WAIT_MS = int(os.getenv("SINGLEFLIGHT_WAIT_MS", "10000"))
+
+SINGLEFLIGHT_CALLS = Counter(
+    "tagging_singleflight_total",
+    "Sync cache misses by how they were resolved (leader computed, waited locally or on another instance, "
+    "or gave up waiting and computed)",
+    labelnames=["outcome"]
+)
+
+class _Call:
+    __slots__ = ("event", "value", "ok")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.ok = False
+
+class SingleFlight:
+    """
+    Collapse concurrent computations of the same cache key into one.
+
+    Within a process, followers wait on the leader's Event and share its value. Across
+    processes, the leader holds a short Redis lease (`sf:{key}`, SET NX PX) and the others
+    poll the result key until it appears, the lease disappears without a result (leader
+    failed), or `wait_ms` passes; in those last two cases they compute it themselves.
+    """
+    def __init__(
+        self,
+        redis_getter: Callable[[], Redis] = get_redis,
+        lease_ms: int = SINGLEFLIGHT_LEASE_MS,
+        wait_ms: int = SINGLEFLIGHT_WAIT_MS,
+        poll_ms: Tuple[int, int] = (10, 100)
+    ):
+        self._redis_getter = redis_getter
+        self.lease_ms = lease_ms
+        self.wait_ms = wait_ms
+        self.poll_ms = poll_ms
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def run(
+        self,
+        key: str,
+        result_key: str,
+        compute: Callable[[], Any],
+        accept: Callable[[str], bool] = bool
+    ) -> Tuple[Any, str]:
+        """
+        Returns (value, outcome), outcome one of "leader", "local", "remote", "timeout".
+        `compute` must also store its value under `result_key`; `accept` filters stored
+        values that should not be shared (e.g. error payloads).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.event.wait(self.wait_ms / 1000.0) and call.ok:
+                return self._done(call.value, "local")
+            return self._done(compute(), "timeout")
+
+        try:
+            value, outcome = self._lead(key, result_key, compute, accept)
+            call.value, call.ok = value, True
+            return self._done(value, outcome)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _lead(self, key: str, result_key: str, compute: Callable[[], Any], accept: Callable[[str], bool]):
+        redis = self._redis_getter()
+        lease_key, token = f"sf:{key}", uuid.uuid4().hex
+        try:
+            acquired = bool(redis.set(lease_key, token, nx=True, px=self.lease_ms))
+        except Exception as e:
+            logger.warning(f"singleflight lease failed key={key} err={e}")
+            return compute(), "leader"
+
+        if acquired:
+            try:
+                return compute(), "leader"
+            finally:
+                self._release(redis, lease_key, token)
+
+        value = self._wait_remote(redis, lease_key, result_key, accept)
+        if value is not None:
+            return value, "remote"
+        return compute(), "timeout"
+
+    def _wait_remote(
+        self, redis: Redis, lease_key: str, result_key: str, accept: Callable[[str], bool]
+    ) -> Optional[str]:
+        deadline = time.monotonic() + self.wait_ms / 1000.0
+        delay_ms, max_delay_ms = self.poll_ms
+        while time.monotonic() < deadline:
+            time.sleep(min(delay_ms / 1000.0, max(0.0, deadline - time.monotonic())))
+            pipe = redis.pipeline(transaction=False)
+            pipe.get(result_key)
+            pipe.exists(lease_key)
+            raw, leased = pipe.execute()
+            if raw and accept(raw):
+                return raw
+            if not leased:
+                return None
+            delay_ms = min(delay_ms * 2, max_delay_ms)
+        return None
+
+    def _release(self, redis: Redis, lease_key: str, token: str):
+        # Compare-and-delete so an expired lease re-taken by someone else is left alone
+        try:
+            with redis.pipeline() as pipe:
+                pipe.watch(lease_key)
+                if pipe.get(lease_key) == token:
+                    pipe.multi()
+                    pipe.delete(lease_key)
+                    pipe.execute()
+        except WatchError:
+            pass
+        except Exception as e:
+            logger.warning(f"singleflight release failed key={lease_key} err={e}")
+
+    def _done(self, value: Any, outcome: str) -> Tuple[Any, str]:
+        SINGLEFLIGHT_CALLS.labels(outcome=outcome).inc()
+        return value, outcome
@@ -7,11 +7,19 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from prometheus_client import REGISTRY
 from prometheus_fastapi_instrumentator import Instrumentator, metrics
+from starlette.concurrency import run_in_threadpool
 
+from app.api.v1 import admin as admin_router
 from app.api.v1 import auth as auth_router
+from app.api.v1 import internal as internal_router
 from app.api.v1 import tag
-from app.core.metrics import RedisCeleryCollector, _queue_len
+from app.core import runtime
+from app.core.capture import CAPTURE_ENABLED, RequestCapture
+from app.core.metrics import RedisCeleryCollector
 from app.core.redis_client import get_redis
+from app.core.runtime import API_WORKERS
+from app.services.health import READY_MAX_QUEUE_LENGTH, HealthMonitor
+from app.services.warmup import WARMUP_ENABLED, warm_up
 from app.workers.celery_app import celery_app
 
 START_TS = time.time()
@@ -20,31 +28,35 @@ VERSION = os.getenv("VERSION", "0.1.0")
 logger = logging.getLogger("text-tagger")
 logging.basicConfig(level=logging.INFO)
 
+# Sampled request capture for offline replay (benchmarks.replay); off unless CAPTURE_ENABLED=1
+capture = RequestCapture() if CAPTURE_ENABLED else None
+# Probes serve its latest snapshot; checks run in the background (started in lifespan)
+health_monitor = HealthMonitor(get_redis, celery_app)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("api_startup begin")
+    runtime.configure("api", API_WORKERS)
     
     try:
         REGISTRY.register(RedisCeleryCollector())
     except ValueError:
         pass
     
-    try:
-        redis = get_redis()
-        ok = redis.ping()
-        logger.info(f"redis_ping ok={ok}")
-    except Exception as e:
-        logger.warning(f"redis_ping failed err={e}")
+    # First snapshot (Redis / Celery / queue) before traffic; the monitor keeps it fresh from here on
+    health_monitor.refresh()
+    health_monitor.start()
     
-    try:
-        replies = celery_app.control.ping(timeout=1)
-        logger.info(f"celery_ping replies={replies}")
-    except Exception as e:
-        logger.warning(f"celery_ping failed err={e}")
+    if WARMUP_ENABLED:
+        try:
+            warm_up(tag.tagger, "api")
+        except Exception as e:
+            logger.warning(f"api_warmup failed err={e}")
     
     logger.info("api_startup ok")
     yield
     
+    await health_monitor.stop()
     try:
         try:
             redis = get_redis()
@@ -64,6 +76,8 @@ app = FastAPI(
 
 app.include_router(tag.router, prefix="/v1", tags=["tagging"])
 app.include_router(auth_router.router, prefix="/v1/auth", tags=["auth"])
+app.include_router(admin_router.router, prefix="/v1/admin", tags=["admin"])
+app.include_router(internal_router.router, prefix="/v1/internal", tags=["internal"])
 
 instr = Instrumentator(
     should_group_status_codes=True,
@@ -84,11 +98,21 @@ instr.instrument(app).expose(app, endpoint="/metrics", tags=["ops"])
 async def log_requests(request: Request, call_next):
     rid = request.headers.get("x-request-id") or str(uuid.uuid4())
     start = time.time()
+    # Lets handlers measure how long they waited for a threadpool slot (load shedding)
+    request.state.received_at = time.perf_counter()
+    # Starlette replays a body read here to the endpoint, so only sampled requests pay for it
+    recorder, body = capture, None
+    if recorder is not None and recorder.sampled(request.method, request.url.path):
+        body = await request.body()
     response = await call_next(request)
     dur_ms = int((time.time() - start) * 1000)
     logger.info(
         f"rid={rid} method={request.method} path={request.url.path} status={response.status_code} duration={dur_ms}ms"
     )
+    if recorder is not None and body is not None:
+        # JSON parsing and the file write would otherwise block the event loop
+        cache = response.headers.get("x-cache")
+        await run_in_threadpool(recorder.record, request.url.path, body, response.status_code, dur_ms, cache, start)
     response.headers["x-request-id"] = rid
     return response
 
@@ -108,65 +132,47 @@ def favicon():
 def health_check():
     """
     Liveness: process is up and event loop is responsive.
-    Redis ping is informational; failure does not flip to 503.
+    Redis status comes from the background health snapshot and is informational;
+    failure (or a stale snapshot) does not flip to 503.
     """
-    info = {
-        "status": "up",
+    snapshot = health_monitor.snapshot()
+    stale = health_monitor.is_stale(snapshot)
+    return {
+        "status": "up" if snapshot.redis and not stale else "degraded",
         "version": VERSION,
         "uptime_s": int(time.time() - START_TS),
-        "redis": False
+        "redis": snapshot.redis,
+        "checked_s_ago": round(health_monitor.age(snapshot), 3),
+        "stale": stale
     }
-    try:
-        redis = get_redis()
-        info["redis"] = bool(redis.ping())
-    except Exception:
-        pass
-    
-    if not info["redis"]:
-        info["status"] = "degraded"
-    return info
 
 @app.get("/readyz", tags=["ops"])
 def readiness_check():
     """
-    Readiness = can this instance handle traffic right now?
+    Readiness = can this instance handle traffic right now? Read from the background
+    health snapshot, so probes do no I/O:
     - Redis ping ok
     - Celery ping gets >= 1 reply
-    - (Optional) Queue length not absurdly high
+    - Queue length not above READY_MAX_QUEUE_LENGTH
+    - Snapshot not stale (the monitor itself is running)
     """
-    details = {"redis": False, "celery_replies": 0, "queue_length": None}
-    ok = True
-    
-    # Redis ping
-    try:
-        redis = get_redis()
-        details["redis"] = bool(redis.ping())
-    except Exception as e:
-        logger.warning(f"readyz: redis ping failed: {e}")
-        ok = False
-    
-    # Celery ping
-    try:
-        replies = celery_app.control.ping(timeout=1) or []
-        details["celery_replies"] = len(replies)
-        if len(replies) == 0:
-            ok = False
-    except Exception as e:
-        logger.warning(f"readyz: celery ping failed: {e}")
-        ok = False
-    
-    # Queue length check
-    try:
-        queue_name = os.getenv("CELERY_TAGGING_QUEUE", "tagging")
-        queue_len = _queue_len(get_redis(), queue_name)
-        details["queue_length"] = queue_len
-        if queue_len > 1000:
-            ok = False
-    except Exception as e:
-        logger.warning(f"readyz: queue length check failed: {e}")
-        ok = False
-    
+    snapshot = health_monitor.snapshot()
+    stale = health_monitor.is_stale(snapshot)
+    details = {
+        "redis": snapshot.redis,
+        "celery_replies": snapshot.celery_replies,
+        "queue_length": snapshot.queue_length,
+        "checked_s_ago": round(health_monitor.age(snapshot), 3),
+        "stale": stale
+    }
+    ok = (
+        snapshot.redis
+        and snapshot.celery_replies > 0
+        and snapshot.queue_length is not None
+        and snapshot.queue_length <= READY_MAX_QUEUE_LENGTH
+        and not stale
+    )
     if not ok:
-        raise HTTPException(status_code=503, detail={"ready": False, **details})
+        raise HTTPException(status_code=503, detail={"ready": False, **details, "errors": snapshot.errors})
 
     return {"ready": True, **details}
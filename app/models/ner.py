@@ -3,14 +3,19 @@ from typing import Dict, List
 
 from transformers import pipeline
 
+from app.core.profiling import pipeline_batch_size, profiling, record_batch, stage
+from app.core.runtime import inference_mode, maybe_compile
+
 
 class NERModel:
     def __init__(self, model_name: str = "dslim/bert-base-NER"):
+        self.model_name = model_name
         self.pipeline = pipeline(
             task="token-classification",
             model=model_name,
             aggregation_strategy="simple"
         )
+        maybe_compile(self.pipeline, model_name)
         self.min_score = 0.6
         self.min_len = 2
     
@@ -18,26 +23,41 @@ class NERModel:
         s = s.strip().strip(string.punctuation + "“”‘’")
         return " ".join(s.split())
 
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        tokenizer = getattr(self.pipeline, "tokenizer", None)
+        if tokenizer is None:
+            return []
+        return [len(ids) for ids in tokenizer(texts, truncation=True)["input_ids"]]
+
     def predict(self, texts: List[str]) -> List[List[Dict]]:
         if isinstance(texts, str):
             texts = [texts]
         
-        raw = self.pipeline(texts)
+        # A separate tokenizer pass, so token / batch stats are only collected for profiled calls
+        if profiling():
+            with stage("ner.token_stats"):
+                record_batch(
+                    self.model_name, self._token_lengths(texts), batch_size=pipeline_batch_size(self.pipeline)
+                )
+        
+        with stage("ner.forward"), inference_mode():
+            raw = self.pipeline(texts)
         if isinstance(raw, dict):
             raw = [raw]
         
-        results = []
-        for entities in raw:
-            cleaned = []
-            for entity in entities:
-                # entity = {'entity_group': 'ORG', 'word': 'NVIDIA', 'score': 0.99, 'start':..,'end':..}
-                text = self._clean_text(entity.get("word") or entity.get("entity") or "")
-                if not text or len(text.replace("#", "")) < self.min_len:
-                    continue
-                score = float(entity.get("score", 0.0))
-                if score < self.min_score:
-                    continue
-                label = entity.get("entity_group") or entity.get("entity") or "MISC"
-                cleaned.append({"text": text, "label": label, "score": score})
-            results.append(cleaned)
+        with stage("ner.postprocess"):
+            results = []
+            for entities in raw:
+                cleaned = []
+                for entity in entities:
+                    # entity = {'entity_group': 'ORG', 'word': 'NVIDIA', 'score': 0.99, 'start':..,'end':..}
+                    text = self._clean_text(entity.get("word") or entity.get("entity") or "")
+                    if not text or len(text.replace("#", "")) < self.min_len:
+                        continue
+                    score = float(entity.get("score", 0.0))
+                    if score < self.min_score:
+                        continue
+                    label = entity.get("entity_group") or entity.get("entity") or "MISC"
+                    cleaned.append({"text": text, "label": label, "score": score})
+                results.append(cleaned)
         return results
@@ -0,0 +1,80 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+def estimate_size_mb(model: Any, default_mb: float) -> float:
+    """
+    Parameter memory of a pipeline-backed model, or `default_mb` when it can't be inspected.
+    """
+    try:
+        params = model.pipeline.model.parameters()
+        return sum(p.numel() * p.element_size() for p in params) / (1024 * 1024)
+    except Exception:
+        return default_mb
+
+class ModelPool:
+    """
+    Lazily loaded models, evicted least-recently-used first once the total estimated size
+    exceeds `budget_mb`. The most recently requested model is never evicted, even if it alone
+    is over budget.
+    """
+    def __init__(self, loader: Callable[[str, str], Any], budget_mb: float, default_size_mb: float = 500.0):
+        self._loader = loader
+        self.budget_mb = budget_mb
+        self.default_size_mb = default_size_mb
+        self._entries: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+        # Guards _entries / _loading only; never held while a model loads
+        self._lock = threading.Lock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[0]
+
+    def get(self, kind: str, model_name: str) -> Any:
+        key = (kind, model_name)
+        found, model = self._lookup(key)
+        if found:
+            return model
+
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        # One load per model at a time; lookups of other (or loaded) models don't wait for it
+        with load_lock:
+            found, model = self._lookup(key)
+            if found:
+                return model
+            try:
+                model = self._loader(kind, model_name)
+                size_mb = estimate_size_mb(model, self.default_size_mb)
+                with self._lock:
+                    self._entries[key] = (model, size_mb)
+                    self._evict()
+            finally:
+                with self._lock:
+                    if self._loading.get(key) is load_lock:
+                        del self._loading[key]
+        logger.info(f"model_pool load kind={kind} model={model_name} size_mb={size_mb:.0f}")
+        return model
+
+    def _evict(self):
+        while len(self._entries) > 1 and self.used_mb > self.budget_mb:
+            (kind, model_name), (_, size_mb) = self._entries.popitem(last=False)
+            logger.info(f"model_pool evict kind={kind} model={model_name} size_mb={size_mb:.0f}")
+
+    @property
+    def used_mb(self) -> float:
+        return sum(size for _, size in self._entries.values())
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,33 +1,79 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from transformers import pipeline
 
+from app.core.profiling import pipeline_batch_size, profiling, record_batch, stage
+from app.core.runtime import inference_mode, maybe_compile
+
+# Default template used by the zero-shot pipeline to turn labels into NLI hypotheses
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
 
 class TopicClassifier:
     def __init__(self, labels: List[str] | None = None, model_name: str = "facebook/bart-large-mnli"):
+        self.model_name = model_name
         self.labels = labels or [
             "technology", "business", "entertainment", "sports", "politics", "food", "pop culture",
             "science", "health", "finance", "gaming", "travel", "education", "music"
         ]
         self.pipeline = pipeline("zero-shot-classification", model=model_name)
+        maybe_compile(self.pipeline, model_name)
         
         # Tunable
         self.threshold = 0.7
         self.top_k = 5
 
-    def predict(self, texts: List[str]) -> List[str]:
+    def _token_lengths(self, texts: List[str], labels: List[str]) -> List[int]:
         """
-        Returns for each text a list of {label, score} dicts, sorted by score descending and
-        filtered by threshold, capped to top_k. Multi-label enabled.
+        Token counts of each (text, hypothesis) pair the pipeline will run, one per label.
         """
-        outputs = self.pipeline(texts, candidate_labels=self.labels, multi_label=True)
+        tokenizer = getattr(self.pipeline, "tokenizer", None)
+        if tokenizer is None:
+            return []
+        text_lens = [len(ids) for ids in tokenizer(texts, truncation=True)["input_ids"]]
+        hyp_lens = [
+            len(ids) for ids in tokenizer(
+                [HYPOTHESIS_TEMPLATE.format(label) for label in labels], add_special_tokens=False
+            )["input_ids"]
+        ]
+        return [text_len + hyp_len for text_len in text_lens for hyp_len in hyp_lens]
+
+    def predict_scores(self, texts: List[str], labels: Optional[List[str]] = None) -> List[Dict[str, float]]:
+        """
+        Returns for each text the unfiltered {label: score} map over all labels (or over `labels`).
+        """
+        labels = labels or self.labels
+        # A separate tokenizer pass (text x hypothesis), so only collected for profiled calls
+        if profiling():
+            with stage("topics.token_stats"):
+                record_batch(
+                    self.model_name,
+                    self._token_lengths([texts] if isinstance(texts, str) else texts, labels),
+                    batch_size=pipeline_batch_size(self.pipeline)
+                )
+        
+        with stage("topics.forward"), inference_mode():
+            outputs = self.pipeline(texts, candidate_labels=labels, multi_label=True)
         if isinstance(texts, str):
             outputs = [outputs]
-        
-        results = []
-        for output in outputs:
-            pairs = list(zip(output["labels"], output["scores"]))
-            pairs.sort(key=lambda x: x[1], reverse=True)
-            filtered = [{"label": label, "score": float(score)} for label, score in pairs if score >= self.threshold]
-            results.append(filtered[:self.top_k])
-        return results
+        return [dict(zip(output["labels"], map(float, output["scores"]))) for output in outputs]
+
+    def select(
+        self, scores: Dict[str, float], threshold: Optional[float] = None, top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Labels at or above threshold as {label, score} dicts, sorted by score descending, capped to top_k.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        top_k = self.top_k if top_k is None else top_k
+        pairs = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return [{"label": label, "score": score} for label, score in pairs if score >= threshold][:top_k]
+
+    def predict(self, texts: List[str]) -> List[List[Dict]]:
+        """
+        Returns for each text a list of {label, score} dicts, sorted by score descending and
+        filtered by threshold, capped to top_k. Multi-label enabled.
+        """
+        scores = self.predict_scores(texts)
+        with stage("topics.postprocess"):
+            return [self.select(text_scores) for text_scores in scores]
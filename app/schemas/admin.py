@@ -0,0 +1,34 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class MigrationRequest(BaseModel):
+    source_fingerprint: Optional[str] = Field(
+        None,
+        description="Fingerprint whose hot keys to re-tag; defaults to this API instance's current config"
+    )
+    tenant: Optional[str] = Field(
+        None, description="Tenant the source fingerprint belongs to (its own taxonomy); default config if unset"
+    )
+    limit: int = Field(1000, ge=1, le=100000, description="Number of hottest cached responses to re-tag")
+
+class MigrationSubmitResponse(BaseModel):
+    job_id: str
+    source_fingerprint: str
+
+class MigrationStatusResponse(BaseModel):
+    fingerprint: str = Field(..., description="Config fingerprint of this API instance")
+    migration: Dict[str, str] = Field(default_factory=dict, description="Latest migration progress")
+
+class AllocationSite(BaseModel):
+    location: str = Field(..., description="file:line, innermost first when grouped by traceback")
+    size_kb: float
+    size_diff_kb: float = Field(..., description="Growth since the baseline")
+    count: int
+    count_diff: int
+
+class MemoryReportResponse(BaseModel):
+    traced_kb: float
+    peak_kb: float
+    top: List[AllocationSite] = Field(default_factory=list, description="Sites ordered by growth since the baseline")
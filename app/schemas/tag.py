@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Annotated, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_serializer
 
 SmallBatch = Annotated[List[str], Field(min_length=1, max_items=1000)]
 
@@ -12,6 +12,11 @@ class JobStatus(str, Enum):
     FAILURE="FAILURE"
     SUCCESS="SUCCESS"
 
+class TagTask(str, Enum):
+    NER="ner"
+    TOPICS="topics"
+    DOMAIN="domain"
+
 class ErrorInfo(BaseModel):
     code: str
     message: str
@@ -32,6 +37,17 @@ class TagRequest(BaseModel):
         description="Optional list of domain-specific keywords to bias tagging",
         examples=[["technology", "AI", "NVIDIA"]]
     )
+    tasks: Optional[List[TagTask]] = Field(
+        None,
+        description="Stages to run (default: all). Skipped stages are returned as null",
+        examples=[["domain"], ["ner", "topics"]]
+    )
+    timeout_ms: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Time budget; texts not finished in time are listed in `unprocessed` (also see X-Deadline)",
+        examples=[200]
+    )
 
 class Entity(BaseModel):
     text: str = Field(..., description="The surface form of the entity")
@@ -41,6 +57,18 @@ class Entity(BaseModel):
 class TopicScore(BaseModel):
     label: str = Field(..., description="Topic label")
     score: float = Field(..., ge=0.0, le=1.0, description="Model confidence for this topic")
+    path: Optional[List[str]] = Field(
+        None,
+        description="Taxonomy path from the top-level category down to this label (hierarchical taxonomies only)"
+    )
+
+    @model_serializer(mode="wrap")
+    def _omit_flat_path(self, handler):
+        # Flat labels have no path; keep them shaped exactly like the raw (cached) topic dicts
+        data = handler(self)
+        if data.get("path") is None:
+            data.pop("path", None)
+        return data
 
 class TagResult(BaseModel):
     text: str
@@ -51,6 +79,10 @@ class TagResult(BaseModel):
 
 class TagResponse(BaseModel):
     results: List[TagResult]
+    unprocessed: Optional[List[int]] = Field(
+        None,
+        description="Input indices not tagged before the deadline; `results` holds the others, in input order"
+    )
 
 class BatchSubmitResponse(BaseModel):
     job_id: str
@@ -59,3 +91,8 @@ class BatchStatusResponse(BaseModel):
     status: JobStatus
     result: Optional[TagResponse] = None
     error: Optional[ErrorInfo] = None
+    # Set once a job's rows are stored: `result` is only inlined up to BATCH_STATUS_MAX_ROWS,
+    # past that the rows are read page by page from `results_url`
+    total: Optional[int] = None
+    unprocessed_count: Optional[int] = None
+    results_url: Optional[str] = None
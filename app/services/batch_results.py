@@ -0,0 +1,98 @@
+import json
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, cast
+
+from redis import Redis
+
+from app.core.serialization import dumps, loads
+from app.workers.celery_app import RESULT_EXPIRES
+
+# Rows per LRANGE / RPUSH round trip
+ROWS_PAGE = 200
+
+def rows_key(cache_key: str) -> str:
+    """
+    Complete batch results for a request: one list element per text, in input order.
+    """
+    return f"tagrows:{cache_key}"
+
+def partial_rows_key(job_id: str) -> str:
+    # Deadline-cut results belong to their job only; they must never answer another request
+    return f"tagrows:job:{job_id}"
+
+def job_key(job_id: str) -> str:
+    return f"tagjob:{job_id}"
+
+def encode_row(index: int, result: Dict[str, Any]) -> bytes:
+    """
+    A stored row is exactly the NDJSON line served to clients (minus the newline).
+    """
+    return dumps({"index": index, **result})
+
+def store_rows(
+    pipe,
+    key: str,
+    results: List[Dict[str, Any]],
+    indices: Optional[List[int]] = None,
+    ttl: int = RESULT_EXPIRES
+):
+    """
+    Queue (on any pipeline) replacing the list at `key` with one row per result.
+    `indices` gives each result's input position (default: 0..n-1). Rows are the only copy of
+    a job's results, so they live as long as the job (RESULT_EXPIRES).
+
+    The rows are written to a fresh key and RENAMEd over `key`, so readers and concurrent jobs
+    for the same request only ever see a whole list, without the cost of MULTI/EXEC.
+    """
+    indices = indices if indices is not None else list(range(len(results)))
+    rows = [encode_row(i, r) for i, r in zip(indices, results)]
+    if not rows:
+        pipe.delete(key)
+        return
+    staging = f"{key}:new:{uuid.uuid4().hex}"
+    for start in range(0, len(rows), ROWS_PAGE):
+        pipe.rpush(staging, *rows[start:start + ROWS_PAGE])
+    pipe.expire(staging, ttl)
+    pipe.rename(staging, key)
+
+def result_ref(key: str, total: int, unprocessed: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    What a batch task returns (and the Celery backend keeps): where the rows are, not the rows.
+    """
+    return {"rows": key, "total": total, "unprocessed": unprocessed or []}
+
+def record_job(pipe, job_id: str, ref: Dict[str, Any]):
+    """
+    Queue the job -> rows mapping the results endpoint reads (lives as long as Celery results),
+    so paging never has to load the task's backend entry.
+    """
+    pipe.setex(job_key(job_id), RESULT_EXPIRES, json.dumps(ref))
+
+def job_info(redis: Redis, job_id: str) -> Optional[Dict[str, Any]]:
+    raw = cast(Optional[str], redis.get(job_key(job_id)))
+    return json.loads(raw) if raw else None
+
+def count_rows(redis: Redis, key: str) -> int:
+    return cast(int, redis.llen(key))
+
+def iter_rows(redis: Redis, key: str, start: int, stop: int, page: int = ROWS_PAGE) -> Iterator[str]:
+    """
+    Rows [start, stop) as stored, fetched `page` at a time so memory stays flat.
+    """
+    for offset in range(start, stop, page):
+        chunk = cast(List[str], redis.lrange(key, offset, min(stop, offset + page) - 1))
+        if not chunk:
+            return
+        yield from chunk
+
+def load_results(redis: Redis, key: str, count: int) -> List[Dict[str, Any]]:
+    """
+    The first `count` rows at `key` as TagResult-shaped dicts (index dropped). Callers bound
+    `count` themselves; larger jobs are read through iter_rows instead.
+    """
+    results = []
+    for row in iter_rows(redis, key, 0, count):
+        result = loads(row)
+        result.pop("index", None)
+        results.append(result)
+    return results
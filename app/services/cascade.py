@@ -0,0 +1,70 @@
+import logging
+import math
+import os
+from typing import Any, Callable, Dict, List
+
+from prometheus_client import Counter, Gauge
+
+from app.core.profiling import stage
+
+logger = logging.getLogger(__name__)
+
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "0") == "1"
+CASCADE_MODEL = os.getenv("CASCADE_MODEL", "valhalla/distilbart-mnli-12-1")
+CASCADE_BAND = float(os.getenv("CASCADE_BAND", "0.15"))
+CASCADE_MAX_ESCALATION = float(os.getenv("CASCADE_MAX_ESCALATION", "1.0"))
+
+CASCADE_TEXTS = Counter(
+    "tagging_cascade_texts_total",
+    "Texts scored by the topic cascade, by whether the small model's answer was kept",
+    labelnames=["outcome"]
+)
+CASCADE_ESCALATION_RATIO = Gauge(
+    "tagging_cascade_escalation_ratio",
+    "Fraction of texts escalated to the full topic model in the most recent batch"
+)
+CASCADE_SETTINGS = Gauge(
+    "tagging_cascade_setting",
+    "Configured cascade parameters",
+    labelnames=["name"]
+)
+
+class TopicCascade:
+    """
+    Score topics with a small zero-shot model first and only send texts whose scores are
+    uncertain (any label within `band` of the full model's threshold) to the full model.
+    `max_escalation` caps the escalated fraction per batch, keeping the closest calls.
+    """
+    def __init__(self, small_model_getter: Callable[[], Any], band: float, max_escalation: float = 1.0):
+        self._small_model_getter = small_model_getter
+        self.band = band
+        self.max_escalation = max_escalation
+        CASCADE_SETTINGS.labels("band").set(band)
+        CASCADE_SETTINGS.labels("max_escalation").set(max_escalation)
+
+    def _margin(self, scores: Dict[str, float], threshold: float) -> float:
+        return min((abs(score - threshold) for score in scores.values()), default=math.inf)
+
+    def predict(self, texts: List[str], full_model: Any) -> List[List[Dict]]:
+        small_model = self._small_model_getter()
+        threshold, top_k = full_model.threshold, full_model.top_k
+        with stage("topics.cascade_small"):
+            small_scores = small_model.predict_scores(texts)
+
+        margins = [self._margin(scores, threshold) for scores in small_scores]
+        uncertain = sorted((m, i) for i, m in enumerate(margins) if m <= self.band)
+        limit = math.ceil(self.max_escalation * len(texts))
+        escalate = sorted(i for _, i in uncertain[:limit])
+
+        results = [small_model.select(scores, threshold, top_k) for scores in small_scores]
+        if escalate:
+            with stage("topics.cascade_full"):
+                full_results = full_model.predict([texts[i] for i in escalate])
+            for i, result in zip(escalate, full_results):
+                results[i] = result
+
+        CASCADE_TEXTS.labels("escalated").inc(len(escalate))
+        CASCADE_TEXTS.labels("accepted").inc(len(texts) - len(escalate))
+        if texts:
+            CASCADE_ESCALATION_RATIO.set(len(escalate) / len(texts))
+        return results
@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.core.profiling import stage
+
+logger = logging.getLogger("text-tagger.coalesce")
+
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "0") == "1"
+COALESCE_MAX_TOKENS = int(os.getenv("COALESCE_MAX_TOKENS", "8192"))
+COALESCE_LINGER_MS = float(os.getenv("COALESCE_LINGER_MS", "5"))
+
+def estimate_tokens(texts: List[str]) -> int:
+    # ~4 characters per subword token for the BERT / BART tokenizers we use
+    return sum(len(text) // 4 + 2 for text in texts)
+
+class _Pending:
+    __slots__ = ("request", "tokens", "result", "error", "done")
+
+    def __init__(self, request: Dict[str, Any]):
+        self.request = request
+        self.tokens = estimate_tokens(request["texts"])
+        self.result: Optional[List[Dict[str, Any]]] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+class BatchCoalescer:
+    """
+    Merge concurrent tag requests from different threads into one `tag_many_raw` call.
+
+    The first thread to arrive while nobody is running a batch becomes the leader: it lingers
+    up to `linger_ms` (or until `max_tokens` worth of requests are queued), runs the queued
+    requests FIFO as one batch, and hands each caller its own results. Everyone else blocks
+    until their request is done or it is their turn to lead. A request larger than the budget
+    still runs, alone.
+
+    Only useful where several tasks run concurrently in one process, i.e. a worker started
+    with `--pool threads` (torch releases the GIL during forward passes). That pool does not
+    enforce Celery's soft time limit, so callers should only submit requests small enough to
+    finish well within it.
+    """
+    def __init__(
+        self,
+        tagger_getter: Callable[[], Any],
+        max_tokens: int = COALESCE_MAX_TOKENS,
+        linger_ms: float = COALESCE_LINGER_MS
+    ):
+        self._tagger_getter = tagger_getter
+        self.max_tokens = max_tokens
+        self.linger_ms = linger_ms
+        self._cond = threading.Condition()
+        self._queue: Deque[_Pending] = deque()
+        self._busy = False
+
+    def submit(
+        self,
+        texts: List[str],
+        language: Optional[str] = None,
+        domain_dict: Optional[List[str]] = None,
+        tasks: Optional[List[str]] = None,
+        tenant: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        pending = _Pending(
+            {"texts": texts, "language": language, "domain_dict": domain_dict, "tasks": tasks, "tenant": tenant}
+        )
+        with self._cond:
+            self._queue.append(pending)
+            self._cond.notify_all()
+
+        while True:
+            with self._cond:
+                while not pending.done and self._busy:
+                    self._cond.wait()
+                if pending.done:
+                    break
+                self._busy = True
+                batch = self._collect()
+            try:
+                self._run(batch)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+        if pending.error is not None:
+            raise pending.error
+        if pending.result is None:
+            raise RuntimeError("coalesced batch returned no result for this request")
+        return pending.result
+
+    def _collect(self) -> List[_Pending]:
+        """
+        Called with the condition held: linger for company, then take up to the token budget.
+        """
+        deadline = time.monotonic() + self.linger_ms / 1000.0
+        while sum(p.tokens for p in self._queue) < self.max_tokens:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+
+        batch = [self._queue.popleft()]
+        tokens = batch[0].tokens
+        while self._queue and tokens + self._queue[0].tokens <= self.max_tokens:
+            tokens += self._queue[0].tokens
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _run(self, batch: List[_Pending]):
+        try:
+            with stage("coalesce"):
+                results = self._tagger_getter().tag_many_raw([p.request for p in batch])
+            for p, result in zip(batch, results):
+                p.result = result
+        except Exception as e:
+            for p in batch:
+                p.error = e
+        finally:
+            for p in batch:
+                p.done = True
+        if len(batch) > 1:
+            logger.info(
+                f"coalesce batch requests={len(batch)} texts={sum(len(p.request['texts']) for p in batch)} " \
+                f"est_tokens={sum(p.tokens for p in batch)}"
+            )
@@ -0,0 +1,86 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+from app.core.result_cache import load_partial, partial_key, save_partial
+
+logger = logging.getLogger("text-tagger.deadline")
+
+PARTIAL_RESPONSES = Counter(
+    "tagging_partial_responses_total",
+    "Responses returned with unprocessed texts because the deadline ran out, by path",
+    labelnames=["path"]
+)
+
+def resolve_deadline(timeout_ms: Optional[int], header: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Absolute deadline (epoch seconds) from the request's `timeout_ms` and/or an `X-Deadline`
+    header (absolute Unix time in ms); the earlier one wins. None when neither is set.
+    """
+    now = time.time() if now is None else now
+    candidates = []
+    if timeout_ms:
+        candidates.append(now + timeout_ms / 1000.0)
+    if header:
+        try:
+            candidates.append(float(header) / 1000.0)
+        except ValueError:
+            logger.warning(f"ignoring malformed X-Deadline={header!r}")
+    return min(candidates) if candidates else None
+
+def tag_within_deadline(
+    tagger: Any,
+    redis: Any,
+    cache_key: str,
+    texts: List[str],
+    deadline: float,
+    language: Optional[str] = None,
+    domain_dict: Optional[List[str]] = None,
+    tasks: Optional[List[str]] = None,
+    text_digests: Optional[List[str]] = None,
+    tenant: Optional[str] = None,
+    save_from: float = 0.0,
+    done: Optional[Dict[int, Dict[str, Any]]] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Tag the texts not already finished by an earlier attempt (kept under tagpart:{cache_key}),
+    in sub-batches until `deadline`. Finished sub-batches are saved as they complete once
+    `save_from` (epoch seconds) has passed, the backlog first, so a retry of the same request
+    only computes the remainder; before that they stay in memory. Returns the TagResponse-shaped
+    payload and whether it is complete; once complete the partial entry is dropped. `done` passes
+    in that earlier progress when the caller already read it (see result_cache.parse_partial).
+    """
+    done = load_partial(redis, cache_key) if done is None else done
+    saved = bool(done)
+    unsaved: Dict[int, Dict[str, Any]] = {}
+
+    def _on_batch(indices: List[int], results: List[Dict[str, Any]]):
+        nonlocal saved
+        unsaved.update(zip(indices, results))
+        if time.time() >= save_from:
+            save_partial(redis, cache_key, list(unsaved), list(unsaved.values()))
+            unsaved.clear()
+            saved = True
+
+    pending = [i for i in range(len(texts)) if i not in done]
+    fresh, unprocessed = tagger.tag_texts_within(
+        texts,
+        deadline,
+        language=language,
+        domain_dict=domain_dict,
+        tasks=tasks,
+        text_digests=text_digests,
+        indices=pending,
+        tenant=tenant,
+        on_batch=_on_batch
+    )
+    done.update(fresh)
+    payload: Dict[str, Any] = {"results": [done[i] for i in sorted(done)]}
+    if unprocessed:
+        payload["unprocessed"] = unprocessed
+        return payload, False
+    if saved:
+        redis.delete(partial_key(cache_key))
+    return payload, True
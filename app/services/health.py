@@ -0,0 +1,134 @@
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from redis import Redis
+
+from app.core.metrics import queue_length
+
+logger = logging.getLogger("text-tagger.health")
+
+HEALTH_INTERVAL_SECONDS = float(os.getenv("HEALTH_INTERVAL_SECONDS", "5"))
+# A snapshot older than this means the monitor itself is stuck; /readyz fails closed
+HEALTH_STALE_SECONDS = float(os.getenv("HEALTH_STALE_SECONDS", str(3 * HEALTH_INTERVAL_SECONDS)))
+HEALTH_CELERY_PING_TIMEOUT = float(os.getenv("HEALTH_CELERY_PING_TIMEOUT", "1"))
+READY_MAX_QUEUE_LENGTH = int(os.getenv("READY_MAX_QUEUE_LENGTH", "1000"))
+
+HEALTH_CHECK_DURATION = Histogram(
+    "health_check_duration_seconds",
+    "Time spent per background health check (seconds)",
+    labelnames=["check"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+HEALTH_CHECK_FAILURES = Counter(
+    "health_check_failures_total",
+    "Background health checks that failed or reported unhealthy",
+    labelnames=["check"]
+)
+HEALTH_SNAPSHOT_AGE = Gauge(
+    "health_snapshot_age_seconds",
+    "Seconds since the health snapshot served by /healthz and /readyz was taken"
+)
+
+class HealthSnapshot(NamedTuple):
+    redis: bool
+    celery_replies: int
+    queue_length: Optional[int]
+    errors: Dict[str, str]
+    taken_at: float
+
+class HealthMonitor:
+    """
+    Refreshes Redis, Celery and queue health every `interval_s` off the request path, so
+    /healthz and /readyz only read the latest snapshot instead of each doing blocking I/O
+    (a Celery ping is a broadcast to every worker).
+
+    Started from the app lifespan as an asyncio task; the checks themselves are blocking
+    clients and run in a worker thread. Until the first refresh (or without the lifespan, as
+    in tests) the first probe takes a snapshot inline.
+    """
+    def __init__(
+        self,
+        redis_getter: Callable[[], Redis],
+        celery_app: Any,
+        queue_name: str = os.getenv("CELERY_TAGGING_QUEUE", "tagging"),
+        interval_s: float = HEALTH_INTERVAL_SECONDS,
+        stale_s: float = HEALTH_STALE_SECONDS,
+        ping_timeout: float = HEALTH_CELERY_PING_TIMEOUT
+    ):
+        self._redis_getter = redis_getter
+        self._celery_app = celery_app
+        self.queue_name = queue_name
+        self.interval_s = interval_s
+        self.stale_s = stale_s
+        self.ping_timeout = ping_timeout
+        self._snapshot: Optional[HealthSnapshot] = None
+        self._refresh_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def age(self, snapshot: HealthSnapshot) -> float:
+        return time.monotonic() - snapshot.taken_at
+
+    def is_stale(self, snapshot: HealthSnapshot) -> bool:
+        return self.age(snapshot) > self.stale_s
+
+    def snapshot(self) -> HealthSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._refresh_lock:
+                snapshot = self._snapshot or self.refresh()
+        return snapshot
+
+    def refresh(self) -> HealthSnapshot:
+        errors: Dict[str, str] = {}
+        redis_ok = bool(self._check("redis", errors, lambda: self._redis_getter().ping()))
+        replies = self._check(
+            "celery", errors, lambda: len(self._celery_app.control.ping(timeout=self.ping_timeout) or [])
+        ) or 0
+        depth = self._check("queue", errors, lambda: queue_length(self._redis_getter(), self.queue_name))
+        if replies == 0 and "celery" not in errors:
+            HEALTH_CHECK_FAILURES.labels(check="celery").inc()
+
+        snapshot = HealthSnapshot(redis_ok, replies, depth, errors, time.monotonic())
+        previous, self._snapshot = self._snapshot, snapshot
+        if previous is None or (previous.redis, bool(previous.celery_replies)) != (redis_ok, bool(replies)):
+            logger.info(f"health redis={redis_ok} celery_replies={replies} queue_length={depth} errors={errors}")
+        return snapshot
+
+    def _check(self, name: str, errors: Dict[str, str], fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn()
+        except Exception as e:
+            errors[name] = str(e)
+            HEALTH_CHECK_FAILURES.labels(check=name).inc()
+            return None
+        finally:
+            HEALTH_CHECK_DURATION.labels(check=name).observe(time.perf_counter() - start)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"health refresh failed err={e}")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self):
+        """
+        Schedule the refresh loop on the running event loop (call from the lifespan).
+        """
+        HEALTH_SNAPSHOT_AGE.set_function(lambda: self.age(self._snapshot) if self._snapshot else 0.0)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
@@ -0,0 +1,60 @@
+import re
+from typing import Dict, FrozenSet, Optional
+
+DEFAULT_LANGUAGE = "en"
+
+# Scripts that identify a language on their own (checked in order; kana before Han for Japanese)
+_SCRIPTS = [
+    ("ja", re.compile(r"[぀-ヿ]")),
+    ("ko", re.compile(r"[가-힯]")),
+    ("zh", re.compile(r"[一-鿿]")),
+    ("ru", re.compile(r"[Ѐ-ӿ]")),
+    ("ar", re.compile(r"[؀-ۿ]")),
+    ("he", re.compile(r"[֐-׿]")),
+    ("el", re.compile(r"[Ͱ-Ͽ]")),
+    ("hi", re.compile(r"[ऀ-ॿ]")),
+    ("th", re.compile(r"[฀-๿]")),
+]
+
+# Short, high-frequency function words per Latin-script language
+_STOPWORDS: Dict[str, FrozenSet[str]] = {
+    "en": frozenset("the and of to in is that for it with was on are as this by be at from have not".split()),
+    "fr": frozenset("le la les de des est et une un du dans pour que qui pas sur au avec ce sont aux".split()),
+    "de": frozenset("der die das und ist nicht ein eine mit den dem zu von auf für sich des im auch".split()),
+    "es": frozenset("el los las de del es y una por con para que se en al lo como pero más está son".split()),
+    "it": frozenset("il di che è gli della per con non una sono del nel alla anche come più le".split()),
+    "pt": frozenset("o os de da do das dos que não uma com para é em ao se mais como foi são".split()),
+    "nl": frozenset("de het een en van is dat niet op te zijn met voor er aan ook als bij".split()),
+}
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+_MIN_HITS = 2
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    """
+    'EN-us' -> 'en'. Returns None for empty hints.
+    """
+    if not language or not language.strip():
+        return None
+    return re.split(r"[-_]", language.strip().lower(), maxsplit=1)[0]
+
+def detect_language(text: str, default: str = DEFAULT_LANGUAGE) -> str:
+    """
+    Cheap local language guess: script ranges first, then stopword hits for Latin scripts.
+    Short or ambiguous texts fall back to `default`, so they keep using the default models.
+    """
+    sample = text[:2000]
+    for language, pattern in _SCRIPTS:
+        if len(pattern.findall(sample)) >= 2:
+            return language
+
+    counts = {language: 0 for language in _STOPWORDS}
+    for word in _WORD.findall(sample.lower()):
+        for language, words in _STOPWORDS.items():
+            if word in words:
+                counts[language] += 1
+    ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
+    (best, hits), (_, runner_up) = ranked[0], ranked[1]
+    if hits < _MIN_HITS or hits == runner_up:
+        return default
+    return best
@@ -0,0 +1,149 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, FrozenSet, Optional
+
+from prometheus_client import Counter, Gauge
+from redis import Redis
+
+from app.core.metrics import queue_length
+
+logger = logging.getLogger("text-tagger.shedding")
+
+# Off by default: thresholds must be calibrated against the host's normal latency
+# (tagging_stage_duration_seconds / http latency histograms) or ordinary traffic gets shed
+LOAD_SHEDDING_ENABLED = os.getenv("LOAD_SHEDDING_ENABLED", "0") == "1"
+SHED_QUEUE_DEPTH = int(os.getenv("SHED_QUEUE_DEPTH", "500"))
+SHED_WAIT_MS = float(os.getenv("SHED_WAIT_MS", "200"))
+SHED_P95_MS = float(os.getenv("SHED_P95_MS", "1000"))
+# Seconds of sustained low pressure before stepping one level back up
+SHED_RECOVER_SECONDS = float(os.getenv("SHED_RECOVER_SECONDS", "10"))
+
+# Levels in order of degradation, each with the stages it still runs
+LEVELS = ("full", "no_topics", "ner_only", "domain_only")
+LEVEL_TASKS = {
+    "full": frozenset({"ner", "topics", "domain"}),
+    "no_topics": frozenset({"ner", "domain"}),
+    "ner_only": frozenset({"ner"}),
+    "domain_only": frozenset({"domain"}),
+}
+
+SERVICE_LEVEL = Gauge(
+    "tagging_service_level",
+    "Current load-shedding level of the sync path (0=full, 1=no_topics, 2=ner_only, 3=domain_only)"
+)
+SERVICE_LEVEL_CHANGES = Counter(
+    "tagging_service_level_changes_total",
+    "Load-shedding level transitions",
+    labelnames=["direction"]
+)
+SHED_RESPONSES = Counter(
+    "tagging_shed_responses_total",
+    "Sync responses computed below the full service level, by level",
+    labelnames=["level"]
+)
+
+class LoadShedder:
+    """
+    Steps the sync tagging path down through LEVELS under overload and back up once load clears.
+
+    Pressure is the worst of three ratios against their thresholds: Celery queue depth,
+    p95 threadpool wait (request received -> handler running) and p95 handler latency, over
+    the last `window` requests. Above 1.0 the level drops one step per `interval_s`; below
+    0.5 for `recover_s` it rises one step. Evaluation is lazy, on the request path, at most
+    once per interval, so no background thread is needed.
+    """
+    def __init__(
+        self,
+        redis_getter: Callable[[], Redis],
+        queue_name: str = os.getenv("CELERY_TAGGING_QUEUE", "tagging"),
+        queue_depth: int = SHED_QUEUE_DEPTH,
+        wait_ms: float = SHED_WAIT_MS,
+        p95_ms: float = SHED_P95_MS,
+        recover_s: float = SHED_RECOVER_SECONDS,
+        interval_s: float = 1.0,
+        window: int = 200
+    ):
+        self._redis_getter = redis_getter
+        self.queue_name = queue_name
+        self.queue_depth = queue_depth
+        self.wait_ms = wait_ms
+        self.p95_ms = p95_ms
+        self.recover_s = recover_s
+        self.interval_s = interval_s
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._waits: Deque[float] = deque(maxlen=window)
+        self._index = 0
+        self._last_eval = 0.0
+        self._calm_since: Optional[float] = None
+        self.pressure = 0.0
+
+    @property
+    def level(self) -> str:
+        return LEVELS[self._index]
+
+    def observe(self, latency_ms: float, wait_ms: float = 0.0):
+        with self._lock:
+            self._latencies.append(latency_ms)
+            self._waits.append(wait_ms)
+
+    def current(self) -> str:
+        now = time.monotonic()
+        if now - self._last_eval < self.interval_s:
+            return self.level
+        with self._lock:
+            if now - self._last_eval < self.interval_s:
+                return self.level
+            # Claim the interval, so one request reads the queue and the others keep going
+            self._last_eval = now
+        # Redis round trip outside the lock: observe() and other requests never wait on it
+        try:
+            depth = queue_length(self._redis_getter(), self.queue_name)
+        except Exception:
+            depth = 0
+        with self._lock:
+            self._evaluate(now, depth)
+        return self.level
+
+    def allowed(self, tasks: FrozenSet[str], level: Optional[str] = None) -> FrozenSet[str]:
+        return tasks & LEVEL_TASKS[level or self.level]
+
+    def _evaluate(self, now: float, depth: int):
+        self.pressure = max(
+            depth / self.queue_depth if self.queue_depth else 0.0,
+            _p95(self._waits) / self.wait_ms if self.wait_ms else 0.0,
+            _p95(self._latencies) / self.p95_ms if self.p95_ms else 0.0
+        )
+        if self.pressure > 1.0:
+            self._calm_since = None
+            if self._index < len(LEVELS) - 1:
+                self._step(+1, depth)
+        elif self.pressure < 0.5 and self._index > 0:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.recover_s:
+                self._calm_since = now
+                self._step(-1, depth)
+        else:
+            self._calm_since = None
+
+    def _step(self, delta: int, depth: int):
+        previous = self.level
+        self._index += delta
+        # Latencies measured at the old level say little about the new one
+        self._latencies.clear()
+        self._waits.clear()
+        SERVICE_LEVEL.set(self._index)
+        SERVICE_LEVEL_CHANGES.labels(direction="down" if delta > 0 else "up").inc()
+        logger.warning(
+            f"service_level {previous} -> {self.level} pressure={self.pressure:.2f} queue_depth={depth}"
+        )
+
+def _p95(values: Deque[float]) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.95 * (len(ordered) - 1) + 0.5))]
@@ -1,88 +1,498 @@
+import hashlib
+import json
 import logging
+import os
 import re
-from typing import Dict, List, Optional, Set
+import time
+from functools import lru_cache
+from typing import Any, Callable, Collection, Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
 
+from app.core.hash import text_digest
+from app.core.profiling import stage
+from app.core.result_store import ResultStore, get_result_store
 from app.models.ner import NERModel
+from app.models.pool import ModelPool
 from app.models.topic_classifier import TopicClassifier
-from app.schemas.tag import Entity, TagResult, TopicScore
+from app.schemas.tag import TagResult
+from app.services.cascade import CASCADE_BAND, CASCADE_ENABLED, CASCADE_MAX_ESCALATION, CASCADE_MODEL, TopicCascade
+from app.services.language import DEFAULT_LANGUAGE, detect_language, normalize_language
+from app.services.taxonomy import Taxonomy, load_taxonomies
 
 logger = logging.getLogger(__name__)
 
+# Stages a request can select; None / empty selection means all of them
+ALL_TASKS: FrozenSet[str] = frozenset({"ner", "topics", "domain"})
+
+def resolve_tasks(tasks: Optional[Collection[str]]) -> FrozenSet[str]:
+    if not tasks:
+        return ALL_TASKS
+    return frozenset(str(getattr(task, "value", task)) for task in tasks) & ALL_TASKS
+
+# Texts per sub-batch when tagging against a deadline
+DEADLINE_SUB_BATCH = int(os.getenv("DEADLINE_SUB_BATCH", "16"))
+
+# Languages the default (English) NER and zero-shot models are used for
+NATIVE_LANGUAGES = {DEFAULT_LANGUAGE}
+
+# Per-language model sets; "*" covers every other non-native language. A missing stage
+# ("ner" / "zero_shot") falls back to the default model.
+DEFAULT_LANGUAGE_MODELS = {
+    "*": {
+        "ner": "Davlan/bert-base-multilingual-cased-ner-hrl",
+        "zero_shot": "MoritzLaurer/mDeBERTa-v3-base-mnli-xnli"
+    }
+}
+
+def _load_language_models() -> Dict[str, Dict[str, str]]:
+    raw = os.getenv("LANGUAGE_MODELS")
+    if not raw:
+        return DEFAULT_LANGUAGE_MODELS
+    try:
+        return {lang.lower(): spec for lang, spec in json.loads(raw).items()}
+    except (ValueError, AttributeError):
+        logger.warning("LANGUAGE_MODELS is not a JSON object; using defaults")
+        return DEFAULT_LANGUAGE_MODELS
+
 def _normalize_terms(terms: Optional[List[str]]) -> List[str]:
     if not terms:
         return []
     return sorted({term.strip().lower() for term in terms if term and term.strip()})
 
+@lru_cache(maxsize=256)
+def _compile_terms(terms: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    if not terms:
+        return None
+    return re.compile(r"\b(" + "|".join(map(re.escape, terms)) + r")\b", re.IGNORECASE)
+
 def _match_domain_terms(text: str, terms: List[str]) -> Set[str]:
     """
     Word-boundary, case-insensitive matching of provided terms.
     Example: 'AI' matches 'AI systems' but not 'BRAIN'
     """
-    if not terms:
+    pattern = _compile_terms(tuple(terms))
+    if pattern is None:
         return set()
-    pattern = re.compile(r"\b(" + "|".join(map(re.escape, terms)) + r")\b", re.IGNORECASE)
     return {match.group(0).lower() for match in pattern.finditer(text)}
 
+def _config_hash(config: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
 class TaggingService:
-    def __init__(self):
-        self.ner_model = NERModel()
-        self.topic_model = TopicClassifier()
+    def __init__(self, ner_model: Any = None, topic_model: Any = None, result_store: Optional[ResultStore] = None):
+        self.ner_model = ner_model or NERModel()
+        self.topic_model = topic_model or TopicClassifier()
+        
+        # Durable per-text model outputs (RESULT_STORE_PATH); None disables the tier
+        self.result_store = result_store or get_result_store()
         
         # Fusion tunables
         self.domain_boost = 0.85
         self.ner_weight = 1.0
         self.topic_weight = 1.0
+        
+        # Language routing (opt-in): non-native languages go to models from the pool
+        self.language_routing = os.getenv("LANGUAGE_ROUTING", "0") == "1"
+        self.language_models = _load_language_models()
+        self.model_pool = ModelPool(self._load_model, budget_mb=float(os.getenv("MODEL_POOL_BUDGET_MB", "4096")))
+        
+        # Topic cascade: small model first, escalate uncertain texts to the default topic model
+        self.cascade: Optional[TopicCascade] = None
+        if CASCADE_ENABLED:
+            self.cascade = TopicCascade(
+                lambda: self.model_pool.get("zero_shot", CASCADE_MODEL),
+                band=CASCADE_BAND,
+                max_escalation=CASCADE_MAX_ESCALATION
+            )
+        
+        # Per-tenant hierarchical topic taxonomies (TOPIC_TAXONOMY_PATH); "*" covers other tenants
+        self.taxonomies: Dict[str, Taxonomy] = load_taxonomies()
+
+    def taxonomy_for(self, tenant: Optional[str]) -> Optional[Taxonomy]:
+        """
+        The tenant's taxonomy (or the "*" one); None means the topic model's flat labels.
+        """
+        if not self.taxonomies:
+            return None
+        return self.taxonomies.get(tenant or "") or self.taxonomies.get("*")
+
+    def _load_model(self, kind: str, model_name: str) -> Any:
+        if kind == "ner":
+            return NERModel(model_name=model_name)
+        return TopicClassifier(labels=self.topic_model.labels, model_name=model_name)
+
+    def _resolve_languages(
+        self, texts: List[str], language: Optional[str], detect: bool = True
+    ) -> List[Optional[str]]:
+        if not self.language_routing:
+            # Everything uses the default models; results echo the caller's hint as given
+            return [language] * len(texts)
+        hint = normalize_language(language)
+        if hint or not detect:
+            return [hint] * len(texts)
+        with stage("language"):
+            return [detect_language(text) for text in texts]
+
+    def preload_language_models(self):
+        """
+        Load the "*" route's models into the pool, so the first non-English request doesn't
+        pay for a model download and load. No-op with routing off.
+        """
+        if not self.language_routing:
+            return
+        spec = self.language_models.get("*") or {}
+        for kind in ("ner", "zero_shot"):
+            if spec.get(kind):
+                self.model_pool.get(kind, spec[kind])
+
+    def _route(self, language: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        (ner model name, zero-shot model name) for a language; None means the default model.
+        """
+        if not self.language_routing or language is None or language in NATIVE_LANGUAGES:
+            return None, None
+        spec = self.language_models.get(language) or self.language_models.get("*") or {}
+        return spec.get("ner"), spec.get("zero_shot")
+
+    def _predict(
+        self,
+        texts: List[str],
+        languages: List[Optional[str]],
+        tasks: FrozenSet[str] = ALL_TASKS,
+        digests: Optional[List[str]] = None,
+        taxonomy: Optional[Taxonomy] = None
+    ) -> Tuple[List[List[Dict]], List[List[Dict]]]:
+        """
+        Run the selected NER / topic models, one batch per distinct model route, and scatter
+        results back into input order. Skipped stages yield empty lists. With a `taxonomy`,
+        topics are scored hierarchically over its labels instead of the model's flat ones.
+        """
+        run_ner, run_topics = "ner" in tasks, "topics" in tasks
+        if not run_ner and not run_topics:
+            return [[] for _ in texts], [[] for _ in texts]
+        
+        groups: Dict[Tuple[Optional[str], Optional[str]], List[int]] = {}
+        for i, lang in enumerate(languages):
+            ner_name, topic_name = self._route(lang)
+            groups.setdefault((ner_name if run_ner else None, topic_name if run_topics else None), []).append(i)
+        
+        if len(groups) == 1:
+            ner_name, topic_name = next(iter(groups))
+            return self._predict_group(texts, ner_name, topic_name, tasks, digests, taxonomy)
+        
+        ner_out: List[List[Dict]] = [[] for _ in texts]
+        topic_out: List[List[Dict]] = [[] for _ in texts]
+        for (ner_name, topic_name), indices in groups.items():
+            ner_res, topic_res = self._predict_group(
+                [texts[i] for i in indices],
+                ner_name,
+                topic_name,
+                tasks,
+                [digests[i] for i in indices] if digests is not None else None,
+                taxonomy
+            )
+            for j, i in enumerate(indices):
+                ner_out[i] = ner_res[j]
+                topic_out[i] = topic_res[j]
+        return ner_out, topic_out
+
+    def _predict_group(
+        self,
+        texts: List[str],
+        ner_name: Optional[str],
+        topic_name: Optional[str],
+        tasks: FrozenSet[str],
+        digests: Optional[List[str]] = None,
+        taxonomy: Optional[Taxonomy] = None
+    ) -> Tuple[List[List[Dict]], List[List[Dict]]]:
+        ner_res: List[List[Dict]] = [[] for _ in texts]
+        topic_res: List[List[Dict]] = [[] for _ in texts]
+        if "ner" in tasks:
+            ner_model = self.model_pool.get("ner", ner_name) if ner_name else self.ner_model
+            with stage("ner"):
+                ner_res = self._stored(
+                    texts, digests, self._ner_version(ner_model), ner_model.predict
+                )
+        if "topics" in tasks:
+            topic_model = self.model_pool.get("zero_shot", topic_name) if topic_name else self.topic_model
+            cascade = self.cascade if topic_name is None else None
+            with stage("topics"):
+                if taxonomy is not None:
+                    topic_res = self._stored(
+                        texts,
+                        digests,
+                        self._topic_version(topic_model, None, taxonomy),
+                        lambda batch: taxonomy.predict(batch, topic_model)
+                    )
+                elif cascade is not None:
+                    topic_res = self._stored(
+                        texts,
+                        digests,
+                        self._topic_version(topic_model, cascade),
+                        lambda batch: cascade.predict(batch, topic_model)
+                    )
+                else:
+                    topic_res = self._stored(
+                        texts, digests, self._topic_version(topic_model, None), topic_model.predict
+                    )
+        return ner_res, topic_res
+
+    def config_fingerprint(self, tenant: Optional[str] = None) -> str:
+        """
+        Hash of everything that shapes tagging output: model names, thresholds, labels, fusion
+        weights, language routing, cascade settings and the tenant's taxonomy. Mixed into every
+        response cache key, so tenants only share cache entries when their taxonomies match.
+        Bump CACHE_FINGERPRINT_SALT to force new keys for changes not captured here.
+        """
+        config = {
+            "salt": os.getenv("CACHE_FINGERPRINT_SALT", ""),
+            "ner": self._ner_version(self.ner_model),
+            "topics": self._topic_version(self.topic_model, self.cascade),
+            "fusion": [self.ner_weight, self.topic_weight, self.domain_boost],
+            "routing": self.language_models if self.language_routing else None
+        }
+        taxonomy = self.taxonomy_for(tenant)
+        if taxonomy is not None:
+            config["taxonomy"] = taxonomy.version
+        return _config_hash(config)
+
+    def _ner_version(self, model: Any) -> Tuple[str, str]:
+        """
+        (model version, config hash) identifying stored NER outputs.
+        """
+        name = getattr(model, "model_name", type(model).__name__)
+        return f"ner:{name}", _config_hash({
+            "min_score": getattr(model, "min_score", None),
+            "min_len": getattr(model, "min_len", None)
+        })
+
+    def _topic_version(
+        self, model: Any, cascade: Optional[TopicCascade], taxonomy: Optional[Taxonomy] = None
+    ) -> Tuple[str, str]:
+        name = getattr(model, "model_name", type(model).__name__)
+        config: Dict[str, Any] = {
+            "labels": list(getattr(model, "labels", []) or []),
+            "threshold": getattr(model, "threshold", None),
+            "top_k": getattr(model, "top_k", None)
+        }
+        if cascade is not None:
+            config["cascade"] = [CASCADE_MODEL, cascade.band, cascade.max_escalation]
+        if taxonomy is not None:
+            config["taxonomy"] = taxonomy.version
+        return f"topics:{name}", _config_hash(config)
+
+    def _stored(
+        self,
+        texts: List[str],
+        digests: Optional[List[str]],
+        version: Tuple[str, str],
+        compute: Callable[[List[str]], List[List[Dict]]]
+    ) -> List[List[Dict]]:
+        """
+        Read-through the result store: only texts without a stored output reach `compute`,
+        and their outputs are written back in one batch.
+        """
+        store = self.result_store
+        if store is None or digests is None:
+            return compute(texts)
+        model_version, config_hash = version
+        try:
+            found = store.get_many(model_version, config_hash, digests)
+        except Exception as e:
+            logger.warning(f"result_store read failed model={model_version} err={e}")
+            return compute(texts)
+        
+        results: List[Optional[List[Dict]]] = [found.get(digest) for digest in digests]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = compute([texts[i] for i in missing])
+            for i, result in zip(missing, computed):
+                results[i] = result
+            try:
+                store.put_many(model_version, config_hash, {digests[i]: results[i] for i in missing})
+            except Exception as e:
+                logger.warning(f"result_store write failed model={model_version} err={e}")
+        return results  # type: ignore[return-value]
 
     def tag_texts(
-        self, texts: List[str], language: Optional[str] = None, domain_dict: Optional[List[str]] = None
+        self,
+        texts: List[str],
+        language: Optional[str] = None,
+        domain_dict: Optional[List[str]] = None,
+        tasks: Optional[Collection[str]] = None,
+        text_digests: Optional[List[str]] = None,
+        tenant: Optional[str] = None
     ) -> List[TagResult]:
-        ner_details_per_text = self.ner_model.predict(texts)
-        topic_preds_per_text = self.topic_model.predict(texts)
+        raw = self.tag_texts_raw(
+            texts, language=language, domain_dict=domain_dict, tasks=tasks, text_digests=text_digests, tenant=tenant
+        )
+        with stage("build"):
+            return [TagResult(**result) for result in raw]
+
+    def tag_texts_raw(
+        self,
+        texts: List[str],
+        language: Optional[str] = None,
+        domain_dict: Optional[List[str]] = None,
+        tasks: Optional[Collection[str]] = None,
+        text_digests: Optional[List[str]] = None,
+        tenant: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Same as tag_texts, but returns JSON-ready dicts shaped like TagResult without building
+        pydantic models. Use it when the caller only serializes the results.
+        `tasks` selects the stages to run ("ner", "topics", "domain"); skipped stages come back as None.
+        `text_digests` (from `canonical_digest`) saves re-hashing texts for the result store.
+        `tenant` picks the topic taxonomy (see taxonomy_for).
+        """
+        return self.tag_many_raw([{
+            "texts": texts,
+            "language": language,
+            "domain_dict": domain_dict,
+            "tasks": tasks,
+            "text_digests": text_digests,
+            "tenant": tenant
+        }])[0]
+
+    def tag_texts_within(
+        self,
+        texts: List[str],
+        deadline: float,
+        language: Optional[str] = None,
+        domain_dict: Optional[List[str]] = None,
+        tasks: Optional[Collection[str]] = None,
+        text_digests: Optional[List[str]] = None,
+        indices: Optional[List[int]] = None,
+        tenant: Optional[str] = None,
+        sub_batch_size: int = DEADLINE_SUB_BATCH,
+        on_batch: Optional[Callable[[List[int], List[Dict[str, Any]]], None]] = None
+    ) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """
+        tag_texts_raw in sub-batches until `deadline` (epoch seconds). A sub-batch only starts
+        if the remaining budget covers the recent per-sub-batch time. Returns results by input
+        index plus the indices left unprocessed; `on_batch` sees each finished sub-batch
+        (e.g. to cache progress). `indices` restricts the work to those inputs.
+        """
+        pending = list(range(len(texts))) if indices is None else list(indices)
+        done: Dict[int, Dict[str, Any]] = {}
+        estimate, pos = 0.0, 0
+        while pos < len(pending):
+            remaining = deadline - time.time()
+            if remaining <= 0 or remaining < estimate:
+                break
+            chunk = pending[pos:pos + sub_batch_size]
+            start = time.perf_counter()
+            results = self.tag_texts_raw(
+                [texts[i] for i in chunk],
+                language=language,
+                domain_dict=domain_dict,
+                tasks=tasks,
+                text_digests=[text_digests[i] for i in chunk] if text_digests is not None else None,
+                tenant=tenant
+            )
+            elapsed = time.perf_counter() - start
+            estimate = elapsed if not estimate else 0.5 * estimate + 0.5 * elapsed
+            done.update(zip(chunk, results))
+            if on_batch is not None:
+                on_batch(chunk, results)
+            pos += len(chunk)
+        return done, pending[pos:]
 
-        norm_domain = _normalize_terms(domain_dict)
+    def tag_many_raw(self, requests: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        tag_texts_raw for several requests at once (each a dict of tag_texts_raw kwargs).
+        Requests selecting the same model stages (and topic taxonomy) share one forward pass per
+        model route; domain matching and fusion stay per request.
+        """
+        prepared = []
+        groups: Dict[Tuple[FrozenSet[str], Optional[Taxonomy]], List[int]] = {}
+        for i, request in enumerate(requests):
+            texts = request["texts"]
+            selected = resolve_tasks(request.get("tasks"))
+            model_tasks = selected & {"ner", "topics"}
+            languages = self._resolve_languages(texts, request.get("language"), detect=bool(model_tasks))
+            digests = request.get("text_digests")
+            if digests is None and model_tasks and self.result_store is not None:
+                digests = [text_digest(text).hex() for text in texts]
+            taxonomy = self.taxonomy_for(request.get("tenant")) if "topics" in model_tasks else None
+            prepared.append((selected, languages, digests))
+            groups.setdefault((model_tasks, taxonomy), []).append(i)
+
+        outputs: List[Tuple[List[List[Dict]], List[List[Dict]]]] = [([], [])] * len(requests)
+        for (model_tasks, taxonomy), indices in groups.items():
+            if len(indices) == 1:
+                i = indices[0]
+                outputs[i] = self._predict(
+                    requests[i]["texts"], prepared[i][1], model_tasks, prepared[i][2], taxonomy
+                )
+                continue
+            texts = [text for i in indices for text in requests[i]["texts"]]
+            languages = [lang for i in indices for lang in prepared[i][1]]
+            digest_lists = [prepared[i][2] for i in indices]
+            digests = None
+            if all(ds is not None for ds in digest_lists):
+                digests = [d for ds in digest_lists if ds is not None for d in ds]
+            ner_all, topics_all = self._predict(texts, languages, model_tasks, digests, taxonomy)
+            offset = 0
+            for i in indices:
+                n = len(requests[i]["texts"])
+                outputs[i] = (ner_all[offset:offset + n], topics_all[offset:offset + n])
+                offset += n
+
+        return [
+            self._fuse(request["texts"], request.get("domain_dict"), selected, languages, ner, topics)
+            for request, (selected, languages, _), (ner, topics) in zip(requests, prepared, outputs)
+        ]
+
+    def _fuse(
+        self,
+        texts: List[str],
+        domain_dict: Optional[List[str]],
+        selected: FrozenSet[str],
+        languages: List[Optional[str]],
+        ner_details_per_text: List[List[Dict]],
+        topic_preds_per_text: List[List[Dict]]
+    ) -> List[Dict[str, Any]]:
+        with stage("domain"):
+            pattern = _compile_terms(tuple(_normalize_terms(domain_dict))) if "domain" in selected else None
+            if pattern is None:
+                domain_hits_per_text: List[Iterable[str]] = [()] * len(texts)
+            else:
+                domain_hits_per_text = [{m.group(0).lower() for m in pattern.finditer(text)} for text in texts]
         
+        ner_weight, topic_weight, domain_boost = self.ner_weight, self.topic_weight, self.domain_boost
+        debug = logger.isEnabledFor(logging.DEBUG)
         results = []
-        for i, text in enumerate(texts):
-            # NER entities
-            ner_entities = [Entity(**e) for e in ner_details_per_text[i]]
-            ner_labels: Dict[str, float] = {e.text.lower(): e.score * self.ner_weight for e in ner_entities}
-            
-            # Topics
-            topics_raw = topic_preds_per_text[i]
-            topic_scores = {t["label"].lower(): t["score"] * self.topic_weight for t in topics_raw}
-            topics_structured = [TopicScore(**t) for t in topics_raw] if topics_raw else None
-            
-            # Domain matches
-            domain_hits = _match_domain_terms(text, norm_domain)
-            domain_scores = {d: self.domain_boost for d in domain_hits}
-            
-            # Fusion: max score across sources per label
-            combined = {}
-            def _acc(key: str, val: float):
-                combined[key] = max(combined.get(key, 0.0), val)
-            
-            for key, value in ner_labels.items():
-                _acc(key, value)
-            for key, value in topic_scores.items():
-                _acc(key, value)
-            for key, value in domain_scores.items():
-                _acc(key, value)
-            
-            # Order by score desc, output as display strings
-            ordered = sorted(combined.items(), key=lambda kv: kv[1], reverse=True)
-            final_tags = [k for k, _ in ordered]
-            
-            logger.debug(
-                f"Text: {text}, NER: {ner_labels}, Topics: {topic_scores}, " \
-                f"Domain: {domain_scores}, Combined: {final_tags}"
-            )
-            
-            results.append(TagResult(
-                text=text,
-                tags=final_tags,
-                language=language,
-                ner=ner_entities,
-                topics=topics_structured
-            ))
-                    
+        with stage("fusion"):
+            for text, text_language, ner_raw, topics_raw, domain_hits in zip(
+                texts, languages, ner_details_per_text, topic_preds_per_text, domain_hits_per_text
+            ):
+                # Fusion: max score across NER, topics and domain matches per label
+                combined: Dict[str, float] = {}
+                for entity in ner_raw:
+                    key, score = entity["text"].lower(), entity["score"] * ner_weight
+                    prev = combined.get(key)
+                    if prev is None or score > prev:
+                        combined[key] = score
+                for topic in topics_raw:
+                    key, score = topic["label"].lower(), topic["score"] * topic_weight
+                    prev = combined.get(key)
+                    if prev is None or score > prev:
+                        combined[key] = score
+                for key in domain_hits:
+                    prev = combined.get(key)
+                    if prev is None or domain_boost > prev:
+                        combined[key] = domain_boost
+                
+                # Order by score desc, output as display strings
+                final_tags = sorted(combined, key=combined.__getitem__, reverse=True)
+                if debug:
+                    logger.debug("Text: %s, Combined: %s, Tags: %s", text, combined, final_tags)
+                
+                results.append({
+                    "text": text,
+                    "tags": final_tags,
+                    "language": text_language,
+                    "ner": ner_raw if "ner" in selected else None,
+                    "topics": topics_raw or None
+                })
         return results
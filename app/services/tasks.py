@@ -1,60 +1,68 @@
-import hashlib
 import json
 import logging
 import os
 import time
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, cast
 
+from billiard.process import current_process
 from celery.exceptions import SoftTimeLimitExceeded
-from celery.signals import task_postrun, task_prerun, worker_process_init, worker_shutdown
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
 
-from app.core.hash import normalize_payload, payload_hash
+from app.core import profiling, runtime
+from app.core.hash import canonical_digest
+from app.core.metrics import HIST_BUCKETS_MS, MetricsBuffer
+from app.core.profiling import stage
 from app.core.redis_client import get_redis
-from app.services.tagging import TaggingService
-from app.workers.celery_app import celery_app
+from app.core.result_cache import load_partial, parse_partial, partial_key, refresh_lock_key, store
+from app.core.runtime import WORKER_CONCURRENCY
+from app.core.serialization import dumps
+from app.services.batch_results import partial_rows_key, record_job, result_ref, rows_key, store_rows
+from app.services.coalescer import COALESCE_ENABLED, BatchCoalescer, estimate_tokens
+from app.services.deadline import PARTIAL_RESPONSES, tag_within_deadline
+from app.services.tagging import TaggingService, resolve_tasks
+from app.services.warm_migration import migrate, recipe_key
+from app.services.warmup import WARMUP_ENABLED, warm_up
+from app.workers.celery_app import PROCESS_INIT_POOLS, RESULT_EXPIRES, SOFT_LIMIT, celery_app, pool_kind
 
 task_logger = logging.getLogger("text-tagger.task")
 _tagger = TaggingService()
 _redis = get_redis()
+# Thread-pool workers can merge concurrent small tasks into one forward pass
+_coalescer = BatchCoalescer(lambda: _tagger) if COALESCE_ENABLED else None
+# Short name of the worker's pool (see celery_app.pool_kind), once worker_init has run
+_worker_pool: Optional[str] = None
 
 CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", "600"))
 MAX_RETRIES = int(os.getenv("CELERY_MAX_RETRIES", "2"))
+# Headroom left before the soft time limit when planning sub-batches
+DEADLINE_SAFETY_SECONDS = float(os.getenv("DEADLINE_SAFETY_SECONDS", "5"))
+# Jobs without a caller deadline start saving finished sub-batches this long before the soft limit
+PARTIAL_SAVE_WINDOW_SECONDS = float(os.getenv("PARTIAL_SAVE_WINDOW_SECONDS", "15"))
+
+# Metric fields (inside the metrics.METRICS_HASH Redis hash)
+METR_KEY_TASKS_SUCCESS = "tasks_total:success"
+METR_KEY_TASKS_FAILURE = "tasks_total:failure"
+METR_KEY_TASKS_TIMEOUT = "tasks_total:timeout"
+METR_KEY_CACHE_HIT = "cache_hits_total"
 
-# Redis metric keys
-METR_KEY_TASKS_SUCCESS = "metrics:tasks_total:success"
-METR_KEY_TASKS_FAILURE = "metrics:tasks_total:failure"
-METR_KEY_TASKS_TIMEOUT = "metrics:tasks_total:timeout"
-METR_KEY_CACHE_HIT = "metrics:cache_hits_total"
+# Histogram field prefix (buckets configurable via TASK_DURATION_BUCKETS_MS)
+HIST_PREFIX = "task_duration_ms"
 
-# Histogram keys (per Prometheus exposition)
-HIST_PREFIX = "metrics:task_duration_ms"
-HIST_BUCKETS_MS = [50, 100, 250, 500, 1000, 2000, 5000] # +Inf is implicit
+# Worker metrics: aggregated in process, flushed to Redis in batches
+_metrics = MetricsBuffer(lambda: _redis)
 
 def _hist_observe_ms(ms: int):
     """
-    Record one observation into Redis-backed histogram.
+    Record one task duration into the worker histogram (no Redis I/O on the hot path).
     """
-    pipe = _redis.pipeline()
-    pipe.incrbyfloat(f"{HIST_PREFIX}:sum", float(ms))
-    pipe.incr(f"{HIST_PREFIX}:count", 1)
-    
-    placed = False
-    for bucket in HIST_BUCKETS_MS:
-        if ms <= bucket:
-            pipe.incr(f"{HIST_PREFIX}:bucket:le_{bucket}", 1)
-            placed = True
-            break
-    if not placed:
-        pipe.incr(f"{HIST_PREFIX}:bucket:le_inf", 1)
-    try:
-        pipe.execute()
-    except Exception:
-        pass
-
-def _hash_kwargs(texts, language, domain_dict) -> str:
-    body = {"texts": texts, "language": language, "domain_dict": domain_dict}
-    s = json.dumps(body, sort_keys=True, ensure_ascii=False)
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+    _metrics.observe(HIST_PREFIX, ms, HIST_BUCKETS_MS)
 
 @celery_app.task(
     bind=True,
@@ -69,61 +77,191 @@ def tag_batch_task(
     language: Optional[str] = None,
     domain_dict: Optional[List[str]] = None,
     request_id: Optional[str] = None,
-    cache_key: Optional[str] = None
+    cache_key: Optional[str] = None,
+    profile: bool = False,
+    tasks: Optional[List[str]] = None,
+    deadline: Optional[float] = None,
+    tenant: Optional[str] = None
 ):
     """
-    Run TaggingService on a batch and return JSON-serializable payload shaped for TagResponse.
+    Run TaggingService on a batch and store the results as rows (batch_results). Returns only
+    a reference to them ({"rows", "total", "unprocessed"}), so the Celery backend keeps status
+    metadata rather than a second copy of the results; or {"error": ...} on timeout.
+    `deadline` (epoch seconds) bounds the work; texts not reached are listed in `unprocessed`.
     """
+    with profiling.profile(profile or profiling.should_profile()) as breakdown:
+        payload = _run_batch(self, texts, language, domain_dict, tasks, request_id, cache_key, deadline, tenant)
+    if breakdown is not None:
+        task_logger.info(
+            f"profile job_id={self.request.id} request_id={request_id} batch_size={len(texts)} " \
+            f"{profiling.format_breakdown(breakdown)}"
+        )
+    return payload
+
+def _run_batch(
+    task,
+    texts: List[str],
+    language: Optional[str],
+    domain_dict: Optional[List[str]],
+    tasks: Optional[List[str]],
+    request_id: Optional[str],
+    cache_key: Optional[str],
+    deadline: Optional[float] = None,
+    tenant: Optional[str] = None
+):
     start = time.time()
     
     if not cache_key:
-        cache_key = payload_hash(normalize_payload(texts=texts, language=language, domain_dict=domain_dict))
+        cache_key = canonical_digest(
+            texts=texts,
+            language=language,
+            domain_dict=domain_dict,
+            tasks=resolve_tasks(tasks),
+            fingerprint=_tagger.config_fingerprint(tenant)
+        ).key
 
     result_key = f"tagresp:{cache_key}"
     inflight_key = f"inflight:{cache_key}"
+    job_id = task.request.id
     
-    # Cache read-through: return cached result if exists
-    cached = _redis.get(result_key)
-    if cached:
-        _redis.incr(METR_KEY_CACHE_HIT, 1)
+    # Read-through: rows from an earlier batch job, or a response cached by /v1/tag.
+    # EXPIRE doubles as the existence check, so reused rows live as long as this job does.
+    # The same round trip picks up progress an earlier attempt saved (tag_within_deadline).
+    with stage("cache_get"):
+        pipe = _redis.pipeline(transaction=False)
+        pipe.expire(rows_key(cache_key), RESULT_EXPIRES)
+        pipe.get(result_key)
+        pipe.hgetall(partial_key(cache_key))
+        has_rows, cached, saved = pipe.execute()
+    if has_rows or cached:
+        _metrics.incr(METR_KEY_CACHE_HIT)
+        ref = result_ref(rows_key(cache_key), len(texts))
+        pipe = _redis.pipeline(transaction=False)
+        if not has_rows:
+            store_rows(pipe, rows_key(cache_key), json.loads(cached)["results"])
+        record_job(pipe, job_id, ref)
+        pipe.execute()
         dur_ms = int((time.time() - start) * 1000)
         _hist_observe_ms(dur_ms)
-        return json.loads(cached)
+        return ref
     
     try:
-        results = _tagger.tag_texts(
-            texts=texts,
-            language=language,
-            domain_dict=domain_dict
-        )
-        payload = {"results": [result.model_dump() for result in results]}
+        # The threads pool has no soft time limit: only requests that fit one coalesced pass skip
+        # the deadline planner below
+        if _coalescer is not None and deadline is None and estimate_tokens(texts) <= _coalescer.max_tokens:
+            results = _coalescer.submit(
+                texts=texts, language=language, domain_dict=domain_dict, tasks=tasks, tenant=tenant
+            )
+            payload: Dict[str, Any] = {"results": results}
+        else:
+            # Sub-batches up to the caller's deadline or the soft time limit. They are saved as they
+            # finish (tagpart:) only for a caller deadline or once the soft limit is close; other
+            # jobs run straight through and write their results once, as rows
+            budget = start + SOFT_LIMIT - DEADLINE_SAFETY_SECONDS
+            payload, complete = tag_within_deadline(
+                _tagger,
+                _redis,
+                cache_key,
+                texts,
+                min(deadline, budget) if deadline is not None else budget,
+                language=language,
+                domain_dict=domain_dict,
+                tasks=tasks,
+                tenant=tenant,
+                save_from=0.0 if deadline is not None else budget - PARTIAL_SAVE_WINDOW_SECONDS,
+                done=parse_partial(saved)
+            )
+            if not complete:
+                return _partial(task, payload, texts, request_id, start)
         
-        _redis.setex(result_key, CACHE_TTL, json.dumps(payload, ensure_ascii=False))
-        _redis.setex(inflight_key, CACHE_TTL, self.request.id)
-        _redis.incr(METR_KEY_TASKS_SUCCESS, 1)
+        # Stored as rows (one per text) so results can be paged and streamed without loading them whole
+        ref = result_ref(rows_key(cache_key), len(texts))
+        with stage("cache_set"):
+            pipe = _redis.pipeline(transaction=False)
+            store_rows(pipe, rows_key(cache_key), payload["results"])
+            record_job(pipe, job_id, ref)
+            pipe.setex(inflight_key, CACHE_TTL, job_id)
+            pipe.execute()
+        _metrics.incr(METR_KEY_TASKS_SUCCESS)
         
         dur_ms = int((time.time() - start) * 1000)
         _hist_observe_ms(dur_ms)
 
         task_logger.info(
-            f"job_id={self.request.id} request_id={request_id} batch_size={len(texts)} " \
-            f"duration_ms={dur_ms} cached={bool(cached)}"
+            f"job_id={task.request.id} request_id={request_id} batch_size={len(texts)} " \
+            f"duration_ms={dur_ms} cached=False"
         )
-        return payload
+        return ref
     
     except SoftTimeLimitExceeded:
-        err = {"error": {"code": "TIMEOUT", "message": "Tagging timed out"}}
-        _redis.setex(result_key, CACHE_TTL, json.dumps(err))
-        _redis.incr(METR_KEY_TASKS_TIMEOUT, 1)
-        
-        dur_ms = int((time.time() - start) * 1000)
-        _hist_observe_ms(dur_ms)
-        
-        task_logger.info(
-            f"job_id={self.request.id} request_id={request_id} batch_size={len(texts)} " \
-            f"duration_ms={dur_ms} cached={bool(cached)}"
-        )
-        return err
+        # Keep what finished (saved per sub-batch) instead of caching a TIMEOUT over the whole key
+        done = load_partial(_redis, cache_key)
+        if not done:
+            _metrics.incr(METR_KEY_TASKS_TIMEOUT)
+            _hist_observe_ms(int((time.time() - start) * 1000))
+            return {"error": {"code": "TIMEOUT", "message": "Tagging timed out"}}
+        payload = {
+            "results": [done[i] for i in sorted(done)],
+            "unprocessed": [i for i in range(len(texts)) if i not in done]
+        }
+        return _partial(task, payload, texts, request_id, start)
+
+def _partial(task, payload, texts: List[str], request_id: Optional[str], start: float):
+    """
+    Store a deadline-cut payload for this job only: it never answers another request, and the
+    finished texts are already kept per index (tagpart:), so resubmitting the same request
+    only computes the rest.
+    """
+    job_id = task.request.id
+    unprocessed = set(payload["unprocessed"])
+    done_indices = [i for i in range(len(texts)) if i not in unprocessed]
+    ref = result_ref(partial_rows_key(job_id), len(texts), payload["unprocessed"])
+    pipe = _redis.pipeline(transaction=False)
+    store_rows(pipe, partial_rows_key(job_id), payload["results"], done_indices)
+    record_job(pipe, job_id, ref)
+    pipe.execute()
+    _metrics.incr(METR_KEY_TASKS_TIMEOUT)
+    PARTIAL_RESPONSES.labels(path="batch").inc()
+    dur_ms = int((time.time() - start) * 1000)
+    _hist_observe_ms(dur_ms)
+    task_logger.info(
+        f"job_id={task.request.id} request_id={request_id} batch_size={len(texts)} " \
+        f"duration_ms={dur_ms} partial=True unprocessed={len(payload['unprocessed'])}"
+    )
+    return ref
+
+@celery_app.task(bind=True)
+def warm_migrate_task(self, source_fingerprint: str, limit: int = 1000, tenant: Optional[str] = None):
+    """
+    Re-tag the hottest responses cached under `source_fingerprint` with this worker's config.
+    Run it on workers that already have the new config, before the API cuts over.
+    """
+    status = migrate(_redis, _tagger, source_fingerprint, limit, tenant=tenant)
+    task_logger.info(f"warm_migration job_id={self.request.id} state={status['state']} done={status['done']}")
+    return status
+
+@celery_app.task(bind=True)
+def refresh_cache_task(self, cache_key: str):
+    """
+    Stale-while-revalidate refresh: recompute a cached /v1/tag response from its stored
+    request recipe and overwrite it in place (same key, fresh soft TTL).
+    """
+    try:
+        raw = cast(Optional[str], _redis.get(recipe_key(cache_key)))
+        if not raw:
+            task_logger.info(f"cache_refresh skipped key={cache_key} reason=no_recipe")
+            return False
+        recipe = json.loads(raw)
+        start = time.time()
+        results = _tagger.tag_texts_raw(**recipe)
+        compute_ms = (time.time() - start) * 1000
+        pipe = _redis.pipeline(transaction=False)
+        store(pipe, cache_key, dumps({"results": results}), compute_ms)
+        pipe.execute()
+        task_logger.info(f"cache_refresh ok key={cache_key} duration_ms={int(compute_ms)}")
+        return True
+    finally:
+        _redis.delete(refresh_lock_key(cache_key))
 
 @task_prerun.connect
 def _on_task_prerun(task_id, task, **kwargs):
@@ -133,22 +271,59 @@ def _on_task_prerun(task_id, task, **kwargs):
 def _on_task_postrun(task_id, task, retval, state, **kwargs):
     ok = state == "SUCCESS"
     if state == "FAILURE":
-        try:
-            _redis.incr(METR_KEY_TASKS_FAILURE, 1)
-        except Exception:
-            task_logger.warning("Failed to increment failure counter")
+        _metrics.incr(METR_KEY_TASKS_FAILURE)
     task_logger.info(f"task_postrun task={task.name} job_id={task_id} state={state} ok={ok}")
 
-@worker_process_init.connect
-def _warmup_models(sender=None, **kwargs):
+def _init_worker_process(processes: int, slot: int):
+    runtime.configure("worker", processes, slot=slot)
+    if not WARMUP_ENABLED:
+        return
     try:
-        _ = _tagger.tag_texts(["Warmup"], language="en")
+        warm_up(_tagger, "worker")
         task_logger.info("worker_warmup ok")
     except Exception:
         task_logger.exception("worker_warmup_failed")
 
+@worker_process_init.connect
+def _warmup_models(sender=None, **kwargs):
+    # Prefork children split the node's cores instead of each defaulting to all of them; a solo
+    # worker is the only process
+    processes = WORKER_CONCURRENCY if _worker_pool in (None, "prefork") else 1
+    _init_worker_process(processes, slot=getattr(current_process(), "index", 0) or 0)
+
+@worker_init.connect
+def _on_worker_init(sender=None, **kwargs):
+    """
+    Record the pool kind (prefork children inherit it) and, for pools that never send
+    worker_process_init (threads, gevent, eventlet), set up this process here: its tasks are
+    threads sharing one layout, so it plans as a single process.
+    """
+    global _worker_pool
+    if sender is None:
+        return
+    _worker_pool = pool_kind(sender)
+    _check_coalescing_pool(_worker_pool)
+    if _worker_pool not in PROCESS_INIT_POOLS:
+        _init_worker_process(1, slot=0)
+
+def _check_coalescing_pool(pool: str):
+    """
+    Coalescing only merges tasks that run concurrently in one process; on any other pool it
+    would just add linger latency, so it is switched off.
+    """
+    global _coalescer
+    if _coalescer is not None and pool != "thread":
+        task_logger.warning(f"COALESCE_ENABLED needs --pool threads; coalescing disabled pool={pool}")
+        _coalescer = None
+
+@worker_process_shutdown.connect
+def _flush_metrics(sender=None, **kwargs):
+    _metrics.flush()
+
 @worker_shutdown.connect
 def _on_worker_shutdown(sender=None, **kwargs):
+    # Threads and solo pools run tasks in this process and never send worker_process_shutdown
+    _metrics.flush()
     sig = kwargs.get("sig")
     how = kwargs.get("how")
     exitcode = kwargs.get("exitcode")
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Histogram
+
+from app.core.profiling import stage
+
+logger = logging.getLogger(__name__)
+
+# JSON file: {"<tenant>": <tree>, "*": <tree for every other tenant>}. A tree maps a label to its
+# children (another mapping, a list of leaf labels, or null for a leaf).
+TOPIC_TAXONOMY_PATH = os.getenv("TOPIC_TAXONOMY_PATH")
+# A node's children are only scored when the node scores at least this much
+TAXONOMY_EXPAND_THRESHOLD = float(os.getenv("TAXONOMY_EXPAND_THRESHOLD", "0.5"))
+# At most this many nodes per text are expanded at each level (highest scores first)
+TAXONOMY_MAX_EXPAND = int(os.getenv("TAXONOMY_MAX_EXPAND", "2"))
+
+TAXONOMY_HYPOTHESES = Histogram(
+    "tagging_taxonomy_hypotheses",
+    "Zero-shot labels scored per text with a hierarchical taxonomy",
+    buckets=(5, 10, 20, 40, 80, 160, 320)
+)
+
+Path = Tuple[str, ...]
+
+class Taxonomy:
+    """
+    Hierarchical topic labels scored coarse to fine: the top-level labels first, then only the
+    children of the (at most `max_expand`) nodes scoring >= `expand_threshold`, level by level.
+    Zero-shot cost per text follows the expanded branches, not the size of the tree.
+    """
+    def __init__(
+        self,
+        tree: Any,
+        expand_threshold: float = TAXONOMY_EXPAND_THRESHOLD,
+        max_expand: int = TAXONOMY_MAX_EXPAND
+    ):
+        self.expand_threshold = expand_threshold
+        self.max_expand = max_expand
+        self.children: Dict[Path, List[str]] = {}
+        self._build((), tree)
+        self.size = sum(len(labels) for labels in self.children.values())
+        self.version = hashlib.sha256(
+            json.dumps([tree, expand_threshold, max_expand], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def _build(self, path: Path, node: Any):
+        if isinstance(node, dict):
+            items = [(str(label), sub) for label, sub in node.items()]
+        elif isinstance(node, list):
+            items = [(str(label), None) for label in node]
+        else:
+            return
+        if items:
+            self.children[path] = [label for label, _ in items]
+        for label, sub in items:
+            self._build(path + (label,), sub)
+
+    def predict(self, texts: List[str], model: Any) -> List[List[Dict]]:
+        """
+        Per text, {label, score, path} dicts for every scored node at or above the model's
+        threshold, sorted by score descending, capped to its top_k. `model` needs
+        predict_scores(texts, labels) (multi-label, so a label scores the same in any set).
+        """
+        scored: List[Dict[Path, float]] = [{} for _ in texts]
+        frontier: List[List[Path]] = [[()] for _ in texts]
+        depth = 0
+        while True:
+            candidates = [[p + (c,) for p in parents for c in self.children.get(p, [])] for parents in frontier]
+            # Texts expanding into the same label set share one pipeline call
+            by_labels: Dict[Tuple[str, ...], List[int]] = {}
+            for i, nodes in enumerate(candidates):
+                if nodes:
+                    by_labels.setdefault(tuple(sorted({node[-1] for node in nodes})), []).append(i)
+            if not by_labels:
+                break
+            with stage(f"topics.taxonomy_level_{depth}"):
+                for labels, indices in by_labels.items():
+                    scores = model.predict_scores([texts[i] for i in indices], labels=list(labels))
+                    for i, text_scores in zip(indices, scores):
+                        for node in candidates[i]:
+                            scored[i][node] = text_scores[node[-1]]
+            frontier = [
+                sorted(
+                    (n for n in nodes if n in self.children and scored[i][n] >= self.expand_threshold),
+                    key=scored[i].__getitem__,
+                    reverse=True
+                )[:self.max_expand]
+                for i, nodes in enumerate(candidates)
+            ]
+            depth += 1
+
+        threshold, top_k = model.threshold, model.top_k
+        results = []
+        for text_scores in scored:
+            TAXONOMY_HYPOTHESES.observe(len(text_scores))
+            picked = sorted(
+                ((node, score) for node, score in text_scores.items() if score >= threshold),
+                key=lambda x: x[1],
+                reverse=True
+            )[:top_k]
+            results.append([{"label": node[-1], "score": score, "path": list(node)} for node, score in picked])
+        return results
+
+def load_taxonomies(path: Optional[str] = TOPIC_TAXONOMY_PATH) -> Dict[str, Taxonomy]:
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+        taxonomies = {str(tenant): Taxonomy(tree) for tenant, tree in raw.items()}
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"TOPIC_TAXONOMY_PATH={path} unreadable; using flat topic labels err={e}")
+        return {}
+    for tenant, taxonomy in taxonomies.items():
+        logger.info(f"taxonomy tenant={tenant} nodes={taxonomy.size} version={taxonomy.version}")
+    return taxonomies
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from redis import Redis
+
+from app.core.hash import canonical_digest
+from app.core.metrics import MIGRATION_KEY
+from app.core.result_cache import CACHE_STALE_TTL, CACHE_TTL, store
+from app.core.serialization import dumps
+
+logger = logging.getLogger("text-tagger.migration")
+
+# Hot-key sets hold digests and counts only (no request text), capped at HOT_KEYS_MAX members
+HOT_KEYS_TTL = int(os.getenv("CACHE_HOT_KEYS_TTL_SECONDS", str(7 * 24 * 3600)))
+HOT_KEYS_MAX = int(os.getenv("CACHE_HOT_KEYS_MAX", "10000"))
+# Fraction of lookups that bump the hot-key counter (by 1 / rate, so scores stay request counts)
+HOT_KEY_SAMPLE_RATE = float(os.getenv("CACHE_HOT_KEY_SAMPLE_RATE", "0.1"))
+
+def hot_key(fingerprint: str) -> str:
+    return f"cachehot:{fingerprint}"
+
+def count_hot(pipe, fingerprint: str, cache_key: str):
+    """
+    Queue (on a pipeline) a sampled hotness bump for `cache_key`. Only the ranking matters to
+    a migration, so sampling keeps the hottest keys on top without a write per request.
+    """
+    if HOT_KEY_SAMPLE_RATE > 0 and random.random() < HOT_KEY_SAMPLE_RATE:
+        pipe.zincrby(hot_key(fingerprint), 1.0 / min(HOT_KEY_SAMPLE_RATE, 1.0), cache_key)
+
+def recipe_key(cache_key: str) -> str:
+    return f"tagreq:{cache_key}"
+
+def remember_request(
+    pipe,
+    fingerprint: str,
+    cache_key: str,
+    *,
+    texts: List[str],
+    language: Optional[str],
+    domain_dict: Optional[List[str]],
+    tasks: List[str],
+    tenant: Optional[str] = None
+):
+    """
+    Queue (on a pipeline) the request behind a cached response, so a background refresh or a
+    warm migration can re-tag it, and cap the hot-key set at HOT_KEYS_MAX members. The recipe
+    holds the request texts, so it expires with the response instead of outliving it.
+    """
+    recipe = {
+        "texts": texts, "language": language, "domain_dict": domain_dict, "tasks": sorted(tasks), "tenant": tenant
+    }
+    pipe.setex(recipe_key(cache_key), CACHE_TTL + CACHE_STALE_TTL, dumps(recipe))
+    pipe.zremrangebyrank(hot_key(fingerprint), 0, -(HOT_KEYS_MAX + 1))
+    pipe.expire(hot_key(fingerprint), HOT_KEYS_TTL)
+
+def migration_status(redis: Redis) -> Dict[str, str]:
+    return cast(Dict[str, str], redis.hgetall(MIGRATION_KEY)) or {}
+
+def migrate(
+    redis: Redis,
+    tagger: Any,
+    source_fingerprint: str,
+    limit: int,
+    chunk_size: int = 50,
+    tenant: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Re-tag the `limit` hottest responses cached under `source_fingerprint` with `tagger`'s
+    current config and cache them under its fingerprint, so cutting traffic over to the new
+    config starts warm. Only keys whose recipe is still cached (it expires with the response)
+    can be re-tagged; the rest count as skipped and leave the hot set. Progress is kept in
+    MIGRATION_KEY. `tenant` names whose fingerprint the source is; each request is re-keyed with
+    the tenant recorded in its recipe, and requests whose fingerprint did not change are skipped.
+    """
+    target = tagger.config_fingerprint(tenant)
+    hot: List[Tuple[str, float]] = []
+    if limit > 0:
+        hot = cast(List[Tuple[str, float]], redis.zrevrange(hot_key(source_fingerprint), 0, limit - 1, withscores=True))
+    status: Dict[str, Any] = {
+        "source": source_fingerprint,
+        "target": target,
+        "state": "running",
+        "total": len(hot),
+        "done": 0,
+        "skipped": 0,
+        "failed": 0,
+        "started_at": int(time.time())
+    }
+    redis.delete(MIGRATION_KEY)
+    if target == source_fingerprint:
+        status.update(state="noop", total=0)
+        redis.hset(MIGRATION_KEY, mapping=status)
+        return status
+    redis.hset(MIGRATION_KEY, mapping=status)
+    logger.info(f"warm_migration start source={source_fingerprint} target={target} total={len(hot)}")
+
+    for start in range(0, len(hot), chunk_size):
+        chunk = hot[start:start + chunk_size]
+        recipes = cast(List[Optional[str]], redis.mget([recipe_key(key) for key, _ in chunk]))
+        done = skipped = failed = 0
+        pipe = redis.pipeline(transaction=False)
+        for (key, score), raw in zip(chunk, recipes):
+            if not raw:
+                # The response and its recipe expired; nothing left to re-tag it from
+                pipe.zrem(hot_key(source_fingerprint), key)
+                skipped += 1
+                continue
+            try:
+                recipe = json.loads(raw)
+                recipe_target = tagger.config_fingerprint(recipe.get("tenant"))
+                digest = canonical_digest(
+                    texts=recipe["texts"],
+                    language=recipe["language"],
+                    domain_dict=recipe["domain_dict"],
+                    tasks=recipe["tasks"],
+                    fingerprint=recipe_target
+                )
+                if recipe_target == source_fingerprint:
+                    skipped += 1
+                    continue
+                t0 = time.perf_counter()
+                results = tagger.tag_texts_raw(
+                    texts=recipe["texts"],
+                    language=recipe["language"],
+                    domain_dict=recipe["domain_dict"],
+                    tasks=recipe["tasks"],
+                    text_digests=digest.text_digests,
+                    tenant=recipe.get("tenant")
+                )
+            except Exception as e:
+                failed += 1
+                logger.warning(f"warm_migration retag failed err={e}")
+                continue
+            store(pipe, digest.key, dumps({"results": results}), (time.perf_counter() - t0) * 1000)
+            pipe.zadd(hot_key(recipe_target), {digest.key: score})
+            remember_request(pipe, recipe_target, digest.key, **recipe)
+            done += 1
+        pipe.hincrby(MIGRATION_KEY, "done", done)
+        pipe.hincrby(MIGRATION_KEY, "skipped", skipped)
+        pipe.hincrby(MIGRATION_KEY, "failed", failed)
+        pipe.execute()
+        status["done"] += done
+        status["skipped"] += skipped
+        status["failed"] += failed
+
+    status.update(state="done", finished_at=int(time.time()))
+    redis.hset(MIGRATION_KEY, mapping={"state": "done", "finished_at": status["finished_at"]})
+    logger.info(
+        f"warm_migration done source={source_fingerprint} target={target} done={status['done']} " \
+        f"skipped={status['skipped']} failed={status['failed']}"
+    )
+    return status
@@ -0,0 +1,51 @@
+import logging
+import os
+import time
+from typing import Any, Dict, List
+
+logger = logging.getLogger("text-tagger.warmup")
+
+def _ints(raw: str) -> List[int]:
+    return sorted({int(v) for v in raw.split(",") if v.strip()})
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+# Shapes to run once at startup: every batch size x sequence-length bucket (in tokens)
+WARMUP_BATCH_SIZES = _ints(os.getenv("WARMUP_BATCH_SIZES", "1,8"))
+WARMUP_SEQ_BUCKETS = _ints(os.getenv("WARMUP_SEQ_BUCKETS", "16,128"))
+
+_WORDS = (
+    "market company announced model research team launched platform cloud energy policy city "
+    "season album travel health science students budget bank rates growth quarter investors"
+).split()
+
+def _synthetic_text(tokens: int, seed: int) -> str:
+    # Common English words are mostly single wordpieces; leave room for [CLS]/[SEP]
+    words = max(1, tokens - 2)
+    return " ".join(_WORDS[(seed + i) % len(_WORDS)] for i in range(words))
+
+def warm_up(tagger: Any, role: str) -> Dict[str, float]:
+    """
+    Run the default NER and topic models once per (batch size, sequence bucket) shape, so
+    allocator growth, kernel selection and (with MODEL_COMPILE) compilation happen before
+    real traffic. Calls the models directly: nothing reaches the caches or the result store.
+    With LANGUAGE_ROUTING on, the "*" route's models are loaded into the pool as well.
+    Returns per-shape wall time in ms.
+    """
+    timings: Dict[str, float] = {}
+    total_start = time.perf_counter()
+    for batch_size in WARMUP_BATCH_SIZES:
+        for bucket in WARMUP_SEQ_BUCKETS:
+            texts = [_synthetic_text(bucket, i) for i in range(batch_size)]
+            start = time.perf_counter()
+            tagger.ner_model.predict(texts)
+            if tagger.cascade is not None:
+                tagger.cascade.predict(texts, tagger.topic_model)
+            else:
+                tagger.topic_model.predict(texts)
+            timings[f"{batch_size}x{bucket}"] = round((time.perf_counter() - start) * 1000, 1)
+    tagger.preload_language_models()
+    logger.info(
+        f"warmup role={role} shapes={len(timings)} total_ms={(time.perf_counter() - total_start) * 1000:.0f} " \
+        + " ".join(f"{shape}={ms}ms" for shape, ms in timings.items())
+    )
+    return timings
@@ -1,6 +1,8 @@
 import os
+from typing import Any
 
 from celery import Celery
+from celery.concurrency import get_implementation
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 RESULT_EXPIRES = int(os.getenv("CELERY_RESULT_EXPIRES", "3600"))
@@ -12,7 +14,7 @@ celery_app = Celery(
     "text-tagger",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=["app.services.tasks"]
+    include=["app.services.tasks", "app.workers.control"]
 )
 
 celery_app.conf.update(
@@ -29,6 +31,18 @@ celery_app.conf.update(
     
     # Routing: heavy tasks on their own queue
     task_routes={
-        "app.services.tasks.tag_batch_task": {"queue": TAGGING_QUEUE}
+        "app.services.tasks.tag_batch_task": {"queue": TAGGING_QUEUE},
+        "app.services.tasks.warm_migrate_task": {"queue": TAGGING_QUEUE},
+        "app.services.tasks.refresh_cache_task": {"queue": TAGGING_QUEUE}
     }
 )
+
+# Only these pools send worker_process_init: prefork in each child, solo in the worker itself
+PROCESS_INIT_POOLS = frozenset({"prefork", "solo"})
+
+def pool_kind(worker: Any) -> str:
+    """
+    Short name of a worker's pool implementation ("prefork", "solo", "thread", "gevent", ...),
+    from the WorkController sent with worker_init.
+    """
+    return get_implementation(worker.pool_cls).__module__.rsplit(".", 1)[-1]
@@ -0,0 +1,56 @@
+import logging
+import threading
+
+from celery.signals import worker_init, worker_process_init
+from celery.worker.control import control_command, ok
+
+from app.core.diagnostics import (
+    PROFILE_INTERVAL_MS,
+    collapse,
+    install_profile_signal,
+    profile_children,
+    profile_key,
+    sample_stacks,
+)
+from app.core.redis_client import get_redis
+from app.workers.celery_app import PROCESS_INIT_POOLS, pool_kind
+
+logger = logging.getLogger("text-tagger.control")
+
+# Long enough for the API to collect it, short enough not to linger
+PROFILE_RESULT_TTL = 600
+
+@control_command(
+    args=[("token", str), ("seconds", float), ("interval_ms", float)],
+    signature="<token> [seconds=10] [interval_ms=5]"
+)
+def profile_cpu(state, token, seconds=10.0, interval_ms=PROFILE_INTERVAL_MS):
+    """Sample this worker's task stacks for `seconds`; collapsed stacks go to Redis."""
+    # The command runs in the consumer; sampling there would stall task delivery for the whole profile
+    pids = (state.consumer.pool.info or {}).get("processes") or []
+    hostname = state.hostname
+
+    def _run():
+        try:
+            if pids:
+                text = profile_children(pids, seconds, interval_ms)
+            else:
+                # threads / solo pools run tasks in this process
+                text = collapse(sample_stacks(seconds, interval_ms))
+            get_redis().setex(profile_key(token, hostname), PROFILE_RESULT_TTL, text)
+            logger.info(f"profile_cpu done token={token} processes={len(pids) or 1} bytes={len(text)}")
+        except Exception as e:
+            logger.warning(f"profile_cpu failed token={token} err={e}")
+
+    threading.Thread(target=_run, name="cpu-profile", daemon=True).start()
+    return ok(f"profiling {len(pids) or 1} process(es) for {seconds}s")
+
+@worker_process_init.connect
+def _install_profiler(sender=None, **kwargs):
+    install_profile_signal()
+
+@worker_init.connect
+def _install_profiler_in_process(sender=None, **kwargs):
+    # Threads / gevent / eventlet pools send no worker_process_init
+    if sender is not None and pool_kind(sender) not in PROCESS_INIT_POOLS:
+        install_profile_signal()
@@ -0,0 +1,141 @@
+"""
+Load test: internal binary endpoint (/v1/internal/tag, msgpack frames) vs JSON /v1/tag.
+
+    python -m benchmarks.binary                                     # in-process, fake models
+    python -m benchmarks.binary --url http://localhost:8000 --token $TOKEN --concurrency 8
+
+Each worker thread keeps one persistent connection. The JSON path sends one request per
+batch; the binary path streams `--frames-per-stream` batches per request. Texts are unique
+per batch, so every batch is a cache miss on both paths. Against a live server the token's
+user needs the "user" and "internal" roles.
+"""
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+_salt = itertools.count()
+_lock = threading.Lock()
+
+def _batches(n: int, batch: int, length: int) -> List[List[str]]:
+    from benchmarks.data import make_texts
+    return [make_texts(batch, length, seed=i, salt=f"b{next(_salt)}-") for i in range(n)]
+
+def _drive(make_client: Callable, call: Callable, streams: int, concurrency: int, texts_per_stream: int) -> Dict:
+    from benchmarks.harness import summarize
+
+    local = threading.local()
+    latencies: List[float] = []
+    wire = {"sent": 0, "received": 0}
+
+    def _one(_):
+        if not hasattr(local, "client"):
+            local.client = make_client()
+        start = time.perf_counter()
+        sent, received = call(local.client)
+        elapsed = time.perf_counter() - start
+        with _lock:
+            latencies.append(elapsed)
+            wire["sent"] += sent
+            wire["received"] += received
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_one, range(streams)))
+    wall = time.perf_counter() - start
+
+    stats = summarize(latencies, items=texts_per_stream)
+    stats["items_per_s"] = streams * texts_per_stream / wall if wall > 0 else 0.0
+    stats["bytes_per_text"] = (wire["sent"] + wire["received"]) / (streams * texts_per_stream)
+    stats["concurrency"] = concurrency
+    return stats
+
+def run(make_client: Callable, headers: Dict[str, str], args) -> Dict[str, Dict]:
+    from app.core.framing import FRAMES_MEDIA_TYPE, pack_frame, unpack_frames
+
+    per_stream = args.frames_per_stream
+    texts_per_stream = per_stream * args.batch
+
+    def _json(client):
+        sent = received = 0
+        for texts in _batches(per_stream, args.batch, args.length):
+            body = json.dumps({"texts": texts, "language": "en"}).encode()
+            response = client.post("/v1/tag", content=body, headers={**headers, "Content-Type": "application/json"})
+            assert response.status_code == 200, response.text
+            sent, received = sent + len(body), received + len(response.content)
+        return sent, received
+
+    def _binary(client):
+        body = b"".join(
+            pack_frame({"id": i, "texts": texts, "language": "en"})
+            for i, texts in enumerate(_batches(per_stream, args.batch, args.length))
+        )
+        response = client.post(
+            "/v1/internal/tag", content=body, headers={**headers, "Content-Type": FRAMES_MEDIA_TYPE}
+        )
+        assert response.status_code == 200, response.text
+        frames = unpack_frames(response.content)
+        assert len(frames) == per_stream and all("results" in f for f in frames), frames[:1]
+        return len(body), len(response.content)
+
+    results = {}
+    for name, call in (("json", _json), ("binary", _binary)):
+        _drive(make_client, call, 2, 1, texts_per_stream)
+        results[name] = _drive(make_client, call, args.streams, args.concurrency, texts_per_stream)
+        print(
+            f"{name}: texts/s={results[name]['items_per_s']:.1f} p95_ms={results[name]['p95_ms']:.1f} " \
+            f"bytes/text={results[name]['bytes_per_text']:.0f}",
+            file=sys.stderr
+        )
+    results["speedup"] = {"items_per_s": results["binary"]["items_per_s"] / results["json"]["items_per_s"]}
+    return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Binary vs JSON tagging load test")
+    parser.add_argument("--url", default=None, help="Live API base URL (default: in-process app)")
+    parser.add_argument("--token", default=None, help="Bearer token for --url")
+    parser.add_argument("--models", choices=["fake", "real"], default="fake")
+    parser.add_argument("--streams", type=int, default=40, help="Requests (binary) / request groups (JSON)")
+    parser.add_argument("--frames-per-stream", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=16, help="Texts per frame / per JSON request")
+    parser.add_argument("--length", type=int, default=200, help="Characters per text")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--out", default=None, help="Write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        import httpx
+
+        def make_client():
+            return httpx.Client(base_url=args.url, timeout=60.0)
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    else:
+        import logging
+        logging.disable(logging.INFO)
+        from benchmarks import env
+        env.setup(models=args.models)
+        client = env.api_client()
+
+        import app.main as main_mod
+        from app.api.v1 import internal
+        main_mod.app.dependency_overrides[internal.internal_only] = lambda: None
+
+        def make_client():
+            return client
+        headers = {}
+
+    report = {"meta": {k: v for k, v in vars(args).items() if k != "token"}, "results": run(make_client, headers, args)}
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+from typing import Dict, List, Tuple
+
+
+def compare(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+    speed_ratio: float = 1.0
+) -> Tuple[List[str], List[str]]:
+    """
+    Compare throughput (items_per_s) per benchmark. Returns (report lines, regressed names).
+    `speed_ratio` is current machine speed / baseline machine speed (from calibration);
+    a benchmark regresses when, after that correction, it is more than `tolerance` slower.
+    """
+    lines = [f"{'benchmark':<40} {'baseline/s':>12} {'current/s':>12} {'change':>8}"]
+    regressed = []
+    for name in sorted(current):
+        cur = current[name]["items_per_s"]
+        base = baseline.get(name, {}).get("items_per_s")
+        if not base:
+            lines.append(f"{name:<40} {'-':>12} {cur:>12.1f} {'new':>8}")
+            continue
+        change = cur / (base * speed_ratio) - 1.0
+        flag = ""
+        if change < -tolerance:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        lines.append(f"{name:<40} {base:>12.1f} {cur:>12.1f} {change:>+7.1%}{flag}")
+    return lines, regressed
@@ -0,0 +1,30 @@
+import random
+from typing import List
+
+_WORDS = (
+    "the a of and to in market company announced new model GPU NVIDIA Elon Musk Berlin visited "
+    "investors quarter growth AI research team launched platform cloud data energy policy city "
+    "football season album film travel health vaccine science students budget bank rates"
+).split()
+
+DOMAIN_TERMS = ["AI", "GPU", "cloud", "vaccine", "energy", "budget", "NVIDIA", "football", "album", "research"]
+
+def make_texts(n: int, length: int, seed: int = 0, salt: str = "") -> List[str]:
+    """
+    `n` pseudo-random sentences of roughly `length` characters. Same seed -> same corpus;
+    `salt` makes otherwise identical corpora unique (to defeat the result cache).
+    """
+    rng = random.Random(seed)
+    texts = []
+    for i in range(n):
+        words: List[str] = []
+        size = 0
+        while size < length:
+            word = rng.choice(_WORDS)
+            words.append(word)
+            size += len(word) + 1
+        texts.append(f"{' '.join(words)} {salt}{i}".strip())
+    return texts
+
+def make_terms(n: int) -> List[str]:
+    return [DOMAIN_TERMS[i % len(DOMAIN_TERMS)] + ("" if i < len(DOMAIN_TERMS) else str(i)) for i in range(n)]
@@ -0,0 +1,45 @@
+"""
+Wires the app for benchmarking. Must run before anything imports app.api / app.services.tasks,
+because those modules build their TaggingService and Redis client at import time.
+"""
+import os
+from typing import Optional
+
+
+def setup(models: str = "fake", redis_url: Optional[str] = None):
+    os.environ.setdefault("CELERY_TAGGING_QUEUE", "tagging")
+
+    from app.core import redis_client
+    if redis_url:
+        os.environ["REDIS_URL"] = redis_url
+    else:
+        import fakeredis
+        redis_client._client = fakeredis.FakeRedis(decode_responses=True)
+
+    if models == "fake":
+        from app.services import tagging
+        from benchmarks.fakes import FakeNER, FakeTopics
+        tagging.NERModel = FakeNER  # type: ignore[misc]
+        tagging.TopicClassifier = FakeTopics  # type: ignore[misc]
+
+    from app.workers.celery_app import celery_app
+    celery_app.conf.update(
+        task_always_eager=True,
+        task_eager_propagates=True,
+        task_store_eager_result=True,
+        broker_url="memory://",
+        result_backend="cache+memory://"
+    )
+
+def api_client():
+    """
+    In-process client for the FastAPI app with auth and rate limiting bypassed.
+    """
+    from fastapi.testclient import TestClient
+
+    import app.main as main_mod
+    from app.api.deps import auth_and_rate_limit
+    from app.core.auth import AuthContext
+
+    main_mod.app.dependency_overrides[auth_and_rate_limit] = lambda: AuthContext(user_id="bench", tenant="bench")
+    return TestClient(main_mod.app)
@@ -0,0 +1,49 @@
+"""
+Deterministic stand-ins for the HF models, so benchmarks isolate our own Python overhead.
+Mirrors the fakes in tests/conftest.py.
+"""
+from typing import Dict, List
+
+
+class FakeNER:
+    model_name = "fake-ner"
+
+    def __init__(self, *args, **kwargs):
+        self.min_score = 0.6
+        self.min_len = 2
+
+    def predict(self, texts: List[str], languages=None) -> List[List[Dict]]:
+        out = []
+        for text in texts:
+            ents = []
+            lt = text.lower()
+            if "elon" in lt:
+                ents.append({"text": "Elon Musk", "label": "PER", "score": 0.99})
+            if "berlin" in lt:
+                ents.append({"text": "Berlin", "label": "LOC", "score": 0.98})
+            if "nvidia" in lt:
+                ents.append({"text": "NVIDIA", "label": "ORG", "score": 0.95})
+            out.append(ents)
+        return out
+
+class FakeTopics:
+    model_name = "fake-zero-shot"
+
+    def __init__(self, *args, **kwargs):
+        self.labels = ["technology", "business"]
+        self.threshold = 0.35
+        self.top_k = 5
+
+    def predict(self, texts: List[str], languages=None) -> List[List[Dict]]:
+        res = []
+        for text in texts:
+            lt = text.lower()
+            labels = []
+            if "nvidia" in lt or "gpu" in lt:
+                labels.append({"label": "technology", "score": 0.95})
+            if "elon" in lt:
+                labels.append({"label": "business", "score": 0.80})
+            if not labels:
+                labels = [{"label": "business", "score": 0.60}]
+            res.append(labels[: self.top_k])
+        return res
@@ -0,0 +1,59 @@
+import gc
+import json
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+
+def measure(fn: Callable[[], Any], *, repeat: int = 20, warmup: int = 2, items: int = 1) -> Dict[str, float]:
+    """
+    Run `fn` `repeat` times (after `warmup` untimed calls) and summarize per-call latency.
+    `items` is how many units of work (texts, requests) one call processes, for throughput.
+    """
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+    gc.disable()
+    try:
+        samples: List[float] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return summarize(samples, items=items)
+
+def summarize(samples: List[float], items: int = 1) -> Dict[str, float]:
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    median = statistics.median(ordered)
+    return {
+        "runs": len(ordered),
+        "items_per_run": items,
+        "mean_ms": mean * 1000.0,
+        "p50_ms": _pct(ordered, 0.50) * 1000.0,
+        "p95_ms": _pct(ordered, 0.95) * 1000.0,
+        # Median-based, so one GC pause or noisy neighbour doesn't swing the comparison
+        "items_per_s": items / median if median > 0 else 0.0,
+    }
+
+def _pct(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+def calibrate(repeat: int = 30) -> float:
+    """
+    Throughput of a fixed pure-Python workload on this machine right now. Results are
+    compared relative to it, so a slower runner or a noisy neighbour doesn't read as a regression.
+    """
+    doc = {"results": [{"text": f"sample {i}", "tags": ["a", "b", "c"], "score": i / 7} for i in range(200)]}
+
+    def _work():
+        for _ in range(5):
+            decoded = json.loads(json.dumps(doc))
+            sorted(decoded["results"], key=lambda r: r["score"], reverse=True)
+
+    return measure(_work, repeat=repeat, warmup=3)["items_per_s"]
@@ -0,0 +1,70 @@
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.data import make_terms, make_texts
+from benchmarks.harness import summarize
+
+_salt = itertools.count()
+
+def _unique_texts(n: int, length: int) -> List[str]:
+    # Every call gets fresh texts so the result cache never answers for us
+    return make_texts(n, length, seed=n * 7919 + length, salt=f"u{next(_salt)}-")
+
+def _drive(call, n_requests: int, concurrency: int, texts_per_request: int, warmup: int = 3) -> Dict[str, float]:
+    for _ in range(warmup):
+        call()
+    latencies: List[float] = []
+
+    def _one(_):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_one, range(n_requests)))
+    wall = time.perf_counter() - start
+
+    stats = summarize(latencies, items=texts_per_request)
+    if concurrency > 1:
+        # Under concurrency, throughput comes from wall time, not from per-request latency
+        stats["items_per_s"] = n_requests * texts_per_request / wall if wall > 0 else 0.0
+    stats["concurrency"] = concurrency
+    return stats
+
+def run(client, quick: bool = False) -> Dict[str, Dict[str, float]]:
+    from app.services.tasks import tag_batch_task
+
+    results: Dict[str, Dict[str, float]] = {}
+    n_requests = 10 if quick else 60
+    batch_sizes = [1, 32] if quick else [1, 8, 32, 128]
+    lengths = [100] if quick else [50, 500, 2000]
+    concurrencies = [1, 4] if quick else [1, 4, 8]
+    domain = make_terms(10)
+
+    def _post(batch: int, length: int):
+        body = {"texts": _unique_texts(batch, length), "language": "en", "domain_dict": domain}
+        response = client.post("/v1/tag", json=body)
+        assert response.status_code == 200, response.text
+
+    for batch in batch_sizes:
+        results[f"macro.api_tag.batch_{batch}"] = _drive(lambda b=batch: _post(b, 200), n_requests, 1, batch)
+    for length in lengths:
+        results[f"macro.api_tag.length_{length}"] = _drive(lambda n=length: _post(8, n), n_requests, 1, 8)
+    for conc in concurrencies:
+        results[f"macro.api_tag.concurrency_{conc}"] = _drive(lambda: _post(8, 200), n_requests, conc, 8)
+
+    # Cache-hit path: same body every time
+    hot = {"texts": make_texts(32, 200, seed=3), "language": "en", "domain_dict": domain}
+    client.post("/v1/tag", json=hot)
+    results["macro.api_tag.cache_hit_32"] = _drive(lambda: client.post("/v1/tag", json=hot), n_requests, 1, 32)
+
+    # Celery path (eager unless pointed at a real broker)
+    for batch in batch_sizes:
+        def _task(b=batch):
+            result = tag_batch_task.apply(kwargs={"texts": _unique_texts(b, 200), "language": "en"})
+            assert result.successful()
+        results[f"macro.celery_task.batch_{batch}"] = _drive(_task, n_requests, 1, batch)
+    return results
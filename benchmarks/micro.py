@@ -0,0 +1,71 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from benchmarks.data import make_terms, make_texts
+from benchmarks.harness import measure
+
+
+def normalize_payload(
+    *, texts: List[str], language: Optional[str], domain_dict: Optional[List[str]]
+) -> Dict[str, Any]:
+    """
+    The JSON normalization cache keys were built from before canonical_digest; kept as its baseline.
+    """
+    norm_texts = [text.strip() for text in texts]
+    norm_lang = language.lower().strip() if language else None
+    norm_domain = sorted({kw.strip() for kw in (domain_dict or [])})
+    return {
+        "texts": norm_texts,
+        "language": norm_lang,
+        "domain_dict": norm_domain
+    }
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    s = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+def run(quick: bool = False) -> Dict[str, Dict[str, float]]:
+    from app.core.hash import canonical_digest
+    from app.core.serialization import dumps, loads
+    from app.schemas.tag import TagResponse
+    from app.services.tagging import TaggingService, _match_domain_terms, _normalize_terms
+
+    repeat = 5 if quick else 20
+    n_texts = 200 if quick else 1000
+    results: Dict[str, Dict[str, float]] = {}
+
+    texts = make_texts(n_texts, 500, seed=1)
+    terms = _normalize_terms(make_terms(50))
+    results["micro.match_domain_terms"] = measure(
+        lambda: [_match_domain_terms(t, terms) for t in texts], repeat=repeat, items=len(texts)
+    )
+
+    results["micro.normalize_and_hash"] = measure(
+        lambda: payload_hash(normalize_payload(texts=texts, language="en", domain_dict=make_terms(50))),
+        repeat=repeat,
+        items=len(texts)
+    )
+
+    results["micro.canonical_digest"] = measure(
+        lambda: canonical_digest(texts=texts, language="en", domain_dict=make_terms(50)),
+        repeat=repeat,
+        items=len(texts)
+    )
+
+    tagger = TaggingService()
+    domain = make_terms(20)
+    results["micro.tag_texts_fusion"] = measure(
+        lambda: tagger.tag_texts(texts, language="en", domain_dict=domain), repeat=repeat, items=len(texts)
+    )
+    results["micro.tag_texts_raw_fusion"] = measure(
+        lambda: tagger.tag_texts_raw(texts, language="en", domain_dict=domain), repeat=repeat, items=len(texts)
+    )
+
+    payload = {"results": [r.model_dump() for r in tagger.tag_texts(texts, language="en", domain_dict=domain)]}
+    encoded = dumps(payload)
+    results["micro.cache_encode"] = measure(lambda: dumps(payload), repeat=repeat, items=len(texts))
+    results["micro.cache_decode"] = measure(
+        lambda: TagResponse(**loads(encoded)), repeat=repeat, items=len(texts)
+    )
+    return results
@@ -0,0 +1,185 @@
+"""
+Replay captured production traffic (app.core.capture) against a local stack.
+
+    python -m benchmarks.replay captures/requests.jsonl                   # in-process, fake models
+    python -m benchmarks.replay captures/requests.jsonl* --speedup 3 --url http://localhost:8000 --token $TOKEN
+
+Requests are re-sent open-loop on the captured schedule, compressed by `--speedup` (3 = three
+times the captured rate), so a server that falls behind shows up as latency, not as a slower
+replay. Captures without texts get deterministic same-length synthetic ones, keyed by the
+captured text ids, so repeated texts repeat (and hit the cache) as they did in production.
+Batch submissions are timed up to the 200 with the job id. Scale the captured rate by
+1 / CAPTURE_SAMPLE_RATE when reading absolute numbers.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+
+def load_records(paths: List[str]) -> List[Dict]:
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return sorted(records, key=lambda r: r["ts"])
+
+def build_request(record: Dict) -> Dict:
+    from app.core.capture import synthetic_terms, synthetic_text
+
+    texts = record.get("texts") or [
+        synthetic_text(length, tid) for length, tid in zip(record["text_lengths"], record["text_ids"])
+    ]
+    body = {"texts": texts}
+    if record.get("domain_dict_size"):
+        body["domain_dict"] = record.get("domain_dict") or synthetic_terms(
+            record["domain_dict_size"], record["domain_dict_id"]
+        )
+    for field in ("language", "tasks", "timeout_ms"):
+        if record.get(field) is not None:
+            body[field] = record[field]
+    return body
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    from benchmarks.harness import _pct
+
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50_ms": _pct(ordered, 0.50),
+        "p95_ms": _pct(ordered, 0.95),
+        "p99_ms": _pct(ordered, 0.99),
+    }
+
+def _hit_curve(samples: List[Dict], bucket_s: float) -> List[Dict]:
+    """
+    Cache-hit rate of /v1/tag responses per `bucket_s` of replay time, and cumulatively.
+    """
+    curve, hits, total = [], 0, 0
+    tagged = [s for s in samples if s["cache"] is not None]
+    if not tagged:
+        return curve
+    buckets = int(max(s["offset"] for s in tagged) // bucket_s) + 1
+    for b in range(buckets):
+        window = [s for s in tagged if b * bucket_s <= s["offset"] < (b + 1) * bucket_s]
+        window_hits = sum(1 for s in window if s["cache"] == "HIT")
+        hits, total = hits + window_hits, total + len(window)
+        curve.append({
+            "t_s": round(b * bucket_s, 3),
+            "requests": len(window),
+            "hit_rate": window_hits / len(window) if window else None,
+            "cumulative_hit_rate": hits / total if total else None,
+        })
+    return curve
+
+def replay(records: List[Dict], send: Callable[[Dict, Dict], tuple], speedup: float, concurrency: int) -> List[Dict]:
+    """
+    Send every record at its captured offset / speedup; returns one sample per request.
+    """
+    t0 = records[0]["ts"]
+    samples: List[Dict] = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def _one(record: Dict):
+        body = build_request(record)
+        due = (record["ts"] - t0) / speedup
+        wait = due - (time.perf_counter() - start)
+        if wait > 0:
+            time.sleep(wait)
+        sent_at = time.perf_counter() - start
+        status, cache = send(record, body)
+        latency_ms = (time.perf_counter() - start - sent_at) * 1000.0
+        with lock:
+            samples.append({
+                "path": record["path"], "status": status, "cache": cache, "texts": len(body["texts"]),
+                "offset": sent_at, "lag_ms": max(0.0, sent_at - due) * 1000.0, "latency_ms": latency_ms,
+            })
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_one, records))
+    return samples
+
+def report(records: List[Dict], samples: List[Dict], bucket_s: float) -> Dict:
+    wall = max(s["offset"] + s["latency_ms"] / 1000.0 for s in samples)
+    captured_span = records[-1]["ts"] - records[0]["ts"]
+    by_path = {}
+    for path in sorted({s["path"] for s in samples}):
+        mine = [s for s in samples if s["path"] == path]
+        captured = [r["duration_ms"] for r in records if r["path"] == path]
+        by_path[path] = {
+            "replayed": _percentiles([s["latency_ms"] for s in mine]),
+            "captured": _percentiles(captured),
+            "errors": sum(1 for s in mine if s["status"] >= 400),
+        }
+    captured_tags = [r for r in records if r.get("cache")]
+    return {
+        "requests": len(samples),
+        "requests_per_s": len(samples) / wall if wall > 0 else 0.0,
+        "texts_per_s": sum(s["texts"] for s in samples) / wall if wall > 0 else 0.0,
+        "captured_requests_per_s": len(records) / captured_span if captured_span > 0 else None,
+        # Sends that left later than scheduled: the client, not the server, was the bottleneck
+        "send_lag_p95_ms": _percentiles([s["lag_ms"] for s in samples])["p95_ms"],
+        "paths": by_path,
+        "captured_hit_rate": (
+            sum(1 for r in captured_tags if r["cache"] == "HIT") / len(captured_tags) if captured_tags else None
+        ),
+        "hit_curve": _hit_curve(samples, bucket_s),
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay captured tagging traffic")
+    parser.add_argument("captures", nargs="+", help="Capture files (rotated backups included, any order)")
+    parser.add_argument("--url", default=None, help="Live API base URL (default: in-process app)")
+    parser.add_argument("--token", default=None, help="Bearer token for --url")
+    parser.add_argument("--models", choices=["fake", "real"], default="fake")
+    parser.add_argument("--speedup", type=float, default=1.0, help="Replay rate as a multiple of the captured rate")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max requests in flight")
+    parser.add_argument("--bucket", type=float, default=10.0, help="Seconds per hit-curve bucket")
+    parser.add_argument("--out", default=None, help="Write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    records = load_records(args.captures)
+    if not records:
+        print("no captured requests", file=sys.stderr)
+        return 1
+
+    if args.url:
+        import httpx
+        client = httpx.Client(
+            base_url=args.url, timeout=60.0, limits=httpx.Limits(max_connections=args.concurrency)
+        )
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    else:
+        import logging
+        logging.disable(logging.INFO)
+        from benchmarks import env
+        env.setup(models=args.models)
+        client = env.api_client()
+        headers = {}
+
+    def send(record: Dict, body: Dict):
+        response = client.post(record["path"], json=body, headers=headers)
+        return response.status_code, response.headers.get("X-Cache")
+
+    samples = replay(records, send, args.speedup, args.concurrency)
+    result = report(records, samples, args.bucket)
+    print(
+        f"requests={result['requests']} req/s={result['requests_per_s']:.1f} texts/s={result['texts_per_s']:.1f} " \
+        f"send_lag_p95_ms={result['send_lag_p95_ms']:.0f}",
+        file=sys.stderr
+    )
+    meta = {k: v for k, v in vars(args).items() if k != "token"}
+    payload = json.dumps({"meta": meta, "results": result}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark suite for the tagging pipeline.
+
+    python -m benchmarks.run                              # fakes + fakeredis, compare to baseline
+    python -m benchmarks.run --models real --suite macro  # real HF models
+    python -m benchmarks.run --save-baseline              # refresh benchmarks/baseline.json
+
+Writes machine-readable JSON (--out) and exits 1 when any benchmark is slower than the
+baseline by more than --tolerance.
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import env
+from benchmarks.compare import compare
+from benchmarks.harness import calibrate
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tagging pipeline benchmarks")
+    parser.add_argument("--models", choices=["fake", "real"], default="fake")
+    parser.add_argument("--suite", choices=["micro", "macro", "all"], default="all")
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis instead of fakeredis")
+    parser.add_argument("--quick", action="store_true", help="Fewer runs and a smaller grid")
+    parser.add_argument("--out", default=None, help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.30, help="Allowed slowdown fraction (tighten on dedicated runners)"
+    )
+    args = parser.parse_args(argv)
+
+    # Keep per-request access logs out of the measurements
+    logging.disable(logging.INFO)
+    env.setup(models=args.models, redis_url=args.redis_url)
+
+    calibration = calibrate()
+    results = {}
+    if args.suite in ("micro", "all"):
+        from benchmarks import micro
+        results.update(micro.run(quick=args.quick))
+    if args.suite in ("macro", "all"):
+        from benchmarks import macro
+        results.update(macro.run(env.api_client(), quick=args.quick))
+
+    # Calibrate again after the run and keep the faster reading, to dampen drift and cold starts
+    calibration = max(calibration, calibrate())
+    report = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "models": args.models,
+            "redis": "real" if args.redis_url else "fakeredis",
+            "quick": args.quick,
+            "calibration_per_s": calibration,
+        },
+        "results": results,
+    }
+    encoded = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        Path(args.out).write_text(encoded + "\n")
+    else:
+        print(encoded)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(encoded + "\n")
+        print(f"baseline saved to {baseline_path}", file=sys.stderr)
+        return 0
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}; skipping comparison", file=sys.stderr)
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("meta", {}).get("models") != args.models:
+        print("baseline was recorded with different models; comparison is indicative only", file=sys.stderr)
+    base_calibration = baseline.get("meta", {}).get("calibration_per_s") or calibration
+    speed_ratio = calibration / base_calibration
+    print(f"machine speed vs baseline: {speed_ratio:.2f}x", file=sys.stderr)
+    lines, regressed = compare(results, baseline.get("results", {}), args.tolerance, speed_ratio)
+    print("\n".join(lines), file=sys.stderr)
+    if regressed:
+        print(f"{len(regressed)} benchmark(s) regressed beyond {args.tolerance:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Sweep torch thread / affinity layouts and recommend one for this node.
+
+    python -m benchmarks.threads --processes 2                # as many processes as --concurrency
+    python -m benchmarks.threads --processes 4 --seconds 20 --out threads.json
+
+Each candidate runs `--processes` spawned processes at once (like prefork children), each
+configured by app.core.runtime and tagging the same corpus in a loop; the score is their
+combined texts/s. Only meaningful with the real models (torch does the threading).
+"""
+import argparse
+import json
+import multiprocessing as mp
+import sys
+import time
+from typing import Dict, List
+
+
+def _candidates(cpus: int, processes: int) -> List[Dict]:
+    share = max(1, cpus // processes)
+    intra = sorted({t for t in (1, 2, 4, 8) if t < share} | {share})
+    out = []
+    for threads in intra:
+        for interop in (1, 2):
+            for pin in (False, True):
+                out.append({"intra_op": threads, "interop": interop, "pin": pin})
+    return out
+
+def _child(slot: int, processes: int, candidate: Dict, models: str, seconds: float, batch: int, queue):
+    from benchmarks import env
+    env.setup(models=models)
+
+    from app.core import runtime
+    layout = runtime.plan_layout(
+        "bench", processes, slot,
+        intra_op=candidate["intra_op"], interop=candidate["interop"], pin=candidate["pin"]
+    )
+    runtime.configure("bench", processes, slot, layout=layout)
+
+    from app.services.tagging import TaggingService
+    from benchmarks.data import make_texts
+    tagger = TaggingService()
+    texts = make_texts(batch, 200, seed=slot)
+    tagger.tag_texts_raw(texts[:2], language="en", tasks=["ner", "topics"])
+
+    done, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        tagger.tag_texts_raw(texts, language="en", tasks=["ner", "topics"])
+        done += len(texts)
+    queue.put(done / (time.perf_counter() - start))
+
+def run_candidate(candidate: Dict, processes: int, models: str, seconds: float, batch: int) -> float:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    procs = [
+        ctx.Process(target=_child, args=(slot, processes, candidate, models, seconds, batch, queue))
+        for slot in range(processes)
+    ]
+    for proc in procs:
+        proc.start()
+    rates = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    return sum(rates)
+
+def main(argv=None) -> int:
+    from app.core.runtime import available_cpus
+
+    parser = argparse.ArgumentParser(description="Torch thread / affinity sweep")
+    parser.add_argument("--processes", type=int, default=2, help="Processes sharing the node (worker --concurrency)")
+    parser.add_argument("--models", choices=["fake", "real"], default="real")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Measurement time per candidate")
+    parser.add_argument("--batch", type=int, default=16, help="Texts per tag call")
+    parser.add_argument("--out", default=None, help="Write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    cpus = len(available_cpus())
+    results = []
+    for candidate in _candidates(cpus, args.processes):
+        rate = run_candidate(candidate, args.processes, args.models, args.seconds, args.batch)
+        results.append({**candidate, "texts_per_s": round(rate, 2)})
+        print(f"intra_op={candidate['intra_op']} interop={candidate['interop']} pin={candidate['pin']} " \
+              f"texts/s={rate:.1f}", file=sys.stderr)
+
+    best = max(results, key=lambda r: r["texts_per_s"])
+    report = {
+        "meta": {"cpus": cpus, "processes": args.processes, "models": args.models, "seconds": args.seconds},
+        "results": results,
+        "recommendation": {
+            "WORKER_CONCURRENCY": args.processes,
+            "TORCH_INTRA_OP_THREADS": best["intra_op"],
+            "TORCH_INTEROP_THREADS": best["interop"],
+            "TORCH_PIN_CPUS": "1" if best["pin"] else "0"
+        }
+    }
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -72,11 +72,7 @@ class FakeTopics:
 
 class FakeTagger(TaggingService):
     def __init__(self):
-        self.ner_model = FakeNER()
-        self.topic_model = FakeTopics()
-        self.domain_boost = 0.85
-        self.ner_weight = 1.0
-        self.topic_weight = 1.0
+        super().__init__(ner_model=FakeNER(), topic_model=FakeTopics())
 
 import pytest  # noqa: E402
 
@@ -104,6 +100,10 @@ def patch_runtime_objects(monkeypatch):
 
     yield
 
+@pytest.fixture()
+def fake_tagger():
+    return FakeTagger()
+
 @pytest.fixture()
 def client():
     return TestClient(main_mod.app)
@@ -65,3 +65,49 @@ def test_metrics_endpoint(client):
     assert response.status_code == 200
     content = response.text
     assert "tagging_tasks_total" in content or "http_requests_total" in content
+
+def test_tag_endpoint_profile_header(client, auth_headers):
+    payload = {"texts": ["NVIDIA announced new GPUs."], "domain_dict": ["profiling"]}
+    response = client.post("/v1/tag", json=payload, headers={**auth_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    timing = response.headers.get("server-timing")
+    assert timing and "ner;dur=" in timing and "fusion;dur=" in timing
+
+def test_tag_cache_hit_serves_stored_bytes(client, auth_headers):
+    from app.schemas.tag import TagResponse
+
+    payload = {"texts": ["NVIDIA announced new GPUs in Berlin."], "language": "en", "domain_dict": ["GPUs"]}
+    miss = client.post("/v1/tag", json=payload, headers=auth_headers)
+    hit = client.post("/v1/tag", json=payload, headers=auth_headers)
+    assert miss.status_code == hit.status_code == 200
+    assert (miss.headers["x-cache"], hit.headers["x-cache"]) == ("MISS", "HIT")
+    assert hit.headers["content-type"] == "application/json"
+    assert "x-ratelimit-remaining" in hit.headers
+    assert hit.content == miss.content
+    parsed = TagResponse.model_validate_json(hit.content)
+    assert {entity.text for entity in parsed.results[0].ner} == {"Berlin", "NVIDIA"}
+    assert parsed.results[0].topics[0].label == "technology"
+
+def test_tag_endpoint_msgpack(client, auth_headers):
+    import msgpack
+
+    from app.schemas.tag import TagResponse
+
+    payload = {"texts": ["Elon Musk visited Berlin."], "domain_dict": ["msgpack"]}
+    response = client.post("/v1/tag", json=payload, headers={**auth_headers, "Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    body = TagResponse(**msgpack.unpackb(response.content))
+    assert body.results[0].text == "Elon Musk visited Berlin."
+
+def test_tag_endpoint_task_selection(client, auth_headers):
+    payload = {"texts": ["Elon Musk talks about AI."], "domain_dict": ["AI"], "tasks": ["domain"]}
+    response = client.post("/v1/tag", json=payload, headers=auth_headers)
+    assert response.status_code == 200
+    result = response.json()["results"][0]
+    assert result["tags"] == ["ai"]
+    assert result["ner"] is None and result["topics"] is None
+
+    full = client.post("/v1/tag", json={**payload, "tasks": None}, headers=auth_headers)
+    assert full.headers["x-cache"] == "MISS"
+    assert "elon musk" in full.json()["results"][0]["tags"]
@@ -0,0 +1,92 @@
+import json
+import time
+
+from app.api.v1 import tag as tag_api
+from app.services.batch_results import job_info, partial_rows_key
+
+
+def _pages(client, job_id, headers, limit):
+    rows, cursor = [], 0
+    while cursor is not None:
+        response = client.get(f"/v1/tag/batch/{job_id}/results?cursor={cursor}&limit={limit}", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows += [json.loads(line) for line in response.text.splitlines()]
+        cursor = int(response.headers["X-Next-Cursor"]) if "X-Next-Cursor" in response.headers else None
+    return rows
+
+def test_batch_results_are_paged_as_ndjson(client, auth_headers):
+    from app.services.tasks import tag_batch_task
+    texts = [f"Elon Musk visited Berlin, page test {i}" for i in range(5)]
+    response = client.post("/v1/tag/batch", json={"texts": texts, "language": "en"}, headers=auth_headers)
+    job_id = response.json()["job_id"]
+
+    first = client.get(f"/v1/tag/batch/{job_id}/results?limit=2", headers=auth_headers)
+    assert first.headers["X-Total-Count"] == "5" and first.headers["X-Next-Cursor"] == "2"
+    rows = _pages(client, job_id, auth_headers, limit=2)
+    assert [row["index"] for row in rows] == list(range(5))
+    assert [row["text"] for row in rows] == texts
+    assert rows[0]["ner"][0]["text"] == "Elon Musk"
+
+    # An identical job reuses the stored rows instead of storing them again
+    again = tag_batch_task.apply(kwargs={"texts": texts, "language": "en", "tasks": ["domain", "ner", "topics"]})
+    assert job_info(tag_api.redis, again.id)["rows"] == job_info(tag_api.redis, job_id)["rows"]
+
+def test_batch_results_not_ready_or_partial(client, auth_headers):
+    from app.services.tasks import tag_batch_task
+    assert client.get("/v1/tag/batch/unknown-job/results", headers=auth_headers).status_code == 409
+
+    texts = ["Deadline already passed", "for this job"]
+    result = tag_batch_task.apply(kwargs={"texts": texts, "deadline": time.time() - 1})
+    assert result.get()["unprocessed"] == [0, 1]
+    # Deadline-cut rows stay with their job, never under the request's shared key
+    assert job_info(tag_api.redis, result.id)["rows"] == partial_rows_key(result.id)
+    response = client.get(f"/v1/tag/batch/{result.id}/results", headers=auth_headers)
+    assert response.status_code == 200 and response.text == ""
+    assert response.headers["X-Unprocessed-Count"] == "2"
+
+def test_batch_task_returns_a_reference_not_results(client, auth_headers):
+    texts = ["NVIDIA announced new GPUs, reference test", "Elon Musk visited Berlin, reference test"]
+    response = client.post("/v1/tag/batch", json={"texts": texts, "language": "en"}, headers=auth_headers)
+    job_id = response.json()["job_id"]
+
+    ref = tag_api.AsyncResult(job_id, app=tag_api.celery_app).get()
+    assert "results" not in ref
+    assert ref == job_info(tag_api.redis, job_id)
+
+    body = client.get(f"/v1/tag/batch/{job_id}", headers=auth_headers).json()
+    assert body["status"] == "SUCCESS"
+    assert [result["text"] for result in body["result"]["results"]] == texts
+
+    # Rows outlived by the Celery entry surface as an error, not as an empty result
+    tag_api.redis.delete(ref["rows"])
+    body = client.get(f"/v1/tag/batch/{job_id}", headers=auth_headers).json()
+    assert body["status"] == "FAILURE" and body["error"]["code"] == "RESULT_EXPIRED"
+
+def test_large_job_status_links_to_the_paged_results(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(tag_api, "BATCH_STATUS_MAX_ROWS", 2)
+    texts = [f"Status cap test {i} for NVIDIA GPUs" for i in range(3)]
+    response = client.post("/v1/tag/batch", json={"texts": texts, "language": "en"}, headers=auth_headers)
+    job_id = response.json()["job_id"]
+
+    body = client.get(f"/v1/tag/batch/{job_id}", headers=auth_headers).json()
+    assert body["status"] == "SUCCESS" and body["result"] is None
+    assert body["total"] == 3 and body["unprocessed_count"] == 0
+    assert body["results_url"].endswith(f"/v1/tag/batch/{job_id}/results")
+
+    page = client.get(body["results_url"], headers=auth_headers)
+    assert [json.loads(line)["text"] for line in page.text.splitlines()] == texts
+
+def test_rows_live_as_long_as_the_jobs_that_use_them(client, auth_headers):
+    from app.services.tasks import tag_batch_task
+    from app.workers.celery_app import RESULT_EXPIRES
+    texts = ["Row lifetime test for NVIDIA GPUs"]
+    first = tag_batch_task.apply(kwargs={"texts": texts})
+    key = first.get()["rows"]
+    assert RESULT_EXPIRES - 5 <= tag_api.redis.ttl(key) <= RESULT_EXPIRES
+
+    # A later job reusing the rows extends them to its own lifetime
+    tag_api.redis.expire(key, 30)
+    again = tag_batch_task.apply(kwargs={"texts": texts})
+    assert again.get()["rows"] == key
+    assert tag_api.redis.ttl(key) > RESULT_EXPIRES - 5
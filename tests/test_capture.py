@@ -0,0 +1,47 @@
+import hashlib
+import json
+
+import app.main as main_mod
+from app.core.capture import RequestCapture, synthetic_text, text_id
+
+
+def _captured(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_sampled_requests_are_captured_without_text(client, auth_headers, tmp_path, monkeypatch):
+    path = tmp_path / "capture.jsonl"
+    monkeypatch.setattr(main_mod, "capture", RequestCapture(path=str(path), sample_rate=1.0, text_mode="redact"))
+    texts = ["Elon Musk visited Berlin, capture test.", "Elon Musk visited Berlin, capture test."]
+    body = {"texts": texts, "domain_dict": ["capture"]}
+    for _ in range(2):
+        assert client.post("/v1/tag", json=body, headers=auth_headers).status_code == 200
+    client.get("/healthz")
+
+    first, second = _captured(path)
+    assert first["path"] == "/v1/tag" and first["status"] == 200
+    assert first["batch_size"] == 2 and first["text_lengths"] == [len(texts[0])] * 2
+    assert first["text_ids"] == [text_id(texts[0])] * 2 and first["domain_dict_size"] == 1
+    assert "texts" not in first and "domain_dict" not in first
+    assert (first["cache"], second["cache"]) == ("MISS", "HIT")
+
+def test_text_ids_are_keyed(tmp_path):
+    text = "Elon Musk visited Berlin, keyed capture test."
+    assert text_id(text, b"one") == text_id(text, b"one") != text_id(text, b"two")
+    assert text_id(text, b"one") != hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    recorder = RequestCapture(path=str(tmp_path / "capture.jsonl"), sample_rate=1.0, hmac_key=b"one")
+    recorder.record("/v1/tag", json.dumps({"texts": [text]}).encode(), 200, 5, "MISS", 0.0)
+    (entry,) = _captured(tmp_path / "capture.jsonl")
+    assert entry["text_ids"] == [text_id(text, b"one")]
+
+def test_synthetic_capture_keeps_lengths_and_repeats(client, auth_headers, tmp_path, monkeypatch):
+    path = tmp_path / "capture.jsonl"
+    monkeypatch.setattr(main_mod, "capture", RequestCapture(path=str(path), sample_rate=1.0, text_mode="synthetic"))
+    texts = ["NVIDIA announced new GPUs in a synthetic capture.", "Short one", "Short one"]
+    assert client.post("/v1/tag/batch", json={"texts": texts}, headers=auth_headers).status_code == 200
+
+    (entry,) = _captured(path)
+    assert [len(t) for t in entry["texts"]] == [len(t) for t in texts]
+    assert entry["texts"][1] == entry["texts"][2] != texts[1]
+    assert synthetic_text(40, "seed") == synthetic_text(40, "seed") and len(synthetic_text(40, "seed")) == 40
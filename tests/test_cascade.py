@@ -0,0 +1,50 @@
+from app.services.cascade import TopicCascade
+
+
+class _ScoredTopics:
+    """Small-model stand-in returning fixed scores per text."""
+    def __init__(self, scores):
+        self.scores = scores
+    def predict_scores(self, texts):
+        return [self.scores[t] for t in texts]
+    def select(self, scores, threshold, top_k):
+        pairs = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        return [{"label": k, "score": v} for k, v in pairs if v >= threshold][:top_k]
+
+class _FullTopics:
+    threshold = 0.7
+    top_k = 5
+    def __init__(self):
+        self.seen = []
+    def predict(self, texts):
+        self.seen.extend(texts)
+        return [[{"label": "full", "score": 0.99}] for _ in texts]
+
+SCORES = {
+    "sure": {"sports": 0.98, "music": 0.02},
+    "unsure": {"sports": 0.72, "music": 0.10},
+    "borderline": {"sports": 0.69, "music": 0.30},
+}
+
+def test_cascade_escalates_only_uncertain_texts():
+    full = _FullTopics()
+    cascade = TopicCascade(lambda: _ScoredTopics(SCORES), band=0.1)
+    results = cascade.predict(["sure", "unsure", "borderline"], full)
+    assert full.seen == ["unsure", "borderline"]
+    assert results[0] == [{"label": "sports", "score": 0.98}]
+    assert results[1] == results[2] == [{"label": "full", "score": 0.99}]
+
+def test_cascade_caps_escalation_to_closest_calls():
+    full = _FullTopics()
+    cascade = TopicCascade(lambda: _ScoredTopics(SCORES), band=0.1, max_escalation=0.3)
+    results = cascade.predict(["sure", "unsure", "borderline"], full)
+    assert full.seen == ["borderline"]
+    assert results[1] == [{"label": "sports", "score": 0.72}]
+
+def test_tagging_service_uses_cascade_for_default_route(fake_tagger):
+    full = _FullTopics()
+    fake_tagger.topic_model = full
+    fake_tagger.cascade = TopicCascade(lambda: _ScoredTopics(SCORES), band=0.1)
+    results = fake_tagger.tag_texts_raw(["sure", "unsure"], language="en")
+    assert results[0]["tags"] == ["sports"]
+    assert results[1]["tags"] == ["full"]
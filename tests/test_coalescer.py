@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from app.services.coalescer import BatchCoalescer
+
+
+def test_tag_many_raw_matches_per_request_results(fake_tagger):
+    requests = [
+        {"texts": ["Elon Musk visited Berlin."], "domain_dict": ["berlin"]},
+        {"texts": ["NVIDIA GPUs", "Nothing here"], "language": "en", "tasks": ["ner", "topics"]},
+        {"texts": ["Elon talks AI"], "domain_dict": ["AI"], "tasks": ["domain"]},
+    ]
+    expected = [fake_tagger.tag_texts_raw(**request) for request in requests]
+    assert fake_tagger.tag_many_raw(requests) == expected
+
+def test_concurrent_submits_share_batches(fake_tagger):
+    calls = []
+    tag_many_raw = fake_tagger.tag_many_raw
+    def counting(requests):
+        calls.append(len(requests))
+        return tag_many_raw(requests)
+    fake_tagger.tag_many_raw = counting
+
+    coalescer = BatchCoalescer(lambda: fake_tagger, linger_ms=100)
+    texts = [f"NVIDIA GPU number {i}" for i in range(6)]
+    results = {}
+    def submit(text):
+        results[text] = coalescer.submit([text])
+    threads = [threading.Thread(target=submit, args=(text,)) for text in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(calls) == 6 and len(calls) < 6
+    assert all(results[text] == fake_tagger.tag_texts_raw([text]) for text in texts)
+
+def test_batch_errors_reach_every_caller(fake_tagger):
+    def failing(requests):
+        raise RuntimeError("model down")
+    fake_tagger.tag_many_raw = failing
+    with pytest.raises(RuntimeError):
+        BatchCoalescer(lambda: fake_tagger, linger_ms=0).submit(["x"])
+
+def test_missing_result_raises_instead_of_returning_none(fake_tagger):
+    fake_tagger.tag_many_raw = lambda requests: []
+    with pytest.raises(RuntimeError):
+        BatchCoalescer(lambda: fake_tagger, linger_ms=0).submit(["x"])
+
+def test_coalescing_is_disabled_outside_the_threads_pool(monkeypatch, fake_tagger):
+    from types import SimpleNamespace
+
+    from app.services import tasks as tasks_mod
+
+    coalescer = BatchCoalescer(lambda: fake_tagger)
+    monkeypatch.setattr(tasks_mod, "_coalescer", coalescer)
+    monkeypatch.setattr(tasks_mod, "_worker_pool", None)
+    monkeypatch.setattr(tasks_mod, "_init_worker_process", lambda processes, slot: None)
+    tasks_mod._on_worker_init(sender=SimpleNamespace(pool_cls="threads"))
+    assert tasks_mod._coalescer is coalescer
+    tasks_mod._on_worker_init(sender=SimpleNamespace(pool_cls="prefork"))
+    assert tasks_mod._coalescer is None
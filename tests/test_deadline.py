@@ -0,0 +1,76 @@
+import time
+
+import fakeredis
+
+from app.core.result_cache import partial_key
+from app.services.deadline import resolve_deadline, tag_within_deadline
+
+
+def _slow(tagger, seconds):
+    calls = []
+    inner = tagger.tag_texts_raw
+    def tag_texts_raw(texts, **kwargs):
+        calls.append(list(texts))
+        time.sleep(seconds)
+        return inner(texts, **kwargs)
+    tagger.tag_texts_raw = tag_texts_raw
+    return calls
+
+def test_resolve_deadline_takes_the_earlier_bound():
+    assert resolve_deadline(None, None) is None
+    assert resolve_deadline(500, None, now=100.0) == 100.5
+    assert resolve_deadline(500, "100200", now=100.0) == 100.2
+    assert resolve_deadline(None, "garbage", now=100.0) is None
+
+def test_tag_texts_within_stops_when_budget_runs_out(fake_tagger):
+    calls = _slow(fake_tagger, 0.1)
+    texts = ["Elon Musk visited Berlin.", "NVIDIA GPUs", "more text"]
+    done, unprocessed = fake_tagger.tag_texts_within(
+        texts, time.time() + 0.15, language="en", sub_batch_size=1
+    )
+    assert list(done) == [0]
+    assert unprocessed == [1, 2]
+    assert calls == [[texts[0]]]
+
+def test_retry_only_computes_the_remainder(fake_tagger):
+    fake_r = fakeredis.FakeRedis(decode_responses=True)
+    texts = ["Elon Musk visited Berlin.", "NVIDIA GPUs", "more text"]
+    payload, complete = tag_within_deadline(fake_tagger, fake_r, "retry", texts, time.time() - 1, language="en")
+    assert not complete and payload == {"results": [], "unprocessed": [0, 1, 2]}
+
+    fake_r.hset(partial_key("retry"), "0", '{"text": "cached", "tags": []}')
+    calls = _slow(fake_tagger, 0)
+    payload, complete = tag_within_deadline(fake_tagger, fake_r, "retry", texts, time.time() + 30, language="en")
+    assert complete and "unprocessed" not in payload
+    assert payload["results"][0]["text"] == "cached"
+    assert calls == [texts[1:]]
+    assert not fake_r.exists(partial_key("retry"))
+
+def test_progress_is_saved_only_from_save_from(fake_tagger, monkeypatch):
+    from app.services import deadline
+    saves = []
+    monkeypatch.setattr(deadline, "save_partial", lambda redis, key, indices, results: saves.append(indices))
+    fake_r = fakeredis.FakeRedis(decode_responses=True)
+    texts = ["Elon Musk visited Berlin.", "NVIDIA GPUs"]
+
+    payload, complete = tag_within_deadline(
+        fake_tagger, fake_r, "quiet", texts, time.time() + 30, save_from=time.time() + 30
+    )
+    assert complete and len(payload["results"]) == 2 and saves == []
+
+    tag_within_deadline(fake_tagger, fake_r, "eager", texts, time.time() + 30, save_from=0.0)
+    assert saves == [[0, 1]]
+
+def test_tag_endpoint_returns_partial_past_deadline(client, auth_headers):
+    payload = {"texts": ["Elon Musk visited Berlin.", "NVIDIA announced GPUs."], "language": "en", "timeout_ms": 1}
+    headers = {**auth_headers, "X-Deadline": str(int(time.time() * 1000) - 1000)}
+    response = client.post("/v1/tag", json=payload, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "PARTIAL"
+    assert response.json() == {"results": [], "unprocessed": [0, 1]}
+
+    # Partial responses are never cached whole; a roomier retry computes and caches them
+    payload["timeout_ms"] = 30000
+    response = client.post("/v1/tag", json=payload, headers=auth_headers)
+    assert response.headers["X-Cache"] == "MISS"
+    assert len(response.json()["results"]) == 2
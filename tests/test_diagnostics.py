@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from app.api.v1 import admin
+from app.api.v1 import tag as tag_api
+from app.core.diagnostics import ProfilerBusy, collapse, merge, sample_stacks
+from app.core.security import create_access_token
+from app.core.users import create_user, get_user
+
+
+@pytest.fixture
+def admin_headers():
+    if not get_user("test-admin"):
+        create_user("test-admin", "test-password", roles=["admin"])
+    return {"Authorization": f"Bearer {create_access_token(subject='test-admin')}"}
+
+def _busy(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+def test_sample_stacks_sees_other_threads_and_collapses():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,), name="busy-thread")
+    worker.start()
+    try:
+        counts = sample_stacks(0.2, interval_ms=2)
+    finally:
+        stop.set()
+        worker.join()
+    assert any(stack.startswith("busy-thread;") and "_busy (test_diagnostics.py" in stack for stack in counts)
+
+    text = collapse(counts)
+    assert all(line.rpartition(" ")[2].isdigit() for line in text.splitlines())
+    merged = merge({"celery@a": "x;y 3\n", "celery@b": "x;y 2\nx 1\n"})
+    assert merged == "celery@a;x;y 3\ncelery@b;x;y 2\ncelery@b;x 1\n"
+
+def test_one_cpu_profile_at_a_time():
+    thread = threading.Thread(target=sample_stacks, args=(0.3,))
+    thread.start()
+    try:
+        with pytest.raises(ProfilerBusy):
+            sample_stacks(0.1)
+    finally:
+        thread.join()
+
+def test_profile_endpoints_require_admin(client, auth_headers, admin_headers):
+    assert client.post("/v1/admin/profile/cpu?seconds=0.1", headers=auth_headers).status_code == 403
+
+    response = client.post("/v1/admin/profile/cpu?seconds=0.1&interval_ms=5", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.collapsed"')
+    assert response.text.strip()
+
+def test_worker_profile_collects_from_control_command(client, admin_headers, monkeypatch):
+    from app.workers import control
+
+    class _State:
+        hostname = "celery@test"
+
+        class consumer:
+            class pool:
+                info = {"max-concurrency": 4}
+
+    def _broadcast(command, arguments=None, destination=None, reply=False, timeout=1.0):
+        assert command == "profile_cpu"
+        return [{_State.hostname: control.profile_cpu(_State, **arguments)}]
+
+    monkeypatch.setattr(control, "get_redis", lambda: tag_api.redis)
+    monkeypatch.setattr(admin.celery_app.control, "broadcast", _broadcast)
+    response = client.post("/v1/admin/profile/cpu/workers?seconds=0.2", headers=admin_headers)
+    assert response.status_code == 200
+    assert all(line.startswith("celery@test;") for line in response.text.splitlines())
+
+def test_memory_trace_reports_growth_since_baseline(client, admin_headers):
+    assert client.get("/v1/admin/profile/memory", headers=admin_headers).status_code == 409
+    assert client.post("/v1/admin/profile/memory/start?frames=5", headers=admin_headers).status_code == 204
+    try:
+        hoard = [bytearray(1024) for _ in range(2000)]
+        response = client.get(
+            "/v1/admin/profile/memory?limit=5&include=*test_diagnostics.py", headers=admin_headers
+        )
+        assert response.status_code == 200
+        top = response.json()["top"]
+        assert top and "test_diagnostics.py" in top[0]["location"] and top[0]["size_diff_kb"] >= 2000
+        assert len(hoard) == 2000
+    finally:
+        assert client.delete("/v1/admin/profile/memory", headers=admin_headers).status_code == 204
@@ -0,0 +1,41 @@
+import logging
+
+from app.services.tagging import _match_domain_terms
+
+
+def test_tag_texts_raw_matches_validated_results(fake_tagger):
+    texts = ["Elon Musk visited Berlin for AI talks.", "Nothing to see here."]
+    raw = fake_tagger.tag_texts_raw(texts, language="en", domain_dict=["AI", "berlin"])
+    validated = fake_tagger.tag_texts(texts, language="en", domain_dict=["AI", "berlin"])
+    assert raw == [result.model_dump() for result in validated]
+
+def test_fusion_keeps_max_score_per_tag(fake_tagger):
+    # "berlin" comes from NER (0.98) and the domain dict (0.85); NER wins and ordering follows scores
+    result = fake_tagger.tag_texts_raw(["Elon Musk visited Berlin."], domain_dict=["Berlin", "visited"])[0]
+    assert result["tags"] == ["elon musk", "berlin", "visited", "business"]
+    assert result["topics"] == [{"label": "business", "score": 0.80}]
+
+def test_domain_matching_respects_word_boundaries():
+    assert _match_domain_terms("AI systems and BRAIN scans", ["ai"]) == {"ai"}
+    assert _match_domain_terms("anything", []) == set()
+
+def test_debug_logging_includes_fusion(fake_tagger, caplog):
+    with caplog.at_level(logging.DEBUG, logger="app.services.tagging"):
+        fake_tagger.tag_texts_raw(["NVIDIA GPUs"])
+    assert any("Combined" in record.getMessage() for record in caplog.records)
+
+class _Exploding:
+    labels = []
+    def predict(self, texts):
+        raise AssertionError("model should not run")
+
+def test_domain_only_skips_models(fake_tagger):
+    fake_tagger.ner_model = fake_tagger.topic_model = _Exploding()
+    result = fake_tagger.tag_texts_raw(["Elon Musk talks AI"], domain_dict=["AI"], tasks=["domain"])[0]
+    assert result == {"text": "Elon Musk talks AI", "tags": ["ai"], "language": None, "ner": None, "topics": None}
+
+def test_ner_only_skips_topics_and_domain(fake_tagger):
+    fake_tagger.topic_model = _Exploding()
+    result = fake_tagger.tag_texts_raw(["Elon Musk talks AI"], domain_dict=["AI"], tasks=["ner"])[0]
+    assert result["tags"] == ["elon musk"]
+    assert result["topics"] is None and result["ner"][0]["label"] == "PER"
@@ -0,0 +1,26 @@
+from app.core.hash import canonical_digest
+
+
+def test_canonical_digest_normalizes_texts_language_and_terms():
+    a = canonical_digest(texts=["  Hello world "], language=" EN", domain_dict=["b", "a ", "a"])
+    b = canonical_digest(texts=["Hello world"], language="en", domain_dict=["a", "b"])
+    assert a == b
+
+def test_canonical_digest_separates_fields_and_texts():
+    base = canonical_digest(texts=["ab", "c"], language=None, domain_dict=None)
+    assert base.key != canonical_digest(texts=["a", "bc"], language=None, domain_dict=None).key
+    assert base.key != canonical_digest(texts=["ab", "c"], language="en", domain_dict=None).key
+    assert base.key != canonical_digest(texts=["ab", "c"], language=None, domain_dict=["ab"]).key
+
+def test_canonical_digest_returns_per_text_digests():
+    digest = canonical_digest(texts=["same", "other", " same "], language="en", domain_dict=None)
+    assert len(digest.text_digests) == 3
+    assert digest.text_digests[0] == digest.text_digests[2] != digest.text_digests[1]
+    # Per-text digests don't depend on the rest of the request
+    assert canonical_digest(texts=["same"], language="fr", domain_dict=["x"]).text_digests[0] == digest.text_digests[0]
+
+def test_canonical_digest_includes_task_selection():
+    base = dict(texts=["x"], language=None, domain_dict=None)
+    assert canonical_digest(**base, tasks={"domain"}).key != canonical_digest(**base, tasks={"ner", "domain"}).key
+    listed = canonical_digest(**base, tasks=["ner", "domain"]).key
+    assert listed == canonical_digest(**base, tasks={"domain", "ner"}).key
@@ -0,0 +1,65 @@
+import asyncio
+
+import fakeredis
+
+import app.main as main_mod
+from app.services.health import HEALTH_CHECK_DURATION, HealthMonitor
+
+_redis = fakeredis.FakeRedis(decode_responses=True)
+
+
+class _Control:
+    def __init__(self, replies):
+        self.replies = replies
+        self.pings = 0
+
+    def ping(self, timeout=1):
+        self.pings += 1
+        if isinstance(self.replies, Exception):
+            raise self.replies
+        return self.replies
+
+class _Celery:
+    def __init__(self, replies):
+        self.control = _Control(replies)
+
+def _monitor(replies, **kwargs):
+    return HealthMonitor(lambda: _redis, _Celery(replies), queue_name="health-test", **kwargs)
+
+def test_probes_serve_the_snapshot_without_io(client, monkeypatch):
+    monitor = _monitor([{"celery@a": {"ok": "pong"}}])
+    monkeypatch.setattr(main_mod, "health_monitor", monitor)
+    before = HEALTH_CHECK_DURATION.labels(check="celery")._sum.get()
+
+    for _ in range(3):
+        assert client.get("/readyz").json()["ready"] is True
+        assert client.get("/healthz").json()["status"] == "up"
+    # First probe took the snapshot inline; the rest only read it
+    assert monitor._celery_app.control.pings == 1
+    assert HEALTH_CHECK_DURATION.labels(check="celery")._sum.get() > before
+
+def test_readyz_fails_without_workers_or_when_stale(client, monkeypatch):
+    monitor = _monitor(RuntimeError("broker down"))
+    monkeypatch.setattr(main_mod, "health_monitor", monitor)
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["detail"]["errors"] == {"celery": "broker down"}
+
+    monitor = _monitor([{"celery@a": {"ok": "pong"}}], stale_s=0.0)
+    monkeypatch.setattr(main_mod, "health_monitor", monitor)
+    response = client.get("/readyz")
+    assert response.status_code == 503 and response.json()["detail"]["stale"] is True
+    assert client.get("/healthz").json()["status"] == "degraded"
+
+def test_background_loop_refreshes_and_stops():
+    monitor = _monitor([{"celery@a": {"ok": "pong"}}], interval_s=0.01)
+
+    async def _run():
+        monitor.start()
+        await asyncio.sleep(0.2)
+        await monitor.stop()
+
+    asyncio.run(_run())
+    pings = monitor._celery_app.control.pings
+    assert pings >= 2
+    assert monitor.snapshot().celery_replies == 1 and monitor._celery_app.control.pings == pings
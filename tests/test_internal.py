@@ -0,0 +1,47 @@
+import pytest
+
+from app.core.framing import FRAMES_MEDIA_TYPE, FrameDecoder, pack_frame, unpack_frames
+from app.core.security import create_access_token
+from app.core.users import create_user, get_user
+
+
+@pytest.fixture()
+def internal_headers(test_password, test_tenant):
+    if not get_user("test-internal"):
+        create_user("test-internal", test_password, tenant_id=test_tenant, roles=["internal"])
+    token = create_access_token(subject="test-internal", extra={"tenant_id": test_tenant, "roles": ["internal"]})
+    return {"Authorization": f"Bearer {token}", "Content-Type": FRAMES_MEDIA_TYPE}
+
+def test_frame_decoder_handles_split_chunks():
+    data = pack_frame({"id": 1, "texts": ["a"]}) + pack_frame({"id": 2, "texts": ["b" * 300]})
+    decoder = FrameDecoder()
+    frames = []
+    for i in range(0, len(data), 7):
+        frames += decoder.feed(data[i:i + 7])
+    assert [f["id"] for f in frames] == [1, 2] and decoder.pending == 0
+    with pytest.raises(ValueError):
+        FrameDecoder(max_bytes=4).feed(data)
+
+def test_internal_stream_shares_cache_with_json_api(client, internal_headers, auth_headers):
+    texts = ["Elon Musk visited Berlin.", "NVIDIA announced new GPUs."]
+    body = (
+        pack_frame({"id": "a", "texts": texts, "language": "en"})
+        + pack_frame({"id": "b", "texts": []})
+        + pack_frame({"id": "c", "texts": texts, "tasks": [["ner"]]})
+    )
+    response = client.post("/v1/internal/tag", content=body, headers=internal_headers)
+    assert response.status_code == 200
+    first, second, third = unpack_frames(response.content)
+    assert first["id"] == "a" and len(first["results"]) == 2
+    assert "text" not in first["results"][0]
+    assert first["results"][0]["ner"][0]["text"] == "Elon Musk"
+    assert second["id"] == "b" and second["error"]["code"] == "BAD_REQUEST"
+    assert third["id"] == "c" and third["error"]["code"] == "BAD_REQUEST"
+
+    cached = client.post("/v1/tag", json={"texts": texts, "language": "en"}, headers=auth_headers)
+    assert cached.headers["X-Cache"] == "HIT"
+
+def test_internal_requires_role_and_media_type(client, auth_headers, internal_headers):
+    assert client.post("/v1/internal/tag", content=b"", headers=auth_headers).status_code == 403
+    headers = {**internal_headers, "Content-Type": "application/json"}
+    assert client.post("/v1/internal/tag", content=b"{}", headers=headers).status_code == 415
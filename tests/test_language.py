@@ -0,0 +1,105 @@
+import threading
+
+from app.models.pool import ModelPool
+from app.services.language import detect_language, normalize_language
+from app.services.tagging import DEFAULT_LANGUAGE_MODELS
+
+
+class _TaggedNER:
+    def __init__(self, tag):
+        self.tag = tag
+    def predict(self, texts):
+        return [[{"text": self.tag, "label": "MISC", "score": 0.9}] for _ in texts]
+
+class _NoTopics:
+    labels = []
+    def predict(self, texts):
+        return [[] for _ in texts]
+
+def test_detect_language():
+    assert detect_language("The company said that it was going to expand in the region.") == "en"
+    assert detect_language("Le président est arrivé dans la ville pour une visite avec les ministres.") == "fr"
+    assert detect_language("Die Regierung hat das Gesetz nicht mit der Mehrheit beschlossen.") == "de"
+    assert detect_language("El gobierno de la ciudad anunció que los precios son más altos.") == "es"
+    assert detect_language("東京で新しいモデルが発表された") == "ja"
+    assert detect_language("Новая модель была представлена") == "ru"
+    # Too little signal: keep the default
+    assert detect_language("NVIDIA GPUs") == "en"
+
+def test_normalize_language():
+    assert normalize_language(" EN-us ") == "en"
+    assert normalize_language("pt_BR") == "pt"
+    assert normalize_language("") is None
+
+def test_routes_non_native_texts_to_pool_models(fake_tagger):
+    loaded = []
+
+    def _loader(kind, name):
+        loaded.append((kind, name))
+        return _TaggedNER("multilingual") if kind == "ner" else _NoTopics()
+
+    fake_tagger.language_routing = True
+    fake_tagger.model_pool = ModelPool(_loader, budget_mb=10_000)
+    texts = [
+        "Elon Musk visited Berlin.",
+        "Die Regierung hat das Gesetz nicht mit der Mehrheit beschlossen.",
+        "NVIDIA announced new GPUs.",
+    ]
+    results = fake_tagger.tag_texts_raw(texts)
+    assert [r["language"] for r in results] == ["en", "de", "en"]
+    assert [r["text"] for r in results] == texts
+    assert results[1]["tags"] == ["multilingual"]
+    assert "berlin" in results[0]["tags"] and "nvidia" in results[2]["tags"]
+    assert sorted(kind for kind, _ in loaded) == ["ner", "zero_shot"]
+
+def test_language_hint_overrides_detection(fake_tagger):
+    fake_tagger.language_routing = True
+    results = fake_tagger.tag_texts_raw(["Die Regierung hat das Gesetz beschlossen."], language="EN")
+    assert results[0]["language"] == "en"
+
+def test_routing_off_echoes_the_hint_and_loads_no_extra_models(fake_tagger):
+    loaded = []
+    fake_tagger.model_pool = ModelPool(lambda kind, name: loaded.append(name) or object(), budget_mb=10_000)
+    texts = ["Die Regierung hat das Gesetz nicht mit der Mehrheit beschlossen."]
+    assert fake_tagger.tag_texts_raw(texts, language="DE-at")[0]["language"] == "DE-at"
+    assert fake_tagger.tag_texts_raw(texts)[0]["language"] is None
+    fake_tagger.preload_language_models()
+    assert loaded == []
+
+    fake_tagger.language_routing = True
+    fake_tagger.preload_language_models()
+    assert sorted(loaded) == sorted(DEFAULT_LANGUAGE_MODELS["*"].values())
+
+def test_model_pool_evicts_least_recently_used():
+    pool = ModelPool(lambda kind, name: object(), budget_mb=1000, default_size_mb=400)
+    pool.get("ner", "a")
+    pool.get("ner", "b")
+    pool.get("ner", "a")
+    pool.get("ner", "c")
+    assert ("ner", "b") not in pool
+    assert ("ner", "a") in pool and ("ner", "c") in pool
+    assert pool.used_mb == 800
+
+def test_model_pool_loads_outside_the_pool_lock():
+    release = threading.Event()
+    loads = []
+
+    def _loader(kind, name):
+        loads.append(name)
+        if name == "slow":
+            assert release.wait(5)
+        return object()
+
+    pool = ModelPool(_loader, budget_mb=10_000)
+    loaded = pool.get("ner", "loaded")
+    threads = [threading.Thread(target=pool.get, args=("ner", "slow")) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    try:
+        # Already-loaded models stay available while another model loads
+        assert pool.get("ner", "loaded") is loaded
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert loads == ["loaded", "slow"] and ("ner", "slow") in pool
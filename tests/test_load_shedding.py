@@ -0,0 +1,79 @@
+import fakeredis
+
+from app.api.v1 import tag as tag_api
+from app.services.load_shedding import LoadShedder
+
+
+def test_steps_down_under_queue_pressure_and_recovers():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    shedder = LoadShedder(lambda: r, queue_name="tagging", queue_depth=10, interval_s=0, recover_s=0)
+    assert shedder.current() == "full"
+
+    r.rpush("tagging", *range(50))
+    assert [shedder.current() for _ in range(4)] == ["no_topics", "ner_only", "domain_only", "domain_only"]
+    assert shedder.allowed(frozenset({"ner", "topics", "domain"})) == {"domain"}
+
+    r.delete("tagging")
+    shedder.current()  # starts the calm period
+    assert shedder.current() == "ner_only"
+
+def test_latency_pressure_counts():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    shedder = LoadShedder(lambda: r, p95_ms=100, interval_s=0)
+    for _ in range(20):
+        shedder.observe(latency_ms=500)
+    assert shedder.current() == "no_topics"
+
+def test_queue_is_read_outside_the_lock():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    held = []
+
+    class _Redis:
+        def llen(self, key):
+            held.append(shedder._lock.locked())
+            return r.llen(key)
+
+    shedder = LoadShedder(lambda: _Redis(), queue_name="tagging", queue_depth=10, interval_s=0)
+    r.rpush("tagging", *range(50))
+    assert shedder.current() == "no_topics"
+    assert held and not any(held)
+
+def test_degraded_responses_skip_stages_and_say_so(client, auth_headers, monkeypatch):
+    shedder = LoadShedder(lambda: tag_api.redis, interval_s=3600)
+    shedder._index, shedder._last_eval = 1, float("inf")
+    monkeypatch.setattr(tag_api, "_shedder", shedder)
+
+    response = client.post("/v1/tag", json={"texts": ["Shedding NVIDIA GPUs"]}, headers=auth_headers)
+    assert response.headers["X-Service-Level"] == "no_topics"
+    result = response.json()["results"][0]
+    assert result["topics"] is None and result["ner"][0]["text"] == "NVIDIA"
+
+def test_nothing_left_to_serve_runs_no_models(client, auth_headers, monkeypatch):
+    shedder = LoadShedder(lambda: tag_api.redis, interval_s=3600)
+    shedder._index, shedder._last_eval = 2, float("inf")
+    monkeypatch.setattr(tag_api, "_shedder", shedder)
+
+    def _no_models(*args, **kwargs):
+        raise AssertionError("no stage should run")
+    monkeypatch.setattr(tag_api.tagger, "tag_texts_raw", _no_models)
+
+    payload = {"texts": ["Topics only while shedding NVIDIA"], "tasks": ["topics"]}
+    response = client.post("/v1/tag", json=payload, headers=auth_headers)
+    assert response.status_code == 200 and response.headers["X-Service-Level"] == "ner_only"
+    result = response.json()["results"][0]
+    assert result["ner"] is None and result["topics"] is None and result["tags"] == []
+
+def test_shed_cache_hits_are_refreshed_when_stale(client, auth_headers, monkeypatch):
+    shedder = LoadShedder(lambda: tag_api.redis, interval_s=3600)
+    shedder._index, shedder._last_eval = 1, float("inf")
+    monkeypatch.setattr(tag_api, "_shedder", shedder)
+
+    payload = {"texts": ["Stale shed entry for NVIDIA"]}
+    assert client.post("/v1/tag", json=payload, headers=auth_headers).headers["X-Cache"] == "MISS"
+
+    refreshed = []
+    monkeypatch.setattr(tag_api, "freshness", lambda pttl, compute_ms: tag_api.STALE)
+    monkeypatch.setattr(tag_api, "_schedule_refresh", lambda key, trigger: refreshed.append(trigger))
+    response = client.post("/v1/tag", json=payload, headers=auth_headers)
+    assert response.headers["X-Cache"] == "STALE" and response.headers["X-Service-Level"] == "no_topics"
+    assert refreshed == [tag_api.STALE]
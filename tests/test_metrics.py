@@ -0,0 +1,47 @@
+import time
+
+from app.core import metrics as metrics_mod
+from app.core.metrics import METRICS_HASH, MetricsBuffer, RedisCeleryCollector
+from app.core.redis_client import get_redis
+
+
+def _families():
+    return {family.name: family for family in RedisCeleryCollector().collect()}
+
+def test_buffer_aggregates_until_flush():
+    redis = get_redis()
+    redis.delete(METRICS_HASH)
+    buffer = MetricsBuffer(lambda: redis, flush_interval_s=3600)
+    buffer.incr("tasks_total:success")
+    buffer.incr("tasks_total:success")
+    assert not redis.exists(METRICS_HASH)
+
+    buffer.flush()
+    assert redis.hget(METRICS_HASH, "tasks_total:success") == "2"
+
+def test_buffer_flushes_on_a_timer_without_new_observations():
+    redis = get_redis()
+    redis.delete(METRICS_HASH)
+    buffer = MetricsBuffer(lambda: redis, flush_interval_s=0.05)
+    buffer.incr("tasks_total:failure")
+    deadline = time.monotonic() + 2
+    while not redis.exists(METRICS_HASH) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert redis.hget(METRICS_HASH, "tasks_total:failure") == "1"
+
+def test_histogram_buckets_are_cumulative(monkeypatch):
+    monkeypatch.setattr(metrics_mod, "HIST_BUCKETS_MS", [100, 1000])
+    redis = get_redis()
+    redis.delete(METRICS_HASH)
+    buffer = MetricsBuffer(lambda: redis, flush_interval_s=3600)
+    for ms in (40, 300, 5000):
+        buffer.observe("task_duration_ms", ms, [100, 1000])
+    buffer.flush()
+
+    histogram = _families()["tagging_task_duration_seconds"]
+    samples = {(s.name, s.labels.get("le")): s.value for s in histogram.samples}
+    assert samples[("tagging_task_duration_seconds_bucket", "0.1")] == 1
+    assert samples[("tagging_task_duration_seconds_bucket", "1")] == 2
+    assert samples[("tagging_task_duration_seconds_bucket", "+Inf")] == 3
+    assert samples[("tagging_task_duration_seconds_count", None)] == 3
+    assert samples[("tagging_task_duration_seconds_sum", None)] == 5.34
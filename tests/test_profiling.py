@@ -0,0 +1,43 @@
+from prometheus_client import REGISTRY
+
+from app.core.profiling import profile, profiling, record_batch, server_timing, stage
+
+
+def test_profile_collects_stage_breakdown():
+    with profile(True) as breakdown:
+        with stage("unit.a"):
+            pass
+        with stage("unit.a"):
+            pass
+        with stage("unit.b"):
+            pass
+    assert set(breakdown) == {"unit.a", "unit.b"}
+    assert all(ms >= 0.0 for ms in breakdown.values())
+    assert "unit_a;dur=" in server_timing(breakdown)
+
+def test_stage_outside_profile_still_observes_histogram():
+    with profile(False) as breakdown:
+        with stage("unit.c"):
+            pass
+    assert breakdown is None
+    assert REGISTRY.get_sample_value("tagging_stage_duration_seconds_count", {"stage": "unit.c"}) == 1.0
+
+def test_record_batch_counts_tokens_and_padding():
+    before = REGISTRY.get_sample_value("tagging_tokens_processed_total", {"model": "unit"}) or 0.0
+    record_batch("unit", [4, 2], extra_tokens=1)
+    after = REGISTRY.get_sample_value("tagging_tokens_processed_total", {"model": "unit"})
+    assert after - before == 7
+    assert REGISTRY.get_sample_value("tagging_model_padding_ratio_sum", {"model": "unit"}) == 0.25
+
+def test_record_batch_uses_the_pipeline_batch_size():
+    before = REGISTRY.get_sample_value("tagging_model_batch_size_count", {"model": "unit-b1"}) or 0.0
+    record_batch("unit-b1", [4, 2, 3], batch_size=1)
+    assert REGISTRY.get_sample_value("tagging_model_batch_size_count", {"model": "unit-b1"}) - before == 3
+    assert REGISTRY.get_sample_value("tagging_model_padding_ratio_sum", {"model": "unit-b1"}) == 0.0
+
+def test_profiling_flag_follows_profile():
+    assert not profiling()
+    with profile(True):
+        assert profiling()
+    with profile(False):
+        assert not profiling()
@@ -0,0 +1,29 @@
+from app.api.v1 import tag as tag_api
+from app.core.result_cache import CACHE_STALE_TTL, EARLY, FRESH, STALE, freshness, refresh_lock_key
+
+
+def test_freshness_windows():
+    stale_ms = CACHE_STALE_TTL * 1000
+    assert freshness(-1, None) == FRESH
+    assert freshness(stale_ms - 1, "100") == STALE
+    assert freshness(stale_ms + 60_000, "100", rand=0.5) == FRESH
+    # Expensive entries close to soft expiry refresh early
+    assert freshness(stale_ms + 100, "1000", rand=0.5) == EARLY
+    assert freshness(stale_ms + 100, "1000", beta=0, rand=0.5) == FRESH
+
+def test_stale_entry_is_served_and_refreshed(client, auth_headers):
+    payload = {"texts": ["Stale NVIDIA GPUs in Berlin"]}
+    miss = client.post("/v1/tag", json=payload, headers=auth_headers)
+    assert miss.headers["X-Cache"] == "MISS"
+
+    key = next(k for k in tag_api.redis.scan_iter("tagresp:*") if tag_api.redis.get(k) == miss.text)
+    cache_key = key.split(":", 1)[1]
+    tag_api.redis.pexpire(key, 1000)
+
+    # Eager Celery runs the refresh inline: the stale body is served, then the entry is fresh again
+    stale = client.post("/v1/tag", json=payload, headers=auth_headers)
+    assert stale.headers["X-Cache"] == "STALE"
+    assert stale.content == miss.content
+    assert tag_api.redis.pttl(key) > CACHE_STALE_TTL * 1000
+    assert not tag_api.redis.exists(refresh_lock_key(cache_key))
+    assert client.post("/v1/tag", json=payload, headers=auth_headers).headers["X-Cache"] == "HIT"
@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+
+from app.core.result_store import ResultStore
+
+
+class _CountingNER:
+    model_name = "fake-ner"
+    min_score = 0.6
+    min_len = 2
+    def __init__(self):
+        self.seen = []
+    def predict(self, texts):
+        self.seen.extend(texts)
+        return [[{"text": "Berlin", "type": "LOC", "score": 0.9}] for _ in texts]
+
+def test_bulk_round_trip_is_scoped_by_version_and_config(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    store.put_many("ner:a", "cfg1", {"d1": [{"text": "x"}], "d2": []})
+    assert store.get_many("ner:a", "cfg1", ["d1", "d2", "d3"]) == {"d1": [{"text": "x"}], "d2": []}
+    assert store.get_many("ner:b", "cfg1", ["d1"]) == {}
+    assert store.get_many("ner:a", "cfg2", ["d1"]) == {}
+
+def test_compaction_evicts_least_recently_read(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"), max_mb=0.0005, compact_every=10**6)
+    for i in range(20):
+        store.put_many("m", "c", {f"d{i}": "x" * 50})
+    store.get_many("m", "c", ["d0"])
+    assert store.compact() > 0
+    assert store.size_bytes() <= store.max_bytes
+    assert "d0" in store.get_many("m", "c", ["d0"])
+    assert store.get_many("m", "c", ["d1"]) == {}
+
+def test_failed_access_time_update_keeps_the_hits(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    store = ResultStore(path, touch_every=1)
+    store.put_many("m", "c", {"d1": "x"})
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TRIGGER frozen BEFORE UPDATE ON results BEGIN SELECT RAISE(ABORT, 'frozen'); END")
+    assert store.get_many("m", "c", ["d1"]) == {"d1": "x"}
+
+def test_compaction_runs_off_the_writing_thread(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"), max_mb=0.0005, compact_every=20)
+    for i in range(20):
+        store.put_many("m", "c", {f"d{i}": "x" * 50})
+    for thread in threading.enumerate():
+        if thread.name == "result-store-compact":
+            thread.join(5)
+    assert store.size_bytes() <= store.max_bytes
+
+def test_service_only_computes_store_misses(fake_tagger, tmp_path):
+    fake_tagger.result_store = ResultStore(str(tmp_path / "results.sqlite3"))
+    fake_tagger.ner_model = ner = _CountingNER()
+    first = fake_tagger.tag_texts_raw(["Berlin calling", "Hello Berlin"], tasks=["ner"])
+    second = fake_tagger.tag_texts_raw(["Hello Berlin", "Berlin calling", "New text"], tasks=["ner"])
+    assert ner.seen == ["Berlin calling", "Hello Berlin", "New text"]
+    assert second[1]["ner"] == first[0]["ner"]
+
+    # A config change must not reuse outputs computed under the old config
+    ner.min_score = 0.9
+    fake_tagger.tag_texts_raw(["Berlin calling"], tasks=["ner"])
+    assert ner.seen[-1] == "Berlin calling"
@@ -0,0 +1,45 @@
+from app.core.runtime import inference_mode, plan_layout
+
+
+def test_layout_splits_cores_across_processes():
+    layout = plan_layout("worker", processes=2, cpus=list(range(16)), intra_op=0, interop=0, pin=False)
+    assert (layout.intra_op_threads, layout.interop_threads, layout.affinity) == (8, 1, None)
+
+    pinned = [
+        plan_layout("worker", processes=4, slot=slot, cpus=list(range(16)), intra_op=0, interop=0, pin=True)
+        for slot in range(4)
+    ]
+    assert [layout.affinity for layout in pinned] == [list(range(i, i + 4)) for i in (0, 4, 8, 12)]
+
+def test_layout_overrides_and_oversubscribed_nodes():
+    layout = plan_layout("api", processes=8, cpus=[0, 1], intra_op=0, interop=0, pin=True)
+    assert (layout.intra_op_threads, layout.affinity) == (1, None)
+    assert plan_layout("api", processes=1, cpus=[0, 1], intra_op=3, interop=2, pin=False)[4:6] == (3, 2)
+
+def test_inference_mode_is_usable_without_torch():
+    with inference_mode():
+        pass
+
+def test_threads_pool_worker_is_set_up_as_one_process(monkeypatch):
+    from types import SimpleNamespace
+
+    from app.services import tasks as tasks_mod
+    from app.workers import control
+
+    configured, warmed, installed = [], [], []
+    monkeypatch.setattr(tasks_mod, "_worker_pool", None)
+    monkeypatch.setattr(tasks_mod, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(tasks_mod.runtime, "configure", lambda role, processes, slot=0: configured.append(processes))
+    monkeypatch.setattr(tasks_mod, "warm_up", lambda tagger, role: warmed.append(role))
+    monkeypatch.setattr(control, "install_profile_signal", lambda: installed.append(True))
+
+    for pool in ("prefork", "threads"):
+        tasks_mod._on_worker_init(sender=SimpleNamespace(pool_cls=pool))
+        control._install_profiler_in_process(sender=SimpleNamespace(pool_cls=pool))
+    # Prefork sets up each child from worker_process_init instead
+    assert configured == [1] and warmed == ["worker"] and installed == [True]
+
+    # A solo worker does get worker_process_init, but is still the only process
+    tasks_mod._on_worker_init(sender=SimpleNamespace(pool_cls="solo"))
+    tasks_mod._warmup_models()
+    assert configured == [1, 1]
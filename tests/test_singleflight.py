@@ -0,0 +1,51 @@
+import threading
+import time
+
+import fakeredis
+
+from app.core.singleflight import SingleFlight
+
+
+def _flight(**kwargs):
+    r = fakeredis.FakeRedis(decode_responses=True)
+    return r, SingleFlight(lambda: r, **kwargs)
+
+def test_concurrent_local_misses_compute_once():
+    r, flight = _flight()
+    calls = []
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        r.set("result", "value")
+        return "value"
+
+    outcomes = []
+    threads = [
+        threading.Thread(target=lambda: outcomes.append(flight.run("k", "result", compute)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(outcome for _, outcome in outcomes) == ["leader"] + ["local"] * 7
+    assert all(value == "value" for value, _ in outcomes)
+    assert not r.exists("sf:k")
+
+def test_waits_on_lease_held_by_another_instance():
+    r, flight = _flight()
+    r.set("sf:k", "other-instance", px=5000)
+    threading.Timer(0.05, lambda: r.set("result", "remote-value")).start()
+    assert flight.run("k", "result", lambda: "computed") == ("remote-value", "remote")
+
+def test_falls_back_to_computing_when_wait_expires():
+    r, flight = _flight(wait_ms=50)
+    r.set("sf:k", "stuck-instance", px=5000)
+    assert flight.run("k", "result", lambda: "computed") == ("computed", "timeout")
+
+def test_rejected_results_are_not_shared():
+    r, flight = _flight(wait_ms=50)
+    r.set("sf:k", "other-instance", px=5000)
+    r.set("result", '{"error": {}}')
+    assert flight.run("k", "result", lambda: "computed", accept=lambda v: v.startswith('{"results"'))[0] == "computed"
@@ -0,0 +1,63 @@
+from app.api.v1 import tag as tag_api
+from app.services.taxonomy import Taxonomy
+
+TREE = {
+    "technology": {"hardware": ["gpus", "chips"], "software": ["databases", "compilers"]},
+    "sports": ["football", "tennis"],
+    "food": None,
+}
+
+class _KeywordScores:
+    """
+    Scores a label 0.9 when it (or a word it implies) appears in the text, else 0.1.
+    """
+    IMPLIES = {"technology": "nvidia", "hardware": "gpu", "gpus": "gpu", "sports": "tennis"}
+
+    def __init__(self):
+        self.threshold, self.top_k = 0.5, 5
+        self.calls = []
+
+    def predict(self, texts):
+        return [[] for _ in texts]
+
+    def predict_scores(self, texts, labels=None):
+        self.calls.append(sorted(labels))
+        return [
+            {label: 0.9 if (self.IMPLIES.get(label, label) in text.lower()) else 0.1 for label in labels}
+            for text in texts
+        ]
+
+def test_taxonomy_only_expands_confident_branches():
+    model = _KeywordScores()
+    taxonomy = Taxonomy(TREE, expand_threshold=0.5, max_expand=2)
+    assert taxonomy.size == 11
+
+    results = taxonomy.predict(["NVIDIA ships a new GPU", "Cooking tonight"], model)
+    assert model.calls == [["food", "sports", "technology"], ["hardware", "software"], ["chips", "gpus"]]
+    assert results[0] == [
+        {"label": "technology", "score": 0.9, "path": ["technology"]},
+        {"label": "hardware", "score": 0.9, "path": ["technology", "hardware"]},
+        {"label": "gpus", "score": 0.9, "path": ["technology", "hardware", "gpus"]},
+    ]
+    assert results[1] == []
+
+def test_tenant_taxonomy_changes_fingerprint_and_topics(fake_tagger):
+    fake_tagger.topic_model = _KeywordScores()
+    flat = fake_tagger.config_fingerprint("acme")
+    fake_tagger.taxonomies = {"acme": Taxonomy(TREE)}
+    assert fake_tagger.config_fingerprint("acme") != flat
+    assert fake_tagger.config_fingerprint("other") == flat
+
+    result = fake_tagger.tag_texts_raw(["NVIDIA GPU news"], language="en", tenant="acme")[0]
+    assert [t["path"] for t in result["topics"]][-1] == ["technology", "hardware", "gpus"]
+    assert fake_tagger.tag_texts_raw(["NVIDIA GPU news"], language="en", tenant="other")[0]["topics"] is None
+
+def test_tag_endpoint_uses_callers_tenant_taxonomy(client, auth_headers, test_tenant, monkeypatch):
+    monkeypatch.setattr(tag_api.tagger, "topic_model", _KeywordScores())
+    monkeypatch.setattr(tag_api.tagger, "taxonomies", {test_tenant: Taxonomy(TREE)})
+    response = client.post("/v1/tag", json={"texts": ["Tennis final tonight"], "language": "en"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["results"][0]["topics"] == [
+        {"label": "sports", "score": 0.9, "path": ["sports"]},
+        {"label": "tennis", "score": 0.9, "path": ["sports", "tennis"]},
+    ]
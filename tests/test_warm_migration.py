@@ -0,0 +1,87 @@
+import pytest
+
+from app.api.v1 import tag as tag_api
+from app.core.hash import canonical_digest
+from app.core.security import create_access_token
+from app.core.users import create_user, get_user
+from app.services import warm_migration
+from app.services.warm_migration import count_hot, hot_key, migrate, migration_status
+
+
+@pytest.fixture()
+def cold_cache(monkeypatch):
+    # Count every lookup, and start from no hot keys: earlier tests share the fake Redis
+    monkeypatch.setattr(warm_migration, "HOT_KEY_SAMPLE_RATE", 1.0)
+    for key in tag_api.redis.scan_iter(hot_key("*")):
+        tag_api.redis.delete(key)
+
+def test_fingerprint_tracks_thresholds_and_weights(fake_tagger):
+    before = fake_tagger.config_fingerprint()
+    assert type(fake_tagger)().config_fingerprint() == before
+    fake_tagger.topic_model.threshold = 0.5
+    assert fake_tagger.config_fingerprint() != before
+
+    base = dict(texts=["x"], language=None, domain_dict=None)
+    assert canonical_digest(**base, fingerprint=before).key != canonical_digest(**base, fingerprint="other").key
+
+def test_hot_key_counts_are_sampled_and_scaled(monkeypatch, cold_cache):
+    monkeypatch.setattr(warm_migration, "HOT_KEY_SAMPLE_RATE", 0.25)
+    draws = iter([0.1, 0.9, 0.3, 0.5])
+    monkeypatch.setattr(warm_migration.random, "random", lambda: next(draws))
+    pipe = tag_api.redis.pipeline(transaction=False)
+    for _ in range(4):
+        count_hot(pipe, "fp", "k")
+    assert len(pipe) == 1
+    pipe.execute()
+    assert tag_api.redis.zscore(hot_key("fp"), "k") == 4.0
+
+def test_migration_retags_hot_keys_under_new_fingerprint(client, auth_headers, fake_tagger, cold_cache):
+    payload = {"texts": ["Warm migration of NVIDIA GPUs"], "domain_dict": ["gpus"]}
+    assert client.post("/v1/tag", json=payload, headers=auth_headers).status_code == 200
+    old = tag_api.tagger.config_fingerprint()
+    assert tag_api.redis.zscore(hot_key(old), canonical_digest(
+        texts=payload["texts"],
+        language=None,
+        domain_dict=payload["domain_dict"],
+        tasks=["domain", "ner", "topics"],
+        fingerprint=old
+    ).key) >= 1
+
+    fake_tagger.domain_boost = 0.9
+    status = migrate(tag_api.redis, fake_tagger, old, limit=10)
+    assert status["state"] == "done" and status["failed"] == 0 and status["done"] >= 1
+
+    digest = canonical_digest(
+        texts=payload["texts"],
+        language=None,
+        domain_dict=payload["domain_dict"],
+        tasks=["domain", "ner", "topics"],
+        fingerprint=fake_tagger.config_fingerprint()
+    )
+    assert tag_api.redis.get(f"tagresp:{digest.key}").startswith('{"results"')
+    assert migration_status(tag_api.redis)["target"] == fake_tagger.config_fingerprint()
+
+def test_recipes_expire_with_the_response_and_dead_keys_leave_the_hot_set(
+    client, auth_headers, fake_tagger, cold_cache
+):
+    payload = {"texts": ["Recipes must not outlive the response"]}
+    assert client.post("/v1/tag", json=payload, headers=auth_headers).status_code == 200
+    old = tag_api.tagger.config_fingerprint()
+    (key, _), = tag_api.redis.zrevrange(hot_key(old), 0, 0, withscores=True)
+    assert 0 < tag_api.redis.ttl(f"tagreq:{key}") <= tag_api.redis.ttl(f"tagresp:{key}")
+
+    tag_api.redis.delete(f"tagreq:{key}", f"tagresp:{key}")
+    fake_tagger.domain_boost = 0.9
+    status = migrate(tag_api.redis, fake_tagger, old, limit=10)
+    assert status["skipped"] == 1 and status["done"] == 0
+    assert tag_api.redis.zscore(hot_key(old), key) is None
+
+def test_admin_migration_endpoints_require_admin(client, auth_headers):
+    assert client.get("/v1/admin/cache/migration", headers=auth_headers).status_code == 403
+
+    if not get_user("test-admin"):
+        create_user("test-admin", "test-password", roles=["admin"])
+    admin = {"Authorization": f"Bearer {create_access_token(subject='test-admin')}"}
+    response = client.get("/v1/admin/cache/migration", headers=admin)
+    assert response.status_code == 200
+    assert response.json()["fingerprint"] == tag_api.tagger.config_fingerprint()
@@ -0,0 +1,19 @@
+from app.services import warmup
+
+
+class _Recording:
+    def __init__(self):
+        self.shapes = []
+    def predict(self, texts):
+        self.shapes.append((len(texts), len(texts[0].split())))
+        return [[] for _ in texts]
+
+def test_warm_up_runs_every_shape_without_caching(fake_tagger, monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_BATCH_SIZES", [1, 4])
+    monkeypatch.setattr(warmup, "WARMUP_SEQ_BUCKETS", [16, 64])
+    fake_tagger.ner_model, fake_tagger.topic_model = _Recording(), _Recording()
+
+    timings = warmup.warm_up(fake_tagger, "test")
+    assert set(timings) == {"1x16", "1x64", "4x16", "4x64"}
+    assert fake_tagger.ner_model.shapes == [(1, 14), (1, 62), (4, 14), (4, 62)]
+    assert fake_tagger.topic_model.shapes == fake_tagger.ner_model.shapes